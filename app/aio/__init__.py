@@ -0,0 +1 @@
+﻿"""Асинхронный вариант приложения поверх `AsyncSession` (`DATABASE_MODE=async`)."""
@@ -0,0 +1,116 @@
+﻿"""Асинхронные зависимости FastAPI для работы с БД и проверки прав доступа."""
+import asyncio
+from collections.abc import AsyncGenerator, Callable, Coroutine
+from functools import partial
+from typing import Annotated, Any
+from fastapi import Depends, HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import contains_eager
+from .. import models
+from ..core.config import get_settings
+from ..core.permissions import RequiredPermissions, permission_cache, permission_registry
+from ..core.revocation import revocation_cache
+from ..db.session import AsyncSessionLocal
+from ..dependencies import check_revocation, embedded_permission_mask, get_verified_token
+from ..services import load_revocations
+from .services import get_principal
+
+settings = get_settings()
+_refresh_lock = asyncio.Lock()
+
+async def get_db() -> AsyncGenerator[AsyncSession, None]:
+    """Открывает асинхронную сессию SQLAlchemy и отдаёт её обработчику FastAPI."""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def refresh_revocations(db: AsyncSession) -> None:
+    """Дочитывает отзывы из БД, не блокируя цикл событий на блокировке кэша."""
+    async with _refresh_lock:
+        if revocation_cache.is_stale():
+            await db.run_sync(lambda session: revocation_cache.refresh(partial(load_revocations, session)))
+
+
+async def get_current_token(
+    verified: Annotated[tuple[bytes, dict[str, Any]], Depends(get_verified_token)],
+    db: Annotated[AsyncSession, Depends(get_db)],
+) -> models.AccessToken:
+    """Проверяет токен из заголовка Authorization и возвращает активную запись."""
+    key, claims = verified
+
+    if settings.token_validation_mode == "local":
+        if revocation_cache.is_stale():
+            await refresh_revocations(db)
+        return check_revocation(key, claims)
+
+    token = await db.scalar(
+        select(models.AccessToken)
+        .join(models.AccessToken.user)
+        .options(contains_eager(models.AccessToken.user))
+        .where(models.AccessToken.digest == key, models.AccessToken.is_revoked.is_(False))
+    )
+    if token is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token revoked or unknown.")
+
+    if not token.user.is_active:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User inactive or not found.")
+
+    return token
+
+
+async def get_current_user(
+    token: Annotated[models.AccessToken, Depends(get_current_token)],
+    db: Annotated[AsyncSession, Depends(get_db)],
+) -> models.User:
+    """Возвращает активного пользователя, связанного с проверенным токеном."""
+    user = await db.get(models.User, token.user_id)
+    if user is None or not user.is_active:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User inactive or not found.")
+    return user
+
+
+async def get_current_permission_mask(
+    token: Annotated[models.AccessToken, Depends(get_current_token)],
+    verified: Annotated[tuple[bytes, dict[str, Any]], Depends(get_verified_token)],
+    db: Annotated[AsyncSession, Depends(get_db)],
+) -> int:
+    """Возвращает битовую маску прав текущего пользователя из токена или из кэша процесса."""
+    _, claims = verified
+    if settings.token_embed_permissions and "perm" in claims and revocation_cache.is_stale():
+        await refresh_revocations(db)
+    mask = embedded_permission_mask(token.user_id, claims)
+    if mask is not None:
+        return mask
+
+    mask = permission_cache.get(token.user_id)
+    if mask is not None:
+        return mask
+
+    version = permission_cache.version
+    principal = await get_principal(db, token.user_id)
+    if principal is None or not principal.is_active:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User inactive or not found.")
+    return permission_cache.put(token.user_id, principal.permissions, version)
+
+
+async def get_current_session(
+    token: Annotated[models.AccessToken, Depends(get_current_token)],
+    user: Annotated[models.User, Depends(get_current_user)],
+) -> tuple[models.User, models.AccessToken]:
+    """Возвращает кортеж из пользователя и токена."""
+    return user, token
+
+
+def require_permissions(*required_codes: str) -> Callable[[int], Coroutine[Any, Any, int]]:
+    """Создаёт зависимость, проверяющую наличие у пользователя нужных прав."""
+    required = RequiredPermissions(permission_registry, required_codes)
+
+    async def dependency(mask: Annotated[int, Depends(get_current_permission_mask)]) -> int:
+        if not required.allows(mask):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Access forbidden: insufficient permissions.",
+            )
+        return mask
+    return dependency
@@ -0,0 +1,145 @@
+﻿"""Асинхронные внутренние маршруты для управления ролями и разрешениями."""
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from ...core.cache import catalog_cache
+from ...core.metrics import collect
+from ...internal.admin import PERMISSION_LIST, ROLE_LIST, serialize_catalog
+from ...responses import conditional_response
+from ...schemas import PermissionResponse, RoleCreateRequest, RoleResponse, RoleUpdateRequest
+from ..dependencies import get_db, require_permissions
+from ..services import (
+    create_role,
+    delete_role,
+    get_permissions_by_codes,
+    get_role,
+    list_permissions,
+    list_roles,
+    update_role,
+)
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+@router.get(
+    "/permissions",
+    response_model=list[PermissionResponse],
+    dependencies=[Depends(require_permissions("manage_roles"))],
+)
+async def list_permissions_view(request: Request, db: AsyncSession = Depends(get_db)):
+    """Возвращает перечень разрешений для административного интерфейса.
+
+    Сериализованный ответ кэшируется до изменения ролей, но не дольше
+    `CATALOG_CACHE_TTL_SECONDS`, и подтверждается по `ETag` (If-None-Match → 304).
+    """
+
+    body = catalog_cache.get("permissions")
+    if body is None:
+        version = catalog_cache.version
+        body = serialize_catalog(PERMISSION_LIST, await list_permissions(db))
+        catalog_cache.put("permissions", body, version)
+    return conditional_response(request, body)
+
+@router.get(
+    "/roles",
+    response_model=list[RoleResponse],
+    dependencies=[Depends(require_permissions("manage_roles"))],
+)
+async def list_roles_view(request: Request, db: AsyncSession = Depends(get_db)):
+    """Возвращает роли вместе с привязанными правами.
+
+    Сериализованный ответ кэшируется до изменения ролей, но не дольше
+    `CATALOG_CACHE_TTL_SECONDS`, и подтверждается по `ETag` (If-None-Match → 304).
+    """
+
+    body = catalog_cache.get("roles")
+    if body is None:
+        version = catalog_cache.version
+        body = serialize_catalog(ROLE_LIST, await list_roles(db))
+        catalog_cache.put("roles", body, version)
+    return conditional_response(request, body)
+
+@router.post(
+    "/roles",
+    response_model=RoleResponse,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(require_permissions("manage_roles"))],
+)
+async def create_role_view(payload: RoleCreateRequest, db: AsyncSession = Depends(get_db)):
+    """Создаёт новую роль после проверки списка разрешений."""
+
+    permissions = await get_permissions_by_codes(db, payload.permission_codes)
+    missing = set(payload.permission_codes) - {perm.code for perm in permissions}
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown permission codes: {', '.join(sorted(missing))}",
+        )
+
+    role = await create_role(
+        db,
+        name=payload.name,
+        description=payload.description,
+        permissions=permissions,
+    )
+    await db.commit()
+    return RoleResponse.model_validate(role)
+
+@router.patch(
+    "/roles/{role_id}",
+    response_model=RoleResponse,
+    dependencies=[Depends(require_permissions("manage_roles"))],
+)
+async def update_role_view(role_id: int, payload: RoleUpdateRequest, db: AsyncSession = Depends(get_db)):
+    """Обновляет параметры роли и назначенные права."""
+
+    role = await get_role(db, role_id)
+    if role is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Role not found.")
+
+    updates = payload.model_dump(exclude_unset=True)
+    permission_codes = updates.pop("permission_codes", None)
+
+    permissions = None
+    if permission_codes is not None:
+        permissions = await get_permissions_by_codes(db, permission_codes)
+        missing = set(permission_codes) - {perm.code for perm in permissions}
+        if missing:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unknown permission codes: {', '.join(sorted(missing))}",
+            )
+
+    await update_role(
+        db,
+        role,
+        name=updates.get("name"),
+        description=updates.get("description"),
+        permissions=permissions,
+    )
+    await db.commit()
+    return RoleResponse.model_validate(role)
+
+
+@router.delete(
+    "/roles/{role_id}",
+    status_code=status.HTTP_204_NO_CONTENT,
+    dependencies=[Depends(require_permissions("manage_roles"))],
+)
+async def delete_role_view(role_id: int, db: AsyncSession = Depends(get_db)):
+    """Удаляет роль, кроме системной `admin`."""
+
+    role = await get_role(db, role_id)
+    if role is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Role not found.")
+    if role.name == "admin":
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cannot delete admin role.")
+
+    await delete_role(db, role)
+    await db.commit()
+    return None
+
+
+@router.get("/metrics", dependencies=[Depends(require_permissions("manage_roles"))])
+async def metrics_view():
+    """Возвращает внутренние метрики кэшей, пулов и ограничителей процесса."""
+
+    return collect()
@@ -0,0 +1,190 @@
+﻿"""Асинхронные маршруты аутентификации: регистрация, вход, обновление токенов и выход пользователей."""
+from datetime import datetime, timezone
+from typing import Any
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from ...core.ratelimit import login_throttle
+from ...core.security import (
+    create_access_token,
+    dummy_password_hash,
+    hash_password_async,
+    verify_and_update_password_async,
+    verify_password_async,
+)
+from ...dependencies import get_client_ip, get_verified_token
+from ...models import AccessToken, User
+from ...schemas import (
+    IntrospectRequest,
+    IntrospectResponse,
+    LoginRequest,
+    RefreshRequest,
+    TokenResponse,
+    UserCreate,
+    UserProfile,
+)
+from ...services import IntrospectionBatch, new_refresh_token, serialize_user
+from ..dependencies import get_current_session, get_db, require_permissions
+from ..services import (
+    create_user,
+    get_role_by_name,
+    get_token_principals,
+    get_user_by_email,
+    get_user_with_roles,
+    new_access_token_id,
+    revoke_refresh_family,
+    revoke_token,
+    rotate_refresh_token,
+    token_permission_claims,
+)
+
+router = APIRouter()
+
+
+async def issue_tokens(db: AsyncSession, user: User, family_id: str | None = None) -> TokenResponse:
+    """Выпускает access-токен и refresh-токен сессии `family_id` (новой, если она не задана).
+
+    Роли пользователя должны быть уже загружены.
+    """
+    refresh_token, refresh_record = new_refresh_token(user.id, family_id)
+    jti, digest = await new_access_token_id(db)
+    permission_claims = await token_permission_claims(db, user)
+    token_str, expires_at = create_access_token(
+        subject=str(user.id),
+        jti=jti,
+        sid=refresh_record.family_id,
+        roles=[role.name for role in user.roles],
+        **permission_claims,
+    )
+    db.add_all([AccessToken(digest=digest, user_id=user.id, expires_at=expires_at), refresh_record])
+
+    expires_in = max(0, int((expires_at - datetime.now(timezone.utc)).total_seconds()))
+    return TokenResponse(access_token=token_str, expires_in=expires_in, refresh_token=refresh_token)
+
+
+@router.post("/register", response_model=UserProfile, status_code=status.HTTP_201_CREATED)
+async def register_user(payload: UserCreate, db: AsyncSession = Depends(get_db)):
+    """Регистрирует нового пользователя и назначает ему базовую роль."""
+
+    existing = await get_user_by_email(db, payload.email)
+    if existing:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered.")
+    # Соединение не удерживается, пока пароль хешируется в пуле процессов:
+    # хеш вычисляется до следующего обращения к БД.
+    await db.close()
+    password_hash = await hash_password_async(payload.password)
+
+    default_role = await get_role_by_name(db, "basic_user")
+    if default_role is None:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Default role missing.")
+
+    user = await create_user(
+        db,
+        first_name=payload.first_name,
+        last_name=payload.last_name,
+        patronymic=payload.patronymic,
+        email=payload.email,
+        password=payload.password,
+        roles=[default_role],
+        password_hash=password_hash,
+    )
+    await db.commit()
+    return serialize_user(user)
+
+
+@router.post("/login", response_model=TokenResponse)
+async def login(
+    payload: LoginRequest,
+    client_ip: str = Depends(get_client_ip),
+    db: AsyncSession = Depends(get_db),
+):
+    """Проверяет учётные данные, при необходимости перехеширует пароль и выдаёт пару токенов.
+
+    Попытки ограничиваются по адресу почты и IP клиента до обращения к БД и хешированию.
+    """
+
+    retry_after = login_throttle.check(payload.email, client_ip)
+    if retry_after:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many login attempts.",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+    user = await get_user_by_email(db, payload.email)
+    # Соединение не удерживается, пока пароль проверяется в пуле процессов.
+    await db.close()
+    if user is None or not user.is_active:
+        await verify_password_async(payload.password, dummy_password_hash())
+        login_throttle.failure(payload.email, client_ip)
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials.")
+
+    verified, new_hash = await verify_and_update_password_async(payload.password, user.password_hash)
+    if not verified:
+        login_throttle.failure(payload.email, client_ip)
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials.")
+    db.add(user)
+    if new_hash is not None:
+        user.password_hash = new_hash
+    login_throttle.success(payload.email, client_ip)
+
+    response = await issue_tokens(db, user)
+    await db.commit()
+    return response
+
+
+@router.post("/refresh", response_model=TokenResponse)
+async def refresh(payload: RefreshRequest, db: AsyncSession = Depends(get_db)):
+    """Обменивает refresh-токен на новую пару токенов той же сессии.
+
+    Каждый refresh-токен действует один раз. Повторное предъявление уже
+    обменянного токена означает его утечку и отзывает все refresh-токены сессии.
+    """
+
+    rotated = await rotate_refresh_token(db, payload.refresh_token)
+    if rotated is None:
+        await db.commit()
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid refresh token.")
+
+    user_id, family_id = rotated
+    user = await get_user_with_roles(db, user_id)
+    if user is None or not user.is_active:
+        await db.rollback()
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User inactive or not found.")
+
+    response = await issue_tokens(db, user, family_id)
+    await db.commit()
+    return response
+
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(
+    session_data: tuple[User, AccessToken] = Depends(get_current_session),
+    verified: tuple[bytes, dict[str, Any]] = Depends(get_verified_token),
+    db: AsyncSession = Depends(get_db),
+):
+    """Отзывает текущий токен пользователя и refresh-токены его сессии."""
+
+    _, token = session_data
+    await revoke_token(db, token)
+    _, claims = verified
+    if claims.get("sid"):
+        await revoke_refresh_family(db, claims["sid"])
+    await db.commit()
+    return None
+
+
+@router.post(
+    "/introspect",
+    response_model=IntrospectResponse,
+    response_model_exclude_none=True,
+    dependencies=[Depends(require_permissions("introspect_tokens"))],
+)
+async def introspect(payload: IntrospectRequest, db: AsyncSession = Depends(get_db)):
+    """Проверяет пакет токенов: подпись и срок, отзыв, активность владельца и его права.
+
+    Владельцы всех токенов пакета загружаются одним запросом, результаты
+    кэшируются на `INTROSPECTION_CACHE_TTL_SECONDS` секунд.
+    """
+
+    batch = IntrospectionBatch(payload.tokens)
+    return IntrospectResponse(results=batch.complete(await get_token_principals(db, batch.keys)))
\ No newline at end of file
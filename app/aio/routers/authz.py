@@ -0,0 +1,24 @@
+﻿"""Асинхронная пакетная проверка прав пользователей для других сервисов."""
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+from ...schemas import AuthzCheckRequest, AuthzCheckResponse
+from ...services import AuthorizationBatch
+from ..dependencies import get_db, require_permissions
+from ..services import get_principals
+
+router = APIRouter()
+
+@router.post(
+    "/check",
+    response_model=AuthzCheckResponse,
+    dependencies=[Depends(require_permissions("check_authorization"))],
+)
+async def check(payload: AuthzCheckRequest, db: AsyncSession = Depends(get_db)):
+    """Возвращает матрицу решений «пользователь — право» для пакета проверок.
+
+    Права всех пользователей пакета, которых нет в кэше процесса, загружаются
+    одним запросом.
+    """
+
+    batch = AuthorizationBatch(payload.checks)
+    return AuthzCheckResponse(results=batch.complete(await get_principals(db, batch.subjects)))
@@ -0,0 +1,243 @@
+﻿"""Асинхронные маршруты для управления профилем и пользователями."""
+from dataclasses import asdict
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from ...core.cache import profile_cache
+from ...core.config import get_settings
+from ...dependencies import UserListParams, get_user_list_params
+from ...models import AccessToken, User
+from ...responses import conditional_response
+from ...schemas import (
+    UserAdminUpdate,
+    UserBulkDeactivateResult,
+    UserBulkRequest,
+    UserBulkResult,
+    UserBulkRoleRequest,
+    UserImportReport,
+    UserPage,
+    UserProfile,
+    UserSelfUpdate,
+)
+from ...services import profile_body, serialize_user
+from ...services.export import EXPORT_MEDIA_TYPES, ExportFormat
+from ...services.importer import ImportFormat, UserImport, aiter_lines
+from ..dependencies import get_current_session, get_current_token, get_db, require_permissions
+from ..services import (
+    deactivate_users,
+    get_roles_by_ids,
+    get_user_with_roles,
+    grant_role_to_users,
+    list_users,
+    revoke_role_from_users,
+    set_user_roles,
+    soft_delete_user,
+    update_user,
+)
+from ..services.export import stream_users
+from ..services.importer import commit_user_batch, load_role_ids
+
+settings = get_settings()
+router = APIRouter()
+
+
+@router.get("/me", response_model=UserProfile)
+async def get_profile(
+    request: Request,
+    token: AccessToken = Depends(get_current_token),
+    db: AsyncSession = Depends(get_db),
+):
+    """Возвращает профиль текущего пользователя вместе с ролями.
+
+    Сериализованный профиль кэшируется до изменения пользователя, его ролей
+    или прав, но не дольше `PROFILE_CACHE_TTL_SECONDS`, и подтверждается по
+    `ETag` (If-None-Match → 304). При попадании в кэш обращение к БД нужно
+    только для проверки токена, а с `TOKEN_VALIDATION_MODE=local` — ни одного.
+    """
+
+    body = profile_cache.get(token.user_id)
+    if body is None:
+        version = profile_cache.version
+        db_user = await get_user_with_roles(db, token.user_id)
+        if db_user is None or not db_user.is_active:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User inactive or not found.")
+        body = profile_body(db_user)
+        profile_cache.put(token.user_id, body, version)
+    return conditional_response(request, body)
+
+
+@router.patch("/me", response_model=UserProfile)
+async def update_profile(
+    payload: UserSelfUpdate,
+    session_data: tuple[User, AccessToken] = Depends(get_current_session),
+    db: AsyncSession = Depends(get_db),
+):
+    """Позволяет пользователю обновить собственные данные."""
+
+    user, _ = session_data
+    db_user = await get_user_with_roles(db, user.id)
+    if db_user is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found.")
+
+    updates = payload.model_dump(exclude_unset=True)
+    await update_user(db, db_user, updates)
+    await db.commit()
+    return serialize_user(db_user)
+
+
+@router.delete("/me", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_self(
+    session_data: tuple[User, AccessToken] = Depends(get_current_session),
+    db: AsyncSession = Depends(get_db),
+):
+    """Деактивирует учётную запись пользователя и отзывает его токены."""
+
+    user, _ = session_data
+    await soft_delete_user(db, user)
+    await db.commit()
+    return None
+
+
+@router.get(
+    "",
+    response_model=UserPage,
+    response_model_exclude_unset=True,
+    dependencies=[Depends(require_permissions("view_users"))],
+)
+async def list_all_users(
+    params: UserListParams = Depends(get_user_list_params),
+    db: AsyncSession = Depends(get_db),
+):
+    """Возвращает страницу пользователей по курсору (требует право `view_users`).
+
+    Для следующей страницы передайте полученный `next_cursor` в параметре `cursor`.
+    """
+
+    items, next_cursor = await list_users(db, **asdict(params))
+    return UserPage(items=items, next_cursor=next_cursor)
+
+
+
+@router.get(
+    "/export",
+    response_class=StreamingResponse,
+    dependencies=[Depends(require_permissions("view_users"))],
+)
+async def export_users(
+    export_format: ExportFormat = Query("ndjson", alias="format"),
+    is_active: bool | None = None,
+    role: str | None = Query(None, max_length=50),
+    email_prefix: str | None = Query(None, min_length=1, max_length=255),
+):
+    """Потоково выгружает всех пользователей с ролями в NDJSON или CSV (требует право `view_users`)."""
+
+    return StreamingResponse(
+        stream_users(export_format, is_active=is_active, role=role, email_prefix=email_prefix),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="users.{export_format}"'},
+    )
+
+
+@router.post(
+    "/import",
+    response_model=UserImportReport,
+    dependencies=[Depends(require_permissions("manage_users"))],
+)
+async def import_users_view(
+    request: Request,
+    import_format: ImportFormat = Query("ndjson", alias="format"),
+    default_role: str = Query("basic_user", max_length=50),
+    db: AsyncSession = Depends(get_db),
+):
+    """Массово создаёт пользователей из NDJSON или CSV в теле запроса (требует право `manage_users`).
+
+    Тело читается потоково, строки записываются пакетами по `USERS_IMPORT_BATCH_SIZE`
+    с фиксацией после каждого пакета; ошибки возвращаются с номерами строк.
+    """
+
+    role_ids = await load_role_ids(db)
+    if default_role not in role_ids:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unknown role: {default_role}")
+
+    job = UserImport(import_format, role_ids, default_role, settings.users_import_batch_size)
+    async for line_no, line in aiter_lines(request.stream()):
+        batch = job.add_line(line_no, line)
+        if batch:
+            await commit_user_batch(db, job, batch)
+    await commit_user_batch(db, job, job.finish())
+    return job.report()
+
+
+@router.post(
+    "/bulk/grant-role",
+    response_model=UserBulkResult,
+    dependencies=[Depends(require_permissions("manage_users"))],
+)
+async def bulk_grant_role(payload: UserBulkRoleRequest, db: AsyncSession = Depends(get_db)):
+    """Назначает роль набору пользователей одним запросом (требует право `manage_users`)."""
+
+    if not await get_roles_by_ids(db, [payload.role_id]):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Role not found.")
+    affected = await grant_role_to_users(db, payload.role_id, sorted(set(payload.user_ids)))
+    await db.commit()
+    return UserBulkResult(affected=affected)
+
+
+@router.post(
+    "/bulk/revoke-role",
+    response_model=UserBulkResult,
+    dependencies=[Depends(require_permissions("manage_users"))],
+)
+async def bulk_revoke_role(payload: UserBulkRoleRequest, db: AsyncSession = Depends(get_db)):
+    """Снимает роль с набора пользователей одним запросом (требует право `manage_users`)."""
+
+    if not await get_roles_by_ids(db, [payload.role_id]):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Role not found.")
+    affected = await revoke_role_from_users(db, payload.role_id, sorted(set(payload.user_ids)))
+    await db.commit()
+    return UserBulkResult(affected=affected)
+
+
+@router.post(
+    "/bulk/deactivate",
+    response_model=UserBulkDeactivateResult,
+    dependencies=[Depends(require_permissions("manage_users"))],
+)
+async def bulk_deactivate(payload: UserBulkRequest, db: AsyncSession = Depends(get_db)):
+    """Деактивирует набор пользователей и отзывает их токены (требует право `manage_users`)."""
+
+    affected, revoked_tokens = await deactivate_users(db, sorted(set(payload.user_ids)))
+    await db.commit()
+    return UserBulkDeactivateResult(affected=affected, revoked_tokens=revoked_tokens)
+
+
+@router.patch(
+    "/{user_id}",
+    response_model=UserProfile,
+    dependencies=[Depends(require_permissions("manage_users"))],
+)
+async def admin_update_user(user_id: int, payload: UserAdminUpdate, db: AsyncSession = Depends(get_db)):
+    """Позволяет администратору обновить данные пользователя и его роли."""
+
+    user = await get_user_with_roles(db, user_id)
+    if user is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found.")
+
+    updates = payload.model_dump(exclude_unset=True)
+    role_ids: list[int] | None = updates.pop("role_ids", None)  # type: ignore[assignment]
+
+    await update_user(db, user, updates)
+
+    if role_ids is not None:
+        roles = await get_roles_by_ids(db, role_ids)
+        found_ids = {role.id for role in roles}
+        missing_ids = sorted({role_id for role_id in role_ids if role_id not in found_ids})
+        if missing_ids:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unknown role ids: {', '.join(map(str, missing_ids))}",
+            )
+        await set_user_roles(db, user, roles)
+
+    await db.commit()
+    return serialize_user(user)
@@ -0,0 +1,48 @@
+﻿from .permission import get_permissions_by_codes, list_permissions
+from .principal import get_principal, get_principals, get_token_principals, token_permission_claims
+from .role import create_role, delete_role, get_role, get_role_by_name, get_roles_by_ids, list_roles, update_role
+from .token import new_access_token_id, revoke_refresh_family, revoke_token, rotate_refresh_token
+from .user import (
+    create_user,
+    deactivate_users,
+    get_user,
+    get_user_by_email,
+    get_user_with_roles,
+    grant_role_to_users,
+    list_users,
+    revoke_role_from_users,
+    set_user_roles,
+    soft_delete_user,
+    update_user,
+)
+
+__all__ = [
+    "get_user_by_email",
+    "get_user",
+    "get_user_with_roles",
+    "create_user",
+    "list_users",
+    "update_user",
+    "soft_delete_user",
+    "set_user_roles",
+    "grant_role_to_users",
+    "revoke_role_from_users",
+    "deactivate_users",
+    "get_role",
+    "get_role_by_name",
+    "get_roles_by_ids",
+    "list_roles",
+    "create_role",
+    "update_role",
+    "delete_role",
+    "get_permissions_by_codes",
+    "list_permissions",
+    "get_principal",
+    "get_principals",
+    "get_token_principals",
+    "token_permission_claims",
+    "new_access_token_id",
+    "revoke_token",
+    "rotate_refresh_token",
+    "revoke_refresh_family",
+]
@@ -0,0 +1,30 @@
+﻿"""Асинхронная потоковая выгрузка каталога пользователей."""
+from collections.abc import AsyncIterator
+from ...db.session import AsyncSessionLocal
+from ...services.export import (
+    ExportFormat,
+    UserRowGrouper,
+    encode_header,
+    encode_records,
+    user_export_query,
+)
+
+async def stream_users(
+    export_format: ExportFormat,
+    *,
+    is_active: bool | None = None,
+    role: str | None = None,
+    email_prefix: str | None = None,
+) -> AsyncIterator[str]:
+    """Отдаёт выгрузку фрагментами по мере чтения серверного курсора в собственной сессии."""
+    yield encode_header(export_format)
+    grouper = UserRowGrouper()
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(
+            user_export_query(is_active=is_active, role=role, email_prefix=email_prefix)
+        )
+        async for rows in result.partitions():
+            records = grouper.feed(rows)
+            if records:
+                yield encode_records(records, export_format)
+    yield encode_records(grouper.finish(), export_format)
@@ -0,0 +1,64 @@
+﻿"""Асинхронная вставка пакетов массового импорта пользователей."""
+from collections.abc import Sequence
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from ...core.security import hash_passwords_async
+from ...models import Role, UserRole
+from ...services.importer import (
+    CONFLICT_ERROR,
+    INSERT_USERS,
+    PendingUser,
+    UserImport,
+    assign_hashes,
+    existing_emails_query,
+    unhashed,
+    user_role_rows,
+    user_rows,
+)
+
+async def load_role_ids(db: AsyncSession) -> dict[str, int]:
+    """Возвращает идентификаторы ролей по названиям."""
+    result = await db.execute(select(Role.id, Role.name))
+    return {name: role_id for role_id, name in result}
+
+
+async def import_user_batch(
+    db: AsyncSession,
+    job: UserImport,
+    batch: Sequence[PendingUser],
+) -> list[PendingUser]:
+    """Проверяет адреса пакета одним запросом, хеширует пароли в пуле и вставляет строки."""
+    if not batch:
+        return []
+    existing = set(await db.scalars(existing_emails_query(batch)))
+    batch = job.reject_existing(batch, existing)
+    if not batch:
+        return []
+    pending_hashes = unhashed(batch)
+    if pending_hashes:
+        hashes = await hash_passwords_async([pending.row.password for pending in pending_hashes])
+        assign_hashes(pending_hashes, hashes)
+    user_ids = (await db.scalars(INSERT_USERS, user_rows(batch))).all()
+    links = user_role_rows(batch, user_ids)
+    if links:
+        await db.execute(insert(UserRole), links)
+    return batch
+
+
+async def commit_user_batch(db: AsyncSession, job: UserImport, batch: Sequence[PendingUser]) -> None:
+    """Вставляет и фиксирует пакет; при конфликте откатывает его и повторяет построчно."""
+    checkpoint = job.checkpoint()
+    try:
+        inserted = await import_user_batch(db, job, batch)
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        job.restore(checkpoint)
+        if len(batch) == 1:
+            job.reject(batch, CONFLICT_ERROR)
+        else:
+            for pending in batch:
+                await commit_user_batch(db, job, [pending])
+        return
+    job.created += len(inserted)
@@ -0,0 +1,14 @@
+﻿"""Асинхронные сервисные функции для работы с разрешениями."""
+from typing import Sequence
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from ...models import Permission
+
+async def get_permissions_by_codes(db: AsyncSession, codes: Sequence[str]) -> list[Permission]:
+    """Возвращает разрешения, соответствующие указанным кодам."""
+    return list((await db.scalars(select(Permission).where(Permission.code.in_(codes)))).all())
+
+
+async def list_permissions(db: AsyncSession) -> list[Permission]:
+    """Возвращает список всех разрешений системы."""
+    return list((await db.scalars(select(Permission))).all())
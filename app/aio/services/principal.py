@@ -0,0 +1,45 @@
+﻿"""Асинхронная загрузка сведений о пользователе для проверки доступа."""
+from typing import Any
+from sqlalchemy.ext.asyncio import AsyncSession
+from ...core.config import get_settings
+from ...models import User
+from ...services.principal import (
+    Principal,
+    permission_claims,
+    principal_from_rows,
+    principal_query,
+    principals_from_batch_rows,
+    principals_query,
+    token_principals_from_rows,
+    token_principals_query,
+)
+
+settings = get_settings()
+
+async def get_principal(db: AsyncSession, user_id: int) -> Principal | None:
+    """Загружает принципала одним запросом без построения ORM-графа ролей."""
+    result = await db.execute(principal_query(user_id))
+    return principal_from_rows(user_id, result.all())
+
+
+async def get_principals(db: AsyncSession, user_ids: list[int]) -> dict[int, Principal]:
+    """Загружает принципалов нескольких пользователей одним запросом."""
+    if not user_ids:
+        return {}
+    result = await db.execute(principals_query(user_ids))
+    return principals_from_batch_rows(result.all())
+
+
+async def get_token_principals(db: AsyncSession, keys: list[bytes]) -> dict[bytes, Principal]:
+    """Загружает принципалов владельцев токенов одним запросом на весь пакет."""
+    if not keys:
+        return {}
+    result = await db.execute(token_principals_query(keys))
+    return token_principals_from_rows(result.all())
+
+
+async def token_permission_claims(db: AsyncSession, user: User) -> dict[str, Any]:
+    """Возвращает claim'ы прав для токена пользователя, если их встраивание включено."""
+    if not settings.token_embed_permissions:
+        return {}
+    return permission_claims(await get_principal(db, user.id), user.authz_version)
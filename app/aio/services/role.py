@@ -0,0 +1,76 @@
+﻿"""Асинхронные сервисные функции для работы с ролями."""
+from typing import Sequence
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from ...models import Permission, Role, RolePermission, UserRole
+from ...services.invalidation import bump_authz_version_statement, invalidate_auth, invalidate_catalog
+
+
+async def get_role(db: AsyncSession, role_id: int) -> Role | None:
+    """Возвращает роль вместе с разрешениями по идентификатору."""
+    return await db.scalar(
+        select(Role).options(selectinload(Role.permissions)).where(Role.id == role_id)
+    )
+
+
+async def get_role_by_name(db: AsyncSession, role_name: str) -> Role | None:
+    """Возвращает роль по её уникальному имени."""
+    return await db.scalar(select(Role).where(Role.name == role_name))
+
+
+async def get_roles_by_ids(db: AsyncSession, role_ids: Sequence[int]) -> list[Role]:
+    """Возвращает роли, соответствующие указанным идентификаторам."""
+    return list((await db.scalars(select(Role).where(Role.id.in_(role_ids)))).all())
+
+
+async def list_roles(db: AsyncSession) -> list[Role]:
+    """Возвращает список ролей с загруженными разрешениями."""
+    return list((await db.scalars(select(Role).options(selectinload(Role.permissions)))).all())
+
+
+async def create_role(
+    db: AsyncSession,
+    *,
+    name: str,
+    description: str | None,
+    permissions: Sequence[Permission],
+) -> Role:
+    """Создаёт роль и привязывает к ней заданные разрешения."""
+    role = Role(name=name, description=description)
+    role.permissions = list(permissions)
+    db.add(role)
+    await db.flush()
+    invalidate_catalog(db.sync_session)
+    return role
+
+
+async def update_role(
+    db: AsyncSession,
+    role: Role,
+    name: str | None = None,
+    description: str | None = None,
+    permissions: Sequence[Permission] | None = None,
+) -> Role:
+    """Обновляет параметры роли; разрешения роли должны быть уже загружены."""
+    if name is not None:
+        role.name = name
+    if description is not None:
+        role.description = description
+    if permissions is not None:
+        role.permissions = list(permissions)
+        await db.execute(bump_authz_version_statement(role_id=role.id))
+    await db.flush()
+    invalidate_auth(db.sync_session)
+    invalidate_catalog(db.sync_session)
+    return role
+
+
+async def delete_role(db: AsyncSession, role: Role) -> None:
+    """Удаляет роль вместе со связями, не загружая её пользователей."""
+    await db.execute(bump_authz_version_statement(role_id=role.id))
+    await db.execute(delete(UserRole).where(UserRole.role_id == role.id))
+    await db.execute(delete(RolePermission).where(RolePermission.role_id == role.id))
+    await db.execute(delete(Role).where(Role.id == role.id))
+    invalidate_auth(db.sync_session)
+    invalidate_catalog(db.sync_session)
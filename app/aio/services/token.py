@@ -0,0 +1,53 @@
+﻿"""Асинхронные сервисные функции для работы с токенами доступа и refresh-токенами."""
+from datetime import datetime, timezone
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+from ...core.security import new_jti, token_digest
+from ...db.session import after_commit
+from ...models import AccessToken
+from ...services.token import (
+    access_token_digest_taken_query,
+    as_utc,
+    forget_token,
+    reused_refresh_family_statement,
+    revoke_refresh_tokens_statement,
+    use_refresh_token_statement,
+)
+
+async def new_access_token_id(db: AsyncSession) -> tuple[str, bytes]:
+    """Возвращает `jti` нового access-токена и его отпечаток, ещё не занятый в БД."""
+    while True:
+        jti = new_jti()
+        digest = token_digest(jti)
+        if not await db.scalar(access_token_digest_taken_query(digest)):
+            return jti, digest
+
+
+async def revoke_token(db: AsyncSession, token: AccessToken) -> None:
+    """Помечает токен отозванным и после коммита сообщает об этом кэшу отзывов."""
+    await db.execute(
+        update(AccessToken).where(AccessToken.digest == token.digest).values(is_revoked=True)
+    )
+    key = token.digest
+    expires_at = as_utc(token.expires_at).timestamp()
+    after_commit(db.sync_session, lambda: forget_token(key, expires_at))
+
+
+async def rotate_refresh_token(db: AsyncSession, value: str) -> tuple[int, str] | None:
+    """Гасит refresh-токен и возвращает идентификатор пользователя и семейство.
+
+    Повторное предъявление уже погашенного токена отзывает всё семейство;
+    вызывающий код должен зафиксировать транзакцию.
+    """
+    row = (await db.execute(use_refresh_token_statement(value, datetime.now(timezone.utc)))).first()
+    if row is not None:
+        return row.user_id, row.family_id
+    family_id = await db.scalar(reused_refresh_family_statement(value))
+    if family_id is not None:
+        await db.execute(revoke_refresh_tokens_statement(family_id=family_id))
+    return None
+
+
+async def revoke_refresh_family(db: AsyncSession, family_id: str) -> None:
+    """Отзывает refresh-токены сессии, например при выходе."""
+    await db.execute(revoke_refresh_tokens_statement(family_id=family_id))
@@ -0,0 +1,164 @@
+﻿"""Асинхронные сервисные операции для работы с пользователями."""
+from typing import Any, Sequence
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from ...core.security import hash_password_async
+from ...models import AccessToken, Role, User
+from ...services.invalidation import bump_authz_version_statement, invalidate_auth, invalidate_profile
+from ...services.token import revoke_refresh_tokens_statement
+from ...services.user import (
+    USER_LIST_FIELDS,
+    attach_role_names,
+    deactivate_users_statements,
+    grant_role_statement,
+    revoke_role_statement,
+    user_page_from_rows,
+    user_role_names_query,
+    users_page_query,
+)
+
+async def get_user_by_email(db: AsyncSession, email: str) -> User | None:
+    """Возвращает пользователя с ролями по адресу электронной почты или `None`."""
+    return await db.scalar(
+        select(User).options(selectinload(User.roles)).where(User.email == email)
+    )
+
+
+async def get_user(db: AsyncSession, user_id: int) -> User | None:
+    """Находит пользователя по идентификатору без подгрузки зависимостей."""
+    return await db.get(User, user_id)
+
+
+async def get_user_with_roles(db: AsyncSession, user_id: int) -> User | None:
+    """Загружает пользователя вместе с ролями (без их разрешений)."""
+    return await db.scalar(select(User).options(selectinload(User.roles)).where(User.id == user_id))
+
+
+async def create_user(
+    db: AsyncSession,
+    *,
+    first_name: str,
+    last_name: str,
+    patronymic: str | None,
+    email: str,
+    password: str,
+    roles: Sequence[Role] | None = None,
+    password_hash: str | None = None,
+) -> User:
+    """Создаёт нового пользователя, хеширует пароль в пуле процессов и назначает роли.
+
+    `password_hash` передаётся, если хеш уже вычислен до обращения к БД, чтобы
+    сессия не удерживала соединение, пока пароль хешируется.
+    """
+    user = User(
+        first_name=first_name,
+        last_name=last_name,
+        patronymic=patronymic,
+        email=email,
+        password_hash=password_hash or await hash_password_async(password),
+        is_active=True,
+    )
+    user.roles = list(roles or [])
+    db.add(user)
+    await db.flush()
+    return user
+
+
+async def list_users(
+    db: AsyncSession,
+    *,
+    fields: Sequence[str] = USER_LIST_FIELDS,
+    limit: int,
+    after_id: int | None = None,
+    is_active: bool | None = None,
+    role: str | None = None,
+    email_prefix: str | None = None,
+) -> tuple[list[dict[str, Any]], int | None]:
+    """Возвращает страницу пользователей с выбранными полями и курсор следующей страницы."""
+    result = await db.execute(
+        users_page_query(
+            fields=fields,
+            limit=limit,
+            after_id=after_id,
+            is_active=is_active,
+            role=role,
+            email_prefix=email_prefix,
+        )
+    )
+    rows = result.all()
+    items, next_cursor = user_page_from_rows(rows, fields, limit)
+    if "roles" in fields and items:
+        user_ids = [row.id for row in rows[:limit]]
+        role_rows = (await db.execute(user_role_names_query(user_ids))).all()
+        attach_role_names(items, user_ids, role_rows)
+    return items, next_cursor
+
+
+async def update_user(db: AsyncSession, user: User, data: dict[str, object]) -> User:
+    """Применяет частичное обновление атрибутов пользователя."""
+    if "first_name" in data:
+        user.first_name = data["first_name"]
+    if "last_name" in data:
+        user.last_name = data["last_name"]
+    if "patronymic" in data:
+        user.patronymic = data["patronymic"]
+    if "email" in data:
+        user.email = data["email"]
+    if "is_active" in data:
+        user.is_active = bool(data["is_active"])
+        await db.execute(bump_authz_version_statement(user_ids=(user.id,)))
+        if not user.is_active:
+            await db.execute(revoke_refresh_tokens_statement(user_ids=(user.id,)))
+        invalidate_auth(db.sync_session, deactivated_user_ids=() if user.is_active else (user.id,))
+    await db.flush()
+    invalidate_profile(db.sync_session, user.id)
+    return user
+
+
+async def set_user_roles(db: AsyncSession, user: User, roles: Sequence[Role]) -> User:
+    """Заменяет набор ролей пользователя; роли должны быть уже загружены."""
+    user.roles = list(roles)
+    await db.flush()
+    await db.execute(bump_authz_version_statement(user_ids=(user.id,)))
+    invalidate_auth(db.sync_session)
+    return user
+
+
+async def grant_role_to_users(db: AsyncSession, role_id: int, user_ids: Sequence[int]) -> int:
+    """Назначает роль пользователям одним запросом и возвращает число новых назначений."""
+    result = await db.execute(grant_role_statement(role_id, user_ids))
+    await db.execute(bump_authz_version_statement(user_ids=user_ids))
+    invalidate_auth(db.sync_session)
+    return result.rowcount
+
+
+async def revoke_role_from_users(db: AsyncSession, role_id: int, user_ids: Sequence[int]) -> int:
+    """Снимает роль с пользователей одним запросом и возвращает число снятых назначений."""
+    result = await db.execute(revoke_role_statement(role_id, user_ids))
+    await db.execute(bump_authz_version_statement(user_ids=user_ids))
+    invalidate_auth(db.sync_session)
+    return result.rowcount
+
+
+async def deactivate_users(db: AsyncSession, user_ids: Sequence[int]) -> tuple[int, int]:
+    """Деактивирует пользователей и отзывает их токены четырьмя запросами независимо от их числа."""
+    deactivate, revoke, revoke_refresh = deactivate_users_statements(user_ids)
+    users = (await db.execute(deactivate)).rowcount
+    tokens = (await db.execute(revoke)).rowcount
+    await db.execute(revoke_refresh)
+    await db.execute(bump_authz_version_statement(user_ids=user_ids))
+    invalidate_auth(db.sync_session, deactivated_user_ids=user_ids)
+    return users, tokens
+
+
+async def soft_delete_user(db: AsyncSession, user: User) -> None:
+    """Деактивирует пользователя и отзывает все его токены."""
+    user.is_active = False
+    await db.execute(
+        update(AccessToken).where(AccessToken.user_id == user.id).values(is_revoked=True)
+    )
+    await db.execute(revoke_refresh_tokens_statement(user_ids=(user.id,)))
+    await db.execute(bump_authz_version_statement(user_ids=(user.id,)))
+    await db.flush()
+    invalidate_auth(db.sync_session, deactivated_user_ids=(user.id,))
@@ -0,0 +1,127 @@
+﻿"""LRU-кэш с временем жизни записей для коротких кэшей ответов."""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Hashable
+from dataclasses import dataclass
+from typing import Any, Generic, TypeVar
+from .config import get_settings
+from .metrics import register_collector
+
+settings = get_settings()
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+@dataclass(frozen=True, slots=True)
+class CachedBody:
+    """Сериализованный ответ и его строгий `ETag`."""
+    content: bytes
+    etag: str
+
+
+def cached_body(content: bytes) -> CachedBody:
+    """Оборачивает тело ответа; `ETag` — хеш содержимого, одинаковый во всех процессах."""
+    return CachedBody(content, f'"{hashlib.blake2b(content, digest_size=8).hexdigest()}"')
+
+
+class TTLCache(Generic[K, V]):
+    """Хранит не более `maxsize` записей, каждую не дольше `ttl_seconds` секунд.
+
+    `bump_version` сбрасывает кэш, `pop` — одну запись; запись, прочитанная из
+    БД до сброса, не сохраняется, если `put` получил номер версии, взятый до чтения.
+    Каждый сброс увеличивает `version`; `pop` запоминает номер для своего ключа,
+    поэтому запоздавший `put` других ключей не отклоняется.
+    """
+
+    def __init__(self, maxsize: int, ttl_seconds: float) -> None:
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        # Версия последнего `bump_version` и версии удалений отдельных ключей;
+        # вытесненные из `_popped` номера поднимают `_cleared_at`.
+        self._cleared_at = 0
+        self._popped: OrderedDict[K, int] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: K) -> V | None:
+        """Возвращает значение, если оно есть и не устарело."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: K, value: V, version: int | None = None) -> None:
+        """Сохраняет значение, вытесняя самые давние записи сверх `maxsize`.
+
+        Если задан `version` и с тех пор сбрасывался кэш или удалялся `key`,
+        значение не сохраняется.
+        """
+        if self.maxsize <= 0 or self.ttl_seconds <= 0:
+            return
+        with self._lock:
+            if version is not None and version < max(self._cleared_at, self._popped.get(key, 0)):
+                return
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def pop(self, key: K) -> None:
+        """Удаляет запись и делает устаревшими прочитанные до этого данные ключа."""
+        with self._lock:
+            self.version += 1
+            self._entries.pop(key, None)
+            self._popped[key] = self.version
+            self._popped.move_to_end(key)
+            while len(self._popped) > max(self.maxsize, 0):
+                _, popped_at = self._popped.popitem(last=False)
+                self._cleared_at = max(self._cleared_at, popped_at)
+
+    def clear(self) -> None:
+        """Удаляет все записи."""
+        with self._lock:
+            self._entries.clear()
+
+    def bump_version(self) -> None:
+        """Удаляет все записи и делает устаревшими прочитанные до этого данные."""
+        with self._lock:
+            self.version += 1
+            self._cleared_at = self.version
+            self._entries.clear()
+            self._popped.clear()
+
+    def stats(self) -> dict[str, int]:
+        """Возвращает счётчики попаданий, промахов и размер кэша."""
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries), "version": self.version}
+
+
+# Результаты интроспекции по ключу токена; сбрасываются при отзыве токена и изменении прав.
+introspection_cache: TTLCache[bytes, Any] = TTLCache(
+    maxsize=settings.introspection_cache_size,
+    ttl_seconds=settings.introspection_cache_ttl_seconds,
+)
+register_collector("introspection_cache", introspection_cache.stats)
+
+# Сериализованные справочники ролей и прав; сбрасываются после изменения ролей.
+catalog_cache: TTLCache[str, CachedBody] = TTLCache(maxsize=8, ttl_seconds=settings.catalog_cache_ttl_seconds)
+register_collector("catalog_cache", catalog_cache.stats)
+
+# Сериализованные профили `/users/me` по идентификатору пользователя; сбрасываются
+# после изменения пользователя, его ролей и прав.
+profile_cache: TTLCache[int, CachedBody] = TTLCache(
+    maxsize=settings.profile_cache_size,
+    ttl_seconds=settings.profile_cache_ttl_seconds,
+)
+register_collector("profile_cache", profile_cache.stats)
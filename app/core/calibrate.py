@@ -0,0 +1,85 @@
+﻿"""Подбор стоимости хеширования паролей под целевую задержку проверки на текущем хосте."""
+import argparse
+import statistics
+import time
+from passlib.context import CryptContext
+from .config import get_settings
+from .security import make_crypt_context
+
+SAMPLE_PASSWORD = "Calibration-Passw0rd!"
+MAX_BCRYPT_ROUNDS = 20
+MAX_ARGON2_TIME_COST = 20
+
+def measure_verify_ms(context: CryptContext, samples: int) -> float:
+    """Возвращает медианное время проверки пароля в миллисекундах."""
+    hashed = context.hash(SAMPLE_PASSWORD)
+    timings = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        context.verify(SAMPLE_PASSWORD, hashed)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def calibrate_bcrypt(target_ms: float, samples: int) -> int:
+    """Возвращает наибольшее число раундов bcrypt, укладывающееся в целевую задержку."""
+    settings = get_settings()
+    best = 4
+    for rounds in range(4, MAX_BCRYPT_ROUNDS + 1):
+        context = make_crypt_context(
+            "bcrypt",
+            bcrypt_rounds=rounds,
+            argon2_time_cost=settings.argon2_time_cost,
+            argon2_memory_cost=settings.argon2_memory_cost,
+            argon2_parallelism=settings.argon2_parallelism,
+        )
+        latency = measure_verify_ms(context, samples)
+        print(f"bcrypt rounds={rounds}: {latency:.1f} ms")
+        if latency > target_ms:
+            break
+        best = rounds
+    return best
+
+
+def calibrate_argon2(target_ms: float, samples: int, memory_cost: int, parallelism: int) -> int:
+    """Возвращает наибольший `time_cost` argon2id при заданной памяти, укладывающийся в задержку."""
+    settings = get_settings()
+    best = 1
+    for time_cost in range(1, MAX_ARGON2_TIME_COST + 1):
+        context = make_crypt_context(
+            "argon2",
+            bcrypt_rounds=settings.bcrypt_rounds,
+            argon2_time_cost=time_cost,
+            argon2_memory_cost=memory_cost,
+            argon2_parallelism=parallelism,
+        )
+        latency = measure_verify_ms(context, samples)
+        print(f"argon2id time_cost={time_cost} memory_cost={memory_cost}: {latency:.1f} ms")
+        if latency > target_ms:
+            break
+        best = time_cost
+    return best
+
+
+def main() -> None:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Calibrate password hashing cost for this host.")
+    parser.add_argument("--target-ms", type=float, default=250.0, help="Target verify latency.")
+    parser.add_argument("--scheme", choices=["bcrypt", "argon2"], default=settings.password_hash_scheme)
+    parser.add_argument("--samples", type=int, default=5)
+    parser.add_argument("--memory-cost", type=int, default=settings.argon2_memory_cost, help="argon2id KiB.")
+    parser.add_argument("--parallelism", type=int, default=settings.argon2_parallelism)
+    args = parser.parse_args()
+
+    print(f"PASSWORD_HASH_SCHEME={args.scheme}")
+    if args.scheme == "bcrypt":
+        rounds = calibrate_bcrypt(args.target_ms, args.samples)
+        print(f"BCRYPT_ROUNDS={rounds}")
+    else:
+        time_cost = calibrate_argon2(args.target_ms, args.samples, args.memory_cost, args.parallelism)
+        print(f"ARGON2_TIME_COST={time_cost}")
+        print(f"ARGON2_MEMORY_COST={args.memory_cost}")
+        print(f"ARGON2_PARALLELISM={args.parallelism}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+﻿"""Ограниченный пул процессов для ресурсоёмкого хеширования паролей."""
+import asyncio
+import math
+import multiprocessing
+import os
+import threading
+from collections.abc import Callable, Sequence
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, TypeVar
+from .config import get_settings
+from .metrics import register_collector
+
+settings = get_settings()
+T = TypeVar("T")
+
+class HashingOverloaded(Exception):
+    """Очередь хеширования заполнена; запрос следует повторить позже."""
+
+
+def _apply_each(fn: Callable[[Any], T], items: Sequence[Any]) -> list[T]:
+    return [fn(item) for item in items]
+
+
+class HashingPool:
+    """Выполняет функции в отдельных процессах, ограничивая число задач в очереди.
+
+    При `workers == 0` функции выполняются в вызывающем потоке без ограничений.
+    """
+
+    def __init__(self, workers: int, queue_size: int) -> None:
+        self.workers = workers
+        self.queue_size = queue_size
+        self._slots = threading.BoundedSemaphore(workers + queue_size) if workers else None
+        self._executor: ProcessPoolExecutor | None = None
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.rejected = 0
+
+    def submit(self, fn: Callable[..., T], *args: Any) -> "Future[T]":
+        """Ставит задачу в пул или сразу отклоняет её при переполнении очереди."""
+        if self._slots is None:
+            future: Future[T] = Future()
+            try:
+                future.set_result(fn(*args))
+            except Exception as exc:
+                future.set_exception(exc)
+            return future
+
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            raise HashingOverloaded()
+        return self._submit_acquired(fn, *args)
+
+    def map(self, fn: Callable[[Any], T], items: Sequence[Any]) -> list[T]:
+        """Применяет функцию к элементам, разбивая их на порции по числу процессов.
+
+        Каждая порция занимает один слот очереди; при нехватке слотов вызов
+        ждёт их освобождения, а не отклоняется, оставляя место интерактивным запросам.
+        """
+        if self._slots is None:
+            return _apply_each(fn, items)
+
+        size = max(1, math.ceil(len(items) / self.workers))
+        futures = []
+        for start in range(0, len(items), size):
+            self._slots.acquire()
+            futures.append(self._submit_acquired(_apply_each, fn, items[start:start + size]))
+        results: list[T] = []
+        for future in futures:
+            results.extend(future.result())
+        return results
+
+    def _submit_acquired(self, fn: Callable[..., T], *args: Any) -> "Future[T]":
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        with self._lock:
+            self.in_flight += 1
+        future.add_done_callback(self._release)
+        return future
+
+    def run(self, fn: Callable[..., T], *args: Any) -> T:
+        """Выполняет задачу в пуле и дожидается результата."""
+        return self.submit(fn, *args).result()
+
+    async def run_async(self, fn: Callable[..., T], *args: Any) -> T:
+        """Выполняет задачу в пуле, не блокируя цикл событий."""
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+    def stats(self) -> dict[str, int]:
+        """Возвращает размер пула, число задач в работе и отклонённых задач."""
+        return {
+            "workers": self.workers,
+            "queue_size": self.queue_size,
+            "in_flight": self.in_flight,
+            "rejected": self.rejected,
+        }
+
+    def _release(self, future: Future) -> None:
+        with self._lock:
+            self.in_flight -= 1
+        self._slots.release()
+
+    def shutdown(self) -> None:
+        """Останавливает процессы пула; при следующем вызове пул создаётся заново."""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(cancel_futures=True)
+                self._executor = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                    )
+        return self._executor
+
+
+hashing_pool = HashingPool(
+    workers=(
+        settings.password_hash_workers
+        if settings.password_hash_workers is not None
+        else os.cpu_count() or 1
+    ),
+    queue_size=settings.password_hash_queue_size,
+)
+register_collector("password_hashing", hashing_pool.stats)
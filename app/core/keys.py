@@ -0,0 +1,171 @@
+﻿"""Ключи подписи JWT: загрузка, выбор по `kid`, публикация в JWKS и генерация.
+
+Новый ключ: `python -m app.core.keys generate --algorithm EdDSA --dir keys`.
+Набор ключей читается один раз при запуске процесса: добавление ключа или
+смена `JWT_ACTIVE_KID` вступают в силу после перезапуска.
+"""
+import argparse
+import hashlib
+import json
+import secrets
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from functools import lru_cache
+from pathlib import Path
+from typing import Any
+import jwt
+from .config import Settings, get_settings
+
+ASYMMETRIC_ALGORITHMS = ("RS256", "EdDSA")
+RSA_KEY_SIZE = 3072
+
+@dataclass(frozen=True, slots=True)
+class SigningKey:
+    """Ключ с идентификатором: закрытый для подписи, открытый для проверки и публикации."""
+    kid: str
+    private_key: Any
+    public_key: Any
+    jwk: dict[str, Any]
+
+
+class KeyRing:
+    """Набор ключей процесса.
+
+    Подписывает активный ключ; проверяются и публикуются все ключи набора, поэтому
+    токены, подписанные предыдущим ключом, остаются действительными, пока его файл
+    не удалён. Если ключей несколько, активный задаётся только явно через
+    `JWT_ACTIVE_KID`: новый ключ не должен подписывать токены, пока его нет в JWKS,
+    закэшированных клиентами. Для HS256 набор состоит из общего секрета и ничего не
+    публикует.
+    """
+
+    def __init__(self, algorithm: str, keys: list[SigningKey], active_kid: str | None, secret: str) -> None:
+        self.algorithm = algorithm
+        self.secret = secret
+        self._keys = {key.kid: key for key in keys}
+        if algorithm in ASYMMETRIC_ALGORITHMS:
+            if not keys:
+                raise RuntimeError(
+                    f"JWT_ALGORITHM={algorithm} requires keys in JWT_KEYS_DIR "
+                    "(python -m app.core.keys generate)."
+                )
+            if active_kid is None:
+                if len(self._keys) > 1:
+                    raise RuntimeError(
+                        "JWT_KEYS_DIR contains several keys; set JWT_ACTIVE_KID to the one that signs tokens."
+                    )
+                active_kid = next(iter(self._keys))
+            if active_kid not in self._keys:
+                raise RuntimeError(f"JWT_ACTIVE_KID={active_kid!r} is not in JWT_KEYS_DIR.")
+        self.active_kid = active_kid if algorithm in ASYMMETRIC_ALGORITHMS else None
+        self.jwks_json = json.dumps(
+            {"keys": [self._keys[kid].jwk for kid in sorted(self._keys)]}, separators=(",", ":")
+        ).encode()
+        self.jwks_etag = f'"{hashlib.blake2b(self.jwks_json, digest_size=8).hexdigest()}"'
+
+    def signing_key(self) -> tuple[Any, dict[str, str] | None]:
+        """Возвращает ключ подписи и заголовки токена (`kid`)."""
+        if self.active_kid is None:
+            return self.secret, None
+        return self._keys[self.active_kid].private_key, {"kid": self.active_kid}
+
+    def verification_key(self, kid: str | None) -> Any:
+        """Возвращает ключ проверки по `kid` из заголовка токена."""
+        if self.active_kid is None:
+            return self.secret
+        key = self._keys.get(kid or self.active_kid)
+        if key is None:
+            raise jwt.InvalidTokenError("Unknown signing key.")
+        return key.public_key
+
+    def kids(self) -> list[str]:
+        return sorted(self._keys)
+
+
+def public_jwk(kid: str, algorithm: str, public_key: Any) -> dict[str, Any]:
+    """Представляет открытый ключ в виде JWK с `kid`, `alg` и `use`."""
+    from jwt.algorithms import OKPAlgorithm, RSAAlgorithm
+
+    exporter = RSAAlgorithm if algorithm == "RS256" else OKPAlgorithm
+    return {**exporter.to_jwk(public_key, as_dict=True), "kid": kid, "alg": algorithm, "use": "sig"}
+
+
+def load_key(path: Path, algorithm: str) -> SigningKey:
+    """Загружает закрытый ключ PEM; `kid` — имя файла без расширения."""
+    from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+    from cryptography.hazmat.primitives.serialization import load_pem_private_key
+
+    private_key = load_pem_private_key(path.read_bytes(), password=None)
+    expected = rsa.RSAPrivateKey if algorithm == "RS256" else ed25519.Ed25519PrivateKey
+    if not isinstance(private_key, expected):
+        raise RuntimeError(f"{path} is not a key for {algorithm}.")
+    public_key = private_key.public_key()
+    return SigningKey(path.stem, private_key, public_key, public_jwk(path.stem, algorithm, public_key))
+
+
+def load_keyring(settings: Settings) -> KeyRing:
+    """Собирает набор ключей по настройкам `JWT_ALGORITHM`, `JWT_KEYS_DIR` и `JWT_ACTIVE_KID`."""
+    keys = []
+    if settings.jwt_algorithm in ASYMMETRIC_ALGORITHMS and settings.jwt_keys_dir:
+        keys = [
+            load_key(path, settings.jwt_algorithm)
+            for path in sorted(Path(settings.jwt_keys_dir).glob("*.pem"))
+        ]
+    return KeyRing(settings.jwt_algorithm, keys, settings.jwt_active_kid, settings.jwt_secret_key)
+
+
+def generate_key(algorithm: str, directory: Path) -> str:
+    """Создаёт закрытый ключ в `directory` и возвращает его `kid`.
+
+    `kid` начинается с момента создания. Если в каталоге уже есть ключ, новый
+    начинает подписывать токены только после того, как на него укажет `JWT_ACTIVE_KID`.
+    """
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+
+    if algorithm == "RS256":
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=RSA_KEY_SIZE)
+    else:
+        private_key = ed25519.Ed25519PrivateKey.generate()
+    kid = f"{datetime.now(timezone.utc):%Y%m%d%H%M%S}-{secrets.token_hex(4)}"
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{kid}.pem"
+    path.write_bytes(
+        private_key.private_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PrivateFormat.PKCS8,
+            encryption_algorithm=serialization.NoEncryption(),
+        )
+    )
+    path.chmod(0o600)
+    return kid
+
+
+@lru_cache
+def get_keyring() -> KeyRing:
+    return load_keyring(get_settings())
+
+
+def main() -> None:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Manage JWT signing keys.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    generate = commands.add_parser("generate", help="Create a new signing key.")
+    generate.add_argument(
+        "--algorithm",
+        choices=ASYMMETRIC_ALGORITHMS,
+        default=settings.jwt_algorithm if settings.jwt_algorithm in ASYMMETRIC_ALGORITHMS else "EdDSA",
+    )
+    generate.add_argument("--dir", type=Path, default=Path(settings.jwt_keys_dir or "keys"))
+    commands.add_parser("list", help="List keys from JWT_KEYS_DIR and the active one.")
+    args = parser.parse_args()
+
+    if args.command == "generate":
+        print(generate_key(args.algorithm, args.dir))
+    else:
+        keyring = get_keyring()
+        for kid in keyring.kids():
+            print(f"{kid}{' (active)' if kid == keyring.active_kid else ''}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+﻿"""Реестр внутренних метрик: кэши, ограничители и пулы регистрируют здесь свои счётчики.
+
+Здесь же гистограммы длительностей и их вывод в текстовом формате Prometheus.
+"""
+import threading
+from bisect import bisect_left
+from collections.abc import Callable, Iterator, Mapping, Sequence
+
+Collector = Callable[[], Mapping[str, float]]
+
+_collectors: dict[str, Collector] = {}
+
+def register_collector(name: str, collector: Collector) -> None:
+    """Регистрирует функцию, возвращающую текущие значения метрик компонента."""
+    _collectors[name] = collector
+
+
+def collect() -> dict[str, dict[str, float]]:
+    """Снимает значения со всех зарегистрированных источников."""
+    return {name: dict(collector()) for name, collector in _collectors.items()}
+
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Гистограмма с заранее выделенными корзинами.
+
+    Наблюдение — поиск корзины и инкремент под собственной блокировкой
+    гистограммы, без выделения памяти.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self) -> tuple[list[int], float, int]:
+        """Возвращает накопленные значения по корзинам, сумму и число наблюдений."""
+        with self._lock:
+            counts, total, count = list(self.counts), self.sum, self.count
+        cumulative, running = [], 0
+        for value in counts:
+            running += value
+            cumulative.append(running)
+        return cumulative, total, count
+
+
+TIMED_OPERATIONS = ("password_hash", "password_verify", "jwt_encode", "jwt_decode", "db_query")
+timings = {operation: Histogram() for operation in TIMED_OPERATIONS}
+
+
+class RequestMetrics:
+    """Гистограммы длительности HTTP-запросов по шаблону маршрута, методу и статусу."""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.buckets = tuple(buckets)
+        self._series: dict[tuple[str, str, int], Histogram] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, route: str, method: str, status: int, seconds: float) -> None:
+        key = (route, method, status)
+        histogram = self._series.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._series.setdefault(key, Histogram(self.buckets))
+        histogram.observe(seconds)
+
+    def series(self) -> list[tuple[tuple[str, str, int], Histogram]]:
+        with self._lock:
+            return sorted(self._series.items())
+
+
+request_metrics = RequestMetrics()
+
+
+def _escape(value: object) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels: object) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _render_histogram(name: str, histogram: Histogram, **labels: object) -> Iterator[str]:
+    counts, total, count = histogram.snapshot()
+    for bound, value in zip((*histogram.buckets, "+Inf"), counts):
+        yield f"{name}_bucket{_labels(**labels, le=bound)} {value}"
+    yield f"{name}_sum{_labels(**labels)} {total}"
+    yield f"{name}_count{_labels(**labels)} {count}"
+
+
+def render_prometheus() -> str:
+    """Формирует текст в формате Prometheus: запросы, длительности операций и счётчики компонентов."""
+    lines = [
+        "# HELP http_request_duration_seconds HTTP request latency by route template.",
+        "# TYPE http_request_duration_seconds histogram",
+    ]
+    for (route, method, status), histogram in request_metrics.series():
+        lines.extend(
+            _render_histogram("http_request_duration_seconds", histogram, route=route, method=method, status=status)
+        )
+
+    lines.append("# HELP operation_duration_seconds Time spent in hashing, JWT and database calls.")
+    lines.append("# TYPE operation_duration_seconds histogram")
+    for operation, histogram in timings.items():
+        lines.extend(_render_histogram("operation_duration_seconds", histogram, operation=operation))
+
+    for component, values in collect().items():
+        if "hits" in values and "misses" in values:
+            lookups = values["hits"] + values["misses"]
+            values["hit_ratio"] = values["hits"] / lookups if lookups else 0.0
+        for key, value in values.items():
+            name = f"auth_{component}_{key}"
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,206 @@
+﻿"""Кэш эффективных прав пользователей в виде битовых масок."""
+import base64
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Iterable
+from .config import get_settings
+from .metrics import register_collector
+
+settings = get_settings()
+
+# Коды прав, которые создаёт `app.db.seed`; проверки прав в маршрутах ссылаются только на них.
+PERMISSIONS: dict[str, str] = {
+    "manage_users": "Create, update, and deactivate users.",
+    "view_users": "View user directory.",
+    "manage_roles": "Manage role definitions and permissions.",
+    "view_projects": "Access project catalogue.",
+    "edit_projects": "Modify project records.",
+    "view_reports": "Access analytical reports.",
+    "introspect_tokens": "Introspect access tokens on behalf of API gateways.",
+    "check_authorization": "Check permissions of other users on behalf of services.",
+}
+
+class PermissionRegistry:
+    """Назначает кодам прав номера битов.
+
+    После `load` номер бита равен идентификатору права в БД и совпадает во всех
+    процессах, поэтому маску можно передавать в токене. Коды, которых в БД не
+    было, получают номера после известных, но только в пределах процесса.
+    `generation` увеличивается при каждом изменении номеров битов.
+    """
+
+    def __init__(self) -> None:
+        self._bits: dict[str, int] = {}
+        self._next_bit = 0
+        self._lock = threading.Lock()
+        self.loaded = False
+        self.has_local_bits = False
+        self.generation = 0
+
+    @property
+    def stable(self) -> bool:
+        """Совпадают ли номера битов с другими процессами."""
+        return self.loaded and not self.has_local_bits
+
+    def load(self, bits: Iterable[tuple[str, int]]) -> None:
+        """Заменяет номера битов парами «код — идентификатор права в БД»."""
+        with self._lock:
+            self._bits = dict(bits)
+            self._next_bit = max(self._bits.values(), default=-1) + 1
+            self.loaded = True
+            self.has_local_bits = False
+            self.generation += 1
+
+    def bit(self, code: str) -> int:
+        """Возвращает номер бита для кода права, регистрируя новый код при необходимости."""
+        bit = self._bits.get(code)
+        if bit is None:
+            with self._lock:
+                bit = self._bits.get(code)
+                if bit is None:
+                    bit = self._bits[code] = self._next_bit
+                    self._next_bit += 1
+                    self.has_local_bits = True
+                    self.generation += 1
+        return bit
+
+    def find(self, code: str) -> int | None:
+        """Возвращает номер бита известного кода, не регистрируя новые коды."""
+        return self._bits.get(code)
+
+    def mask(self, codes: Iterable[str]) -> int:
+        """Собирает битовую маску для набора кодов."""
+        mask = 0
+        for code in codes:
+            mask |= 1 << self.bit(code)
+        return mask
+
+    def find_mask(self, codes: Iterable[str]) -> int | None:
+        """Собирает маску известных кодов, не регистрируя новые; `None`, если какой-то код неизвестен."""
+        mask = 0
+        for code in codes:
+            bit = self.find(code)
+            if bit is None:
+                return None
+            mask |= 1 << bit
+        return mask
+
+
+class RequiredPermissions:
+    """Набор прав, требуемых маршрутом.
+
+    Коды проверяются при создании, маска пересчитывается только при смене
+    `PermissionRegistry.generation`.
+    """
+
+    def __init__(self, registry: PermissionRegistry, codes: Iterable[str]) -> None:
+        self.codes = tuple(codes)
+        unknown = sorted(set(self.codes) - PERMISSIONS.keys())
+        if unknown:
+            raise ValueError(f"Unknown permission codes: {', '.join(unknown)}")
+        self.registry = registry
+        self._mask: tuple[int, int | None] = (-1, None)
+
+    def allows(self, mask: int) -> bool:
+        """Есть ли в маске пользователя все требуемые права."""
+        generation, required_mask = self._mask
+        if generation != self.registry.generation:
+            generation = self.registry.generation
+            required_mask = self.registry.find_mask(self.codes)
+            self._mask = (generation, required_mask)
+        # Бит, которого нет в реестре, не может быть и в маске пользователя.
+        return required_mask is not None and mask & required_mask == required_mask
+
+
+def encode_mask(mask: int) -> str:
+    """Кодирует маску прав для claim'а `perm`: base64url без выравнивания, младшие биты первыми."""
+    data = mask.to_bytes((mask.bit_length() + 7) // 8, "little")
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def decode_mask(value: str) -> int:
+    """Раскодирует claim `perm` обратно в маску."""
+    return int.from_bytes(base64.urlsafe_b64decode(value + "=" * (-len(value) % 4)), "little")
+
+
+class PermissionCache:
+    """LRU-кэш масок прав по идентификатору пользователя.
+
+    Записи, сохранённые до последнего `bump_version`, считаются устаревшими;
+    TTL ограничивает задержку, с которой изменения из других процессов
+    становятся видны.
+    """
+
+    def __init__(self, registry: PermissionRegistry, maxsize: int, ttl_seconds: float) -> None:
+        self.registry = registry
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[int, tuple[int, float, int]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int) -> int | None:
+        """Возвращает актуальную маску пользователя или `None`."""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                version, expires_at, mask = entry
+                if version == self.version and expires_at > time.monotonic():
+                    self._entries.move_to_end(user_id)
+                    self.hits += 1
+                    return mask
+                del self._entries[user_id]
+            self.misses += 1
+            return None
+
+    def get_or_load(self, user_id: int, loader: Callable[[], Iterable[str] | None]) -> int | None:
+        """Возвращает маску из кэша, а при промахе строит её по кодам от `loader`.
+
+        Если `loader` вернул `None`, результат не кэшируется.
+        """
+        mask = self.get(user_id)
+        if mask is not None:
+            return mask
+        version = self.version
+        codes = loader()
+        if codes is None:
+            return None
+        return self.put(user_id, codes, version)
+
+    def put(self, user_id: int, codes: Iterable[str], version: int) -> int:
+        """Сохраняет маску, если с момента чтения `version` кэш не сбрасывался."""
+        mask = self.registry.mask(codes)
+        with self._lock:
+            if version == self.version:
+                self._entries[user_id] = (version, time.monotonic() + self.ttl_seconds, mask)
+                self._entries.move_to_end(user_id)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        return mask
+
+    def bump_version(self) -> None:
+        """Делает устаревшими все сохранённые записи."""
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
+
+    def stats(self) -> dict[str, int]:
+        """Возвращает счётчики попаданий, промахов и размер кэша."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._entries),
+            "version": self.version,
+        }
+
+
+permission_registry = PermissionRegistry()
+permission_cache = PermissionCache(
+    permission_registry,
+    maxsize=settings.permission_cache_size,
+    ttl_seconds=settings.permission_cache_ttl_seconds,
+)
+register_collector("permission_cache", permission_cache.stats)
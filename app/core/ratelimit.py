@@ -0,0 +1,209 @@
+﻿"""Ограничение частоты попыток входа по скользящему окну с прогрессивной задержкой."""
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from .config import get_settings
+from .metrics import register_collector
+
+settings = get_settings()
+
+class RateLimitBackend(ABC):
+    """Хранилище счётчиков ограничителя; может быть заменено внешним (например, Redis)."""
+
+    @abstractmethod
+    def hit(self, key: str, window: float, now: float) -> float:
+        """Учитывает попытку и возвращает оценку их числа за скользящее окно."""
+
+    @abstractmethod
+    def add_failure(self, key: str, ttl: float, now: float) -> int:
+        """Увеличивает счётчик неудач подряд и возвращает его новое значение."""
+
+    @abstractmethod
+    def block(self, key: str, until: float, now: float) -> None:
+        """Запрещает попытки по ключу до момента `until`."""
+
+    @abstractmethod
+    def blocked_until(self, key: str, now: float) -> float:
+        """Возвращает момент окончания блокировки или `0`."""
+
+    @abstractmethod
+    def reset(self, key: str) -> None:
+        """Сбрасывает попытки в окне, неудачи и блокировку ключа."""
+
+    @abstractmethod
+    def stats(self) -> dict[str, int]:
+        """Возвращает сведения о занимаемой памяти."""
+
+
+class _Counter:
+    __slots__ = ("window_start", "previous", "current", "failures", "blocked_until", "expires_at")
+
+    def __init__(self, now: float) -> None:
+        self.window_start = now
+        self.previous = 0
+        self.current = 0
+        self.failures = 0
+        self.blocked_until = 0.0
+        self.expires_at = now
+
+
+class InMemoryRateLimitBackend(RateLimitBackend):
+    """Счётчики в памяти процесса: приближённое скользящее окно из двух корзин, TTL и LRU-лимит ключей."""
+
+    def __init__(self, max_keys: int) -> None:
+        self.max_keys = max_keys
+        self.evictions = 0
+        self._counters: OrderedDict[str, _Counter] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key: str, window: float, now: float) -> float:
+        with self._lock:
+            counter = self._touch(key, now, window)
+            elapsed = now - counter.window_start
+            if elapsed >= window:
+                counter.previous = counter.current if elapsed < 2 * window else 0
+                counter.current = 0
+                counter.window_start = now - elapsed % window
+                elapsed %= window
+            counter.current += 1
+            return counter.previous * (1 - elapsed / window) + counter.current
+
+    def add_failure(self, key: str, ttl: float, now: float) -> int:
+        with self._lock:
+            counter = self._touch(key, now, ttl)
+            counter.failures += 1
+            return counter.failures
+
+    def block(self, key: str, until: float, now: float) -> None:
+        with self._lock:
+            counter = self._touch(key, now, until - now)
+            counter.blocked_until = until
+
+    def blocked_until(self, key: str, now: float) -> float:
+        counter = self._counters.get(key)
+        if counter is None or counter.expires_at <= now:
+            return 0.0
+        return counter.blocked_until
+
+    def reset(self, key: str) -> None:
+        with self._lock:
+            counter = self._counters.get(key)
+            if counter is not None:
+                counter.previous = 0
+                counter.current = 0
+                counter.failures = 0
+                counter.blocked_until = 0.0
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "keys": len(self._counters),
+            "max_keys": self.max_keys,
+            "evictions": self.evictions,
+        }
+
+    def _touch(self, key: str, now: float, ttl: float) -> _Counter:
+        """Возвращает счётчик ключа, продлевая его TTL и вытесняя устаревшие записи."""
+        counter = self._counters.get(key)
+        if counter is None or counter.expires_at <= now:
+            counter = _Counter(now)
+            self._counters[key] = counter
+        counter.expires_at = max(counter.expires_at, now + ttl)
+        self._counters.move_to_end(key)
+
+        while self._counters:
+            oldest_key, oldest = next(iter(self._counters.items()))
+            if oldest.expires_at > now and len(self._counters) <= self.max_keys:
+                break
+            del self._counters[oldest_key]
+            if oldest.expires_at > now:
+                self.evictions += 1
+        return counter
+
+
+class LoginThrottle:
+    """Политика ограничения входа по адресу почты и IP клиента."""
+
+    def __init__(
+        self,
+        backend: RateLimitBackend,
+        *,
+        window_seconds: float,
+        max_attempts_per_email: int,
+        max_attempts_per_ip: int,
+        free_failures_per_email: int,
+        free_failures_per_ip: int,
+        backoff_base_seconds: float,
+        backoff_max_seconds: float,
+    ) -> None:
+        self.backend = backend
+        self.window_seconds = window_seconds
+        self.max_attempts_per_email = max_attempts_per_email
+        self.max_attempts_per_ip = max_attempts_per_ip
+        self.free_failures_per_email = free_failures_per_email
+        self.free_failures_per_ip = free_failures_per_ip
+        self.backoff_base_seconds = backoff_base_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self.rejected = 0
+
+    def check(self, email: str, client_ip: str) -> int:
+        """Учитывает попытку и возвращает число секунд до следующей разрешённой (`0` — можно)."""
+        now = time.time()
+        keys = self._keys(email, client_ip)
+        blocked_until = max(self.backend.blocked_until(key, now) for key, _, _ in keys)
+        if blocked_until > now:
+            self.rejected += 1
+            return math.ceil(blocked_until - now)
+
+        for key, limit, _ in keys:
+            if self.backend.hit(key, self.window_seconds, now) > limit:
+                self.rejected += 1
+                return math.ceil(self.window_seconds)
+        return 0
+
+    def failure(self, email: str, client_ip: str) -> None:
+        """Фиксирует неудачную попытку и назначает экспоненциально растущую задержку."""
+        now = time.time()
+        ttl = max(self.window_seconds, self.backoff_max_seconds)
+        for key, _, free_failures in self._keys(email, client_ip):
+            failures = self.backend.add_failure(key, ttl, now)
+            if failures > free_failures:
+                exponent = min(failures - free_failures - 1, 32)
+                delay = min(self.backoff_max_seconds, self.backoff_base_seconds * 2**exponent)
+                self.backend.block(key, now + delay, now)
+
+    def success(self, email: str, client_ip: str) -> None:
+        """Сбрасывает окно попыток и задержку для адреса почты после успешного входа.
+
+        Лимит на адрес почты сдерживает подбор пароля, поэтому успешные входы
+        владельца не расходуют его; счётчики IP не сбрасываются.
+        """
+        self.backend.reset(self._email_key(email))
+
+    def stats(self) -> dict[str, int]:
+        return {"rejected": self.rejected, **self.backend.stats()}
+
+    def _keys(self, email: str, client_ip: str) -> tuple[tuple[str, int, int], ...]:
+        """Возвращает ключи с лимитом попыток и числом неудач без задержки."""
+        return (
+            (self._email_key(email), self.max_attempts_per_email, self.free_failures_per_email),
+            (f"ip:{client_ip}", self.max_attempts_per_ip, self.free_failures_per_ip),
+        )
+
+    @staticmethod
+    def _email_key(email: str) -> str:
+        return f"email:{email.lower()}"
+
+
+login_throttle = LoginThrottle(
+    InMemoryRateLimitBackend(max_keys=settings.login_throttle_max_keys),
+    window_seconds=settings.login_window_seconds,
+    max_attempts_per_email=settings.login_max_attempts_per_email,
+    max_attempts_per_ip=settings.login_max_attempts_per_ip,
+    free_failures_per_email=settings.login_free_failures_per_email,
+    free_failures_per_ip=settings.login_free_failures_per_ip,
+    backoff_base_seconds=settings.login_backoff_base_seconds,
+    backoff_max_seconds=settings.login_backoff_max_seconds,
+)
+register_collector("login_throttle", login_throttle.stats)
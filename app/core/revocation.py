@@ -0,0 +1,134 @@
+﻿"""Кэш отзывов токенов в памяти процесса для локальной проверки JWT."""
+import threading
+import time
+from collections.abc import Callable, Iterable
+from datetime import datetime, timedelta, timezone
+from .config import get_settings
+from .metrics import register_collector
+
+settings = get_settings()
+
+# Запас на транзакции, закоммиченные позже своего `updated_at`.
+SYNC_OVERLAP = timedelta(seconds=30)
+
+RevocationLoader = Callable[
+    [datetime | None],
+    tuple[Iterable[tuple[bytes, float]], Iterable[tuple[int, float]], Iterable[tuple[int, int, float]]],
+]
+
+class RevocationCache:
+    """Хранит отозванные токены и деактивированных пользователей с TTL, равным сроку жизни токена.
+
+    Заодно хранит версии авторизации пользователей, изменённые за срок жизни
+    токена: права, встроенные в токен с меньшей версией, не принимаются.
+    """
+
+    def __init__(self, ttl_seconds: float, refresh_seconds: float) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.refresh_seconds = refresh_seconds
+        self._tokens: dict[bytes, float] = {}
+        self._users: dict[int, float] = {}
+        self._authz_versions: dict[int, tuple[int, float]] = {}
+        self._authz_expired_at: float | None = None
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._synced_at: datetime | None = None
+        self._next_refresh = 0.0
+
+    def is_stale(self) -> bool:
+        """Сообщает, пора ли дочитать изменения из БД."""
+        return time.monotonic() >= self._next_refresh
+
+    def is_revoked(self, key: bytes, user_id: int, issued_at: float) -> bool:
+        """Проверяет токен по ключу и по моменту деактивации его владельца."""
+        if key in self._tokens:
+            return True
+        revoked_at = self._users.get(user_id)
+        return revoked_at is not None and issued_at <= revoked_at
+
+    def revoke_token(self, key: bytes, expires_at: float) -> None:
+        """Добавляет токен в список отозванных до истечения его срока."""
+        with self._lock:
+            self._tokens[key] = expires_at
+
+    def revoke_user(self, user_id: int, revoked_at: float) -> None:
+        """Отзывает все токены пользователя, выпущенные не позже `revoked_at`."""
+        with self._lock:
+            if revoked_at > self._users.get(user_id, 0.0):
+                self._users[user_id] = revoked_at
+
+    def accepts_authz_version(self, user_id: int, version: int) -> bool:
+        """Проверяет, что версия авторизации из токена не меньше известной версии пользователя."""
+        if self._authz_expired_at is not None:
+            return False
+        known = self._authz_versions.get(user_id)
+        return known is None or version >= known[0]
+
+    def set_authz_version(self, user_id: int, version: int, changed_at: float) -> None:
+        """Запоминает текущую версию авторизации пользователя."""
+        with self._lock:
+            if version > self._authz_versions.get(user_id, (-1, 0.0))[0]:
+                self._authz_versions[user_id] = (version, changed_at)
+
+    def expire_authz_versions(self) -> None:
+        """Не доверяет встроенным правам до следующей синхронизации и назначает её немедленно.
+
+        Вызывается после коммита изменений прав в этом процессе: новые версии
+        затронутых пользователей станут известны при синхронизации.
+        """
+        with self._lock:
+            self._authz_expired_at = time.monotonic()
+            self._next_refresh = 0.0
+
+    def refresh(self, loader: RevocationLoader) -> None:
+        """Инкрементально подтягивает отзывы из БД; первый запуск блокирует остальные потоки."""
+        blocking = self._synced_at is None
+        if not self._refresh_lock.acquire(blocking=blocking):
+            return
+        try:
+            if not self.is_stale():
+                return
+            started_at = datetime.now(timezone.utc)
+            started = time.monotonic()
+            since = None if self._synced_at is None else self._synced_at - SYNC_OVERLAP
+            tokens, users, authz_versions = loader(since)
+            for key, expires_at in tokens:
+                self.revoke_token(key, expires_at)
+            for user_id, revoked_at in users:
+                self.revoke_user(user_id, revoked_at)
+            for user_id, version, changed_at in authz_versions:
+                self.set_authz_version(user_id, version, changed_at)
+            self._prune(started_at.timestamp())
+            with self._lock:
+                self._synced_at = started_at
+                # Изменение, закоммиченное во время чтения, могло в него не попасть.
+                if self._authz_expired_at is None or self._authz_expired_at < started:
+                    self._authz_expired_at = None
+                    self._next_refresh = time.monotonic() + self.refresh_seconds
+        finally:
+            self._refresh_lock.release()
+
+    def _prune(self, now: float) -> None:
+        """Удаляет записи, которые уже не могут соответствовать действующим токенам."""
+        with self._lock:
+            self._tokens = {key: exp for key, exp in self._tokens.items() if exp > now}
+            horizon = now - self.ttl_seconds
+            self._users = {uid: ts for uid, ts in self._users.items() if ts > horizon}
+            self._authz_versions = {
+                uid: entry for uid, entry in self._authz_versions.items() if entry[1] > horizon
+            }
+
+    def stats(self) -> dict[str, int]:
+        """Возвращает размеры внутренних структур."""
+        return {
+            "revoked_tokens": len(self._tokens),
+            "revoked_users": len(self._users),
+            "authz_versions": len(self._authz_versions),
+        }
+
+
+revocation_cache = RevocationCache(
+    ttl_seconds=settings.access_token_expire_minutes * 60,
+    refresh_seconds=settings.revocation_refresh_seconds,
+)
+register_collector("revocation_cache", revocation_cache.stats)
@@ -1,44 +1,174 @@
 ﻿"""Функции безопасности: хеширование паролей и работа с JWT."""
+import asyncio
+import hashlib
+import secrets
+import time
+from collections.abc import Callable, Mapping, Sequence
 from datetime import datetime, timedelta, timezone
+from functools import lru_cache
 from typing import Any
 import jwt
 from passlib.context import CryptContext
 from .config import get_settings
+from .hashing import hashing_pool
+from .keys import get_keyring
+from .metrics import timings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 settings = get_settings()
 
-def hash_password(password: str) -> str:
-    """Возвращает bcrypt-хеш для переданного пароля."""
+def make_crypt_context(
+    scheme: str,
+    *,
+    bcrypt_rounds: int,
+    argon2_time_cost: int,
+    argon2_memory_cost: int,
+    argon2_parallelism: int,
+) -> CryptContext:
+    """Собирает контекст хеширования с фиксированной стоимостью.
+
+    Хеши другой схемы или с другими параметрами распознаются и помечаются
+    `needs_update`, поэтому смена настроек приводит к постепенному перехешированию.
+    """
+    return CryptContext(
+        schemes=["bcrypt", "argon2"],
+        default=scheme,
+        deprecated="auto",
+        bcrypt__rounds=bcrypt_rounds,
+        bcrypt__min_rounds=bcrypt_rounds,
+        bcrypt__max_rounds=bcrypt_rounds,
+        argon2__type="ID",
+        argon2__time_cost=argon2_time_cost,
+        argon2__min_rounds=argon2_time_cost,
+        argon2__max_rounds=argon2_time_cost,
+        argon2__memory_cost=argon2_memory_cost,
+        argon2__parallelism=argon2_parallelism,
+    )
+
+pwd_context = make_crypt_context(
+    settings.password_hash_scheme,
+    bcrypt_rounds=settings.bcrypt_rounds,
+    argon2_time_cost=settings.argon2_time_cost,
+    argon2_memory_cost=settings.argon2_memory_cost,
+    argon2_parallelism=settings.argon2_parallelism,
+)
+
+def _hash(password: str) -> str:
     return pwd_context.hash(password)
 
-def verify_password(password: str, hashed_password: str) -> bool:
-    """Проверяет соответствие пароля ранее сохранённому хешу."""
+def _verify(password: str, hashed_password: str) -> bool:
     return pwd_context.verify(password, hashed_password)
 
+def _verify_and_update(password: str, hashed_password: str) -> tuple[bool, str | None]:
+    return pwd_context.verify_and_update(password, hashed_password)
+
+def _run_timed(operation: str, fn: Callable[..., Any], *args: Any) -> Any:
+    started = time.perf_counter()
+    try:
+        return hashing_pool.run(fn, *args)
+    finally:
+        timings[operation].observe(time.perf_counter() - started)
+
+async def _run_timed_async(operation: str, fn: Callable[..., Any], *args: Any) -> Any:
+    started = time.perf_counter()
+    try:
+        return await hashing_pool.run_async(fn, *args)
+    finally:
+        timings[operation].observe(time.perf_counter() - started)
+
+def hash_password(password: str) -> str:
+    """Возвращает хеш для переданного пароля, вычисленный в пуле процессов."""
+    return _run_timed("password_hash", _hash, password)
+
+def hash_passwords(passwords: Sequence[str]) -> list[str]:
+    """Хеширует набор паролей порциями во всех процессах пула, ожидая свободных слотов."""
+    return hashing_pool.map(_hash, passwords)
+
+def verify_password(password: str, hashed_password: str) -> bool:
+    """Проверяет соответствие пароля ранее сохранённому хешу в пуле процессов."""
+    return _run_timed("password_verify", _verify, password, hashed_password)
+
+@lru_cache
+def dummy_password_hash() -> str:
+    """Возвращает хеш случайного пароля для проверки при неизвестном адресе почты.
+
+    Так время ответа не выдаёт, зарегистрирован ли адрес.
+    """
+    return hash_password(secrets.token_urlsafe(16))
+
+def verify_and_update_password(password: str, hashed_password: str) -> tuple[bool, str | None]:
+    """Проверяет пароль и возвращает новый хеш, если сохранённый устарел по схеме или стоимости."""
+    return _run_timed("password_verify", _verify_and_update, password, hashed_password)
+
+async def hash_password_async(password: str) -> str:
+    """Асинхронный вариант `hash_password`."""
+    return await _run_timed_async("password_hash", _hash, password)
+
+async def hash_passwords_async(passwords: Sequence[str]) -> list[str]:
+    """Асинхронный вариант `hash_passwords`; ожидание слотов пула вынесено в поток."""
+    return await asyncio.to_thread(hash_passwords, passwords)
+
+async def verify_password_async(password: str, hashed_password: str) -> bool:
+    """Асинхронный вариант `verify_password`."""
+    return await _run_timed_async("password_verify", _verify, password, hashed_password)
+
+async def verify_and_update_password_async(password: str, hashed_password: str) -> tuple[bool, str | None]:
+    """Асинхронный вариант `verify_and_update_password`."""
+    return await _run_timed_async("password_verify", _verify_and_update, password, hashed_password)
+
 def create_access_token(
     subject: str,
     expires_minutes: int | None = None,
     **claims: Any,
 ) -> tuple[str, datetime]:
-    """Создаёт JWT-токен с заданным сроком жизни и дополнительными claim'ами."""
+    """Создаёт JWT-токен с заданным сроком жизни и дополнительными claim'ами.
+
+    Если `jti` не передан в claim'ах, он генерируется автоматически. `iat`
+    записывается с долями секунды: токен, выпущенный в ту же секунду, что и
+    отзыв токенов пользователя, но после него, не считается отозванным.
+    """
     expire_minutes = expires_minutes or settings.access_token_expire_minutes
-    expire_at = datetime.now(timezone.utc) + timedelta(minutes=expire_minutes)
+    issued_at = datetime.now(timezone.utc)
+    expire_at = issued_at + timedelta(minutes=expire_minutes)
 
     payload: dict[str, Any] = {
         "sub": subject,
         "exp": expire_at,
-        "iat": datetime.now(timezone.utc),
+        "iat": issued_at.timestamp(),
+        "jti": new_jti(),
     }
     payload.update(claims)
-    token = jwt.encode(payload, settings.jwt_secret_key, algorithm=settings.jwt_algorithm)
+    started = time.perf_counter()
+    keyring = get_keyring()
+    key, headers = keyring.signing_key()
+    token = jwt.encode(payload, key, algorithm=keyring.algorithm, headers=headers)
+    timings["jwt_encode"].observe(time.perf_counter() - started)
     return token, expire_at
 
 def decode_token(token: str) -> dict[str, Any]:
-    """Декодирует и валидирует JWT, возвращая исходные claim'ы."""
-    return jwt.decode(
-        token,
-        settings.jwt_secret_key,
-        algorithms=[settings.jwt_algorithm],
-        options={"require": ["exp", "iat", "sub"]},
-    )
\ No newline at end of file
+    """Декодирует и валидирует JWT, возвращая исходные claim'ы.
+
+    Ключ проверки выбирается по `kid` из заголовка токена.
+    """
+    started = time.perf_counter()
+    try:
+        keyring = get_keyring()
+        return jwt.decode(
+            token,
+            keyring.verification_key(jwt.get_unverified_header(token).get("kid")),
+            algorithms=[keyring.algorithm],
+            options={"require": ["exp", "iat", "sub"]},
+        )
+    finally:
+        timings["jwt_decode"].observe(time.perf_counter() - started)
+
+def new_jti() -> str:
+    """Генерирует уникальный идентификатор токена для claim'а `jti`."""
+    return secrets.token_urlsafe(16)
+
+def token_digest(value: str) -> bytes:
+    """Возвращает 16-байтовый отпечаток строки для хранения в памяти и индексах."""
+    return hashlib.blake2b(value.encode(), digest_size=16).digest()
+
+def token_key(token: str, claims: Mapping[str, Any]) -> bytes:
+    """Возвращает ключ токена: отпечаток `jti`, а для старых токенов без него — всей строки."""
+    return token_digest(claims.get("jti") or token)
\ No newline at end of file
@@ -0,0 +1,56 @@
+﻿"""Массовый импорт пользователей из файла NDJSON или CSV.
+
+Запуск: `python -m app.db.import_users users.csv --format csv`.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+from ..core.config import get_settings
+from ..core.hashing import hashing_pool
+from ..services.importer import UserImport, commit_user_batch, load_role_ids
+from .session import SessionLocal
+
+def import_file(path: Path, import_format: str, default_role: str, batch_size: int) -> UserImport:
+    """Импортирует файл пакетами и возвращает состояние импорта с отчётом."""
+    with SessionLocal() as db:
+        role_ids = load_role_ids(db)
+        if default_role not in role_ids:
+            raise SystemExit(f"Unknown role: {default_role}")
+        job = UserImport(import_format, role_ids, default_role, batch_size)
+        with path.open(encoding="utf-8-sig", newline="") as source:
+            for line_no, line in enumerate(source, start=1):
+                batch = job.add_line(line_no, line.rstrip("\r\n"))
+                if batch:
+                    commit_user_batch(db, job, batch)
+        commit_user_batch(db, job, job.finish())
+    return job
+
+
+def main() -> None:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Bulk import users from NDJSON or CSV.")
+    parser.add_argument("path", type=Path)
+    parser.add_argument("--format", choices=["ndjson", "csv"], help="Defaults to the file extension.")
+    parser.add_argument("--default-role", default="basic_user")
+    parser.add_argument("--batch-size", type=int, default=settings.users_import_batch_size)
+    args = parser.parse_args()
+
+    import_format = args.format or ("csv" if args.path.suffix.lower() == ".csv" else "ndjson")
+    started = time.perf_counter()
+    try:
+        job = import_file(args.path, import_format, args.default_role, args.batch_size)
+    finally:
+        hashing_pool.shutdown()
+    elapsed = time.perf_counter() - started
+
+    report = job.report()
+    for error in report.errors:
+        print(error.model_dump_json(), file=sys.stderr)
+    print(
+        f"created={report.created} failed={report.failed} "
+        f"elapsed={elapsed:.1f}s rate={report.created / elapsed if elapsed else 0:.0f}/s"
+    )
+
+if __name__ == "__main__":
+    main()
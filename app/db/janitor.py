@@ -0,0 +1,228 @@
+﻿"""Очистка истёкших записей `access_tokens` и `refresh_tokens` и секционирование `access_tokens` в PostgreSQL.
+
+Запуск: `python -m app.db.janitor` (однократно), `python -m app.db.janitor --loop`
+(периодически) или `python -m app.db.janitor --partition` (перевод таблицы
+на секции по `expires_at`).
+
+Секционирование ослабляет ограничения схемы: PostgreSQL требует включать ключ
+секционирования в уникальные индексы, поэтому вместо уникального `digest`
+уникальна пара `(digest, expires_at)`, и БД примет два токена с одним отпечатком
+и разными сроками. Уникальность отпечатка обеспечивает выпуск токенов
+(`new_access_token_id`). DDL проверяется тестом с маркером `postgres`, который
+запускается только при заданном `TEST_POSTGRES_URL`.
+"""
+import argparse
+import asyncio
+import logging
+import math
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from ..core.config import get_settings
+from ..core.metrics import register_collector
+from ..models import AccessToken, RefreshToken
+from ..services.token import purge_expired_tokens
+from .session import SessionLocal, engine
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+PARTITION_PREFIX = "access_tokens_p"
+DEFAULT_PARTITION = "access_tokens_default"
+
+class JanitorStats:
+    """Счётчики запусков очистки и освобождённых строк."""
+
+    def __init__(self) -> None:
+        self.runs = 0
+        self.reclaimed_total = 0
+        self.last_reclaimed = 0
+        self.last_duration_ms = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, reclaimed: int, duration_seconds: float) -> None:
+        with self._lock:
+            self.runs += 1
+            self.reclaimed_total += reclaimed
+            self.last_reclaimed = reclaimed
+            self.last_duration_ms = round(duration_seconds * 1000, 1)
+
+    def stats(self) -> dict[str, float]:
+        return {
+            "runs": self.runs,
+            "reclaimed_total": self.reclaimed_total,
+            "last_reclaimed": self.last_reclaimed,
+            "last_duration_ms": self.last_duration_ms,
+        }
+
+
+janitor_stats = JanitorStats()
+register_collector("token_janitor", janitor_stats.stats)
+
+
+def partition_days_ahead() -> int:
+    """Число дней вперёд, на которые заранее создаются секции; покрывает срок жизни токена."""
+    lifetime_days = math.ceil(settings.access_token_expire_minutes / (24 * 60))
+    return max(settings.token_partition_days_ahead, lifetime_days + 1)
+
+
+def is_partitioned(conn: Connection) -> bool:
+    """Проверяет, секционирована ли `access_tokens` (только PostgreSQL)."""
+    if conn.dialect.name != "postgresql":
+        return False
+    relkind = conn.execute(
+        text("SELECT relkind FROM pg_class WHERE oid = to_regclass('access_tokens')")
+    ).scalar()
+    return relkind == "p"
+
+
+def partition_name(day: date) -> str:
+    return f"{PARTITION_PREFIX}{day:%Y%m%d}"
+
+
+def ensure_token_partitions(conn: Connection, today: date, days_ahead: int) -> None:
+    """Создаёт суточные секции с `today` на `days_ahead` дней вперёд."""
+    for offset in range(days_ahead + 1):
+        day = today + timedelta(days=offset)
+        conn.execute(
+            text(
+                f'CREATE TABLE IF NOT EXISTS "{partition_name(day)}" PARTITION OF access_tokens '
+                f"FOR VALUES FROM ('{day.isoformat()} 00:00+00') TO ('{day + timedelta(days=1)} 00:00+00')"
+            )
+        )
+
+
+def drop_expired_partitions(conn: Connection, before: datetime) -> int:
+    """Удаляет секции, целиком истёкшие до `before`, и возвращает число строк в них."""
+    names = conn.execute(
+        text(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE parent.relname = 'access_tokens'"
+        )
+    ).scalars().all()
+
+    reclaimed = 0
+    for name in names:
+        if not name.startswith(PARTITION_PREFIX):
+            continue
+        day = datetime.strptime(name.removeprefix(PARTITION_PREFIX), "%Y%m%d").replace(tzinfo=timezone.utc)
+        if day + timedelta(days=1) > before:
+            continue
+        reclaimed += conn.execute(text(f'SELECT count(*) FROM "{name}"')).scalar_one()
+        conn.execute(text(f'DROP TABLE "{name}"'))
+    return reclaimed
+
+
+def partition_access_tokens(conn: Connection, today: date, days_ahead: int) -> int:
+    """Переводит `access_tokens` на суточные секции по `expires_at` и возвращает число перенесённых строк.
+
+    Переносятся только действующие токены. Первичный ключ становится `(id, expires_at)`,
+    а уникальность `digest` БД проверяет лишь в паре с `expires_at` (см. описание
+    модуля). Выполняется в окне обслуживания: таблица блокируется целиком.
+    """
+    if conn.dialect.name != "postgresql":
+        raise RuntimeError("Partitioning is supported only on PostgreSQL.")
+    if is_partitioned(conn):
+        return 0
+
+    sequence = conn.execute(text("SELECT pg_get_serial_sequence('access_tokens', 'id')")).scalar()
+    conn.execute(text("ALTER TABLE access_tokens RENAME TO access_tokens_legacy"))
+    if sequence:
+        conn.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY NONE"))
+    conn.execute(
+        text(
+            "CREATE TABLE access_tokens (LIKE access_tokens_legacy INCLUDING DEFAULTS) "
+            "PARTITION BY RANGE (expires_at)"
+        )
+    )
+    conn.execute(text(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF access_tokens DEFAULT"))
+    ensure_token_partitions(conn, today, days_ahead)
+    moved = conn.execute(
+        text("INSERT INTO access_tokens SELECT * FROM access_tokens_legacy WHERE expires_at >= now()")
+    ).rowcount
+    conn.execute(text("DROP TABLE access_tokens_legacy"))
+    if sequence:
+        conn.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY access_tokens.id"))
+
+    conn.execute(text("ALTER TABLE access_tokens ADD PRIMARY KEY (id, expires_at)"))
+    conn.execute(text("CREATE UNIQUE INDEX ix_access_tokens_digest ON access_tokens (digest, expires_at)"))
+    conn.execute(text("CREATE INDEX ix_access_tokens_user_id ON access_tokens (user_id)"))
+    conn.execute(text("CREATE INDEX ix_access_tokens_expires_at ON access_tokens (expires_at)"))
+    conn.execute(
+        text(
+            "ALTER TABLE access_tokens ADD FOREIGN KEY (user_id) "
+            "REFERENCES users (id) ON DELETE CASCADE"
+        )
+    )
+    return moved
+
+
+def run_janitor(batch_size: int | None = None, pause_seconds: float | None = None) -> int:
+    """Удаляет истёкшие токены доступа и refresh-токены и возвращает число освобождённых строк.
+
+    На секционированной таблице сначала создаются будущие секции и удаляются
+    истёкшие целиком; оставшиеся строки удаляются пакетами по `batch_size`
+    с отдельной транзакцией на пакет и паузой между пакетами.
+    """
+    batch_size = batch_size or settings.token_janitor_batch_size
+    pause_seconds = settings.token_janitor_pause_seconds if pause_seconds is None else pause_seconds
+    started = time.perf_counter()
+    now = datetime.now(timezone.utc)
+    reclaimed = 0
+
+    if engine.dialect.name == "postgresql":
+        with engine.begin() as conn:
+            if is_partitioned(conn):
+                ensure_token_partitions(conn, now.date(), partition_days_ahead())
+                reclaimed += drop_expired_partitions(conn, now)
+
+    with SessionLocal() as db:
+        for model in (AccessToken, RefreshToken):
+            while True:
+                deleted = purge_expired_tokens(db, now, batch_size, model)
+                db.commit()
+                reclaimed += deleted
+                if deleted < batch_size:
+                    break
+                time.sleep(pause_seconds)
+
+    duration = time.perf_counter() - started
+    janitor_stats.record(reclaimed, duration)
+    logger.info("Token janitor reclaimed %d rows in %.1f ms.", reclaimed, duration * 1000)
+    return reclaimed
+
+
+async def run_janitor_forever(interval_seconds: float) -> None:
+    """Периодически запускает очистку в отдельном потоке, не блокируя цикл событий."""
+    while True:
+        try:
+            await asyncio.to_thread(run_janitor)
+        except Exception:
+            logger.exception("Token janitor run failed.")
+        await asyncio.sleep(interval_seconds)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Purge expired access tokens.")
+    parser.add_argument("--loop", action="store_true", help="Repeat every TOKEN_JANITOR_INTERVAL_SECONDS.")
+    parser.add_argument("--partition", action="store_true", help="Convert access_tokens to daily partitions.")
+    parser.add_argument("--batch-size", type=int, default=settings.token_janitor_batch_size)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+
+    if args.partition:
+        with engine.begin() as conn:
+            moved = partition_access_tokens(conn, datetime.now(timezone.utc).date(), partition_days_ahead())
+        logger.info("Partitioned access_tokens, moved %d live rows.", moved)
+
+    while True:
+        run_janitor(args.batch_size)
+        if not args.loop:
+            break
+        time.sleep(settings.token_janitor_interval_seconds)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+﻿"""Скрипт обновления схемы существующей БД до текущих моделей."""
+from sqlalchemy import LargeBinary, bindparam, inspect, text
+from sqlalchemy.engine import Connection
+from ..core.security import token_digest
+from ..db.session import engine
+from ..models import AccessToken
+
+BATCH_SIZE = 1000
+
+def migrate_access_token_digests(conn: Connection) -> None:
+    """Переводит `access_tokens` с хранения JWT-строки на отпечаток `digest`.
+
+    Для старых записей отпечаток считается от полной строки токена — так же,
+    как `token_key` поступает с токенами без `jti`.
+    """
+    columns = {column["name"] for column in inspect(conn).get_columns("access_tokens")}
+    if "token" not in columns:
+        return
+
+    if "digest" not in columns:
+        column_type = LargeBinary(16).compile(dialect=conn.dialect)
+        conn.execute(text(f"ALTER TABLE access_tokens ADD COLUMN digest {column_type}"))
+
+    update_stmt = text("UPDATE access_tokens SET digest = :digest WHERE id = :id").bindparams(
+        bindparam("digest", type_=LargeBinary)
+    )
+    while True:
+        rows = conn.execute(
+            text("SELECT id, token FROM access_tokens WHERE digest IS NULL LIMIT :limit"),
+            {"limit": BATCH_SIZE},
+        ).all()
+        if not rows:
+            break
+        conn.execute(update_stmt, [{"id": row.id, "digest": token_digest(row.token)} for row in rows])
+
+    create_access_token_indexes(conn)
+    if conn.dialect.name == "postgresql":
+        conn.execute(text("ALTER TABLE access_tokens ALTER COLUMN digest SET NOT NULL"))
+
+    conn.execute(text("DROP INDEX IF EXISTS ix_access_tokens_token"))
+    conn.execute(text("ALTER TABLE access_tokens DROP COLUMN token"))
+
+
+def create_access_token_indexes(conn: Connection) -> None:
+    """Создаёт недостающие индексы `access_tokens` (по `user_id` и `expires_at` для очистки)."""
+    for index in AccessToken.__table__.indexes:
+        index.create(conn, checkfirst=True)
+
+
+def add_user_authz_version(conn: Connection) -> None:
+    """Добавляет в `users` счётчик версии авторизации."""
+    columns = {column["name"] for column in inspect(conn).get_columns("users")}
+    if "authz_version" not in columns:
+        conn.execute(text("ALTER TABLE users ADD COLUMN authz_version INTEGER NOT NULL DEFAULT 0"))
+
+
+def run_migrations() -> None:
+    if not inspect(engine).has_table("access_tokens"):
+        return
+    with engine.begin() as conn:
+        migrate_access_token_digests(conn)
+        create_access_token_indexes(conn)
+        add_user_authz_version(conn)
+
+if __name__ == "__main__":
+    run_migrations()
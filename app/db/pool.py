@@ -0,0 +1,109 @@
+﻿"""Пулы соединений, учитывающие ожидание выдачи, занятые соединения и тайм-ауты."""
+import threading
+import time
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+
+class PoolStats:
+    """Счётчики выдачи соединений из пула."""
+
+    def __init__(self) -> None:
+        self.checkouts = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.wait_total_ms = 0.0
+        self.wait_max_ms = 0.0
+        self._lock = threading.Lock()
+
+    def record_wait(self, seconds: float, timed_out: bool) -> None:
+        wait_ms = seconds * 1000
+        with self._lock:
+            self.waits += 1
+            self.wait_total_ms += wait_ms
+            self.wait_max_ms = max(self.wait_max_ms, wait_ms)
+            if timed_out:
+                self.timeouts += 1
+
+    def checkout(self) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+
+    def checkin(self) -> None:
+        with self._lock:
+            self.in_use -= 1
+
+
+class InstrumentedPoolMixin:
+    """Замеряет время ожидания соединения и считает тайм-ауты выдачи."""
+
+    stats: PoolStats
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            self.stats.record_wait(time.perf_counter() - started, timed_out)
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+    def metrics(self) -> dict[str, float]:
+        stats = self.stats
+        return {
+            "size": self.size(),
+            "checked_out": self.checkedout(),
+            "overflow": max(self.overflow(), 0),
+            "in_use": stats.in_use,
+            "peak_in_use": stats.peak_in_use,
+            "checkouts": stats.checkouts,
+            "timeouts": stats.timeouts,
+            "wait_total_ms": round(stats.wait_total_ms, 1),
+            "wait_max_ms": round(stats.wait_max_ms, 1),
+            "wait_avg_ms": round(stats.wait_total_ms / stats.waits, 3) if stats.waits else 0.0,
+        }
+
+
+class InstrumentedQueuePool(InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Подписывает счётчики занятых соединений на события выдачи и возврата пула."""
+
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy) -> None:
+        stats = getattr(engine.pool, "stats", None)
+        if stats is not None:
+            stats.checkout()
+
+    @event.listens_for(engine, "checkin")
+    def _on_checkin(dbapi_connection, connection_record) -> None:
+        stats = getattr(engine.pool, "stats", None)
+        if stats is not None:
+            stats.checkin()
+
+
+def pool_metrics(pool: Pool) -> dict[str, float]:
+    """Возвращает метрики пула; для неинструментированных пулов — пустой словарь."""
+    metrics = getattr(pool, "metrics", None)
+    return metrics() if metrics is not None else {}
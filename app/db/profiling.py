@@ -0,0 +1,75 @@
+﻿"""Подсчёт SQL-запросов в пределах HTTP-запроса или блока кода."""
+import re
+from collections import Counter
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+_PLACEHOLDER = r"(?:\?|%s|%\(\w+\)s|\$\d+|:\w+)"
+_PLACEHOLDER_LIST = re.compile(rf"\(\s*{_PLACEHOLDER}(?:\s*,\s*{_PLACEHOLDER})+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+def statement_shape(statement: str) -> str:
+    """Приводит SQL к форме без различий в длине списков параметров и пробелах."""
+    return _PLACEHOLDER_LIST.sub("(?)", _WHITESPACE.sub(" ", statement).strip())
+
+
+class QueryStats:
+    """Число выполненных запросов, суммарное время и повторы одинаковых запросов."""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.duration = 0.0
+        self.statements: Counter[str] = Counter()
+
+    def record(self, statement: str, seconds: float) -> None:
+        self.count += 1
+        self.duration += seconds
+        self.statements[statement] += 1
+
+    def repeated(self, threshold: int) -> list[tuple[str, int]]:
+        """Возвращает формы запросов, повторённые не меньше `threshold` раз."""
+        shapes: Counter[str] = Counter()
+        for statement, count in self.statements.items():
+            shapes[statement_shape(statement)] += count
+        return [(shape, count) for shape, count in shapes.most_common() if count >= threshold]
+
+    def report(self) -> str:
+        lines = [f"{self.count} queries in {self.duration * 1000:.1f} ms"]
+        lines.extend(f"{count:>5}x {shape}" for shape, count in self.repeated(1))
+        return "\n".join(lines)
+
+
+_current: ContextVar[QueryStats | None] = ContextVar("query_stats", default=None)
+_captures: list[QueryStats] = []
+
+
+def record_query(statement: str, seconds: float) -> None:
+    """Учитывает запрос в статистике текущего контекста и в открытых глобальных захватах."""
+    stats = _current.get()
+    if stats is not None:
+        stats.record(statement, seconds)
+    for capture in _captures:
+        capture.record(statement, seconds)
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    """Собирает запросы, выполненные в текущем контексте и порождённых им задачах и потоках."""
+    stats = QueryStats()
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def capture_queries() -> Iterator[QueryStats]:
+    """Собирает все запросы процесса независимо от контекста, например в тестах с `TestClient`."""
+    stats = QueryStats()
+    _captures.append(stats)
+    try:
+        yield stats
+    finally:
+        _captures.remove(stats)
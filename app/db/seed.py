@@ -1,21 +1,13 @@
 ﻿"""Скрипт заполнения БД демонстрационными данными."""
 from sqlalchemy import select
 from ..core.config import get_settings
+from ..core.permissions import PERMISSIONS
 from ..core.security import hash_password
 from ..db.session import Base, engine, session_scope
 from ..models import Permission, Role, User
 
 def seed_permissions(session) -> None:
-    permissions = [
-        ("manage_users", "Create, update, and deactivate users."),
-        ("view_users", "View user directory."),
-        ("manage_roles", "Manage role definitions and permissions."),
-        ("view_projects", "Access project catalogue."),
-        ("edit_projects", "Modify project records."),
-        ("view_reports", "Access analytical reports."),
-    ]
-
-    for code, description in permissions:
+    for code, description in PERMISSIONS.items():
         exists = session.execute(select(Permission).where(Permission.code == code)).scalar_one_or_none()
         if exists is None:
             session.add(Permission(code=code, description=description))
@@ -31,6 +23,8 @@ def seed_roles(session) -> None:
                 "view_projects",
                 "edit_projects",
                 "view_reports",
+                "introspect_tokens",
+                "check_authorization",
             ],
         },
         "manager": {
@@ -41,6 +35,10 @@ def seed_roles(session) -> None:
             "description": "View analytics only.",
             "permissions": ["view_projects", "view_reports"],
         },
+        "gateway": {
+            "description": "Service account of an API gateway or a downstream service.",
+            "permissions": ["introspect_tokens", "check_authorization"],
+        },
         "basic_user": {
             "description": "Default role for newly registered users.",
             "permissions": ["view_projects"],
@@ -1,17 +1,123 @@
 ﻿"""Инструменты подключения к базе данных и управления сессиями SQLAlchemy."""
+import time
+from collections.abc import Callable
 from contextlib import contextmanager
-from typing import Iterator
-from sqlalchemy import create_engine
+from functools import lru_cache
+from typing import Any, Iterator
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase, Session, sessionmaker
-from ..core.config import get_settings
+from ..core.config import Settings, get_settings
+from ..core.metrics import register_collector, timings
+from .pool import InstrumentedAsyncQueuePool, InstrumentedQueuePool, instrument_engine, pool_metrics
+from .profiling import record_query
+
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+psycopg",
+}
+
+def to_async_url(database_url: str) -> str:
+    """Подбирает асинхронный драйвер для синхронной строки подключения."""
+    url = make_url(database_url)
+    driver = ASYNC_DRIVERS.get(url.get_backend_name())
+    if driver is None:
+        raise ValueError(f"No async driver configured for {url.get_backend_name()!r}.")
+    return url.set(drivername=driver).render_as_string(hide_password=False)
+
+def engine_options(database_url: str, settings: Settings, *, is_async: bool = False) -> dict[str, Any]:
+    """Собирает параметры движка: журнал SQL, настройки пула и тайм-аут запросов.
+
+    SQLite в памяти остаётся на пуле по умолчанию: каждое новое соединение
+    открывало бы отдельную пустую базу. Тайм-аут запросов задаётся только для
+    PostgreSQL через параметр соединения `statement_timeout`.
+    """
+    url: URL = make_url(database_url)
+    options: dict[str, Any] = {"echo": settings.db_echo, "pool_pre_ping": settings.db_pool_pre_ping}
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        return options
+
+    options.update(
+        poolclass=InstrumentedAsyncQueuePool if is_async else InstrumentedQueuePool,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+    )
+    if url.get_backend_name() == "postgresql" and settings.db_statement_timeout_ms:
+        options["connect_args"] = {"options": f"-c statement_timeout={settings.db_statement_timeout_ms}"}
+    return options
 
 settings = get_settings()
-engine = create_engine(settings.database_url, echo=settings.debug, future=True)
+engine = create_engine(settings.database_url, future=True, **engine_options(settings.database_url, settings))
+instrument_engine(engine)
+register_collector("db_pool", lambda: pool_metrics(engine.pool))
+
+_QUERY_STARTED_KEY = "query_started"
+
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info[_QUERY_STARTED_KEY] = time.perf_counter()
+
+def _stop_query_timer(conn, cursor, statement, parameters, context, executemany) -> None:
+    started = conn.info.pop(_QUERY_STARTED_KEY, None)
+    if started is not None:
+        elapsed = time.perf_counter() - started
+        timings["db_query"].observe(elapsed)
+        record_query(statement, elapsed)
+
+def time_queries(target) -> None:
+    """Подключает к движку учёт времени и профилирование запросов."""
+    event.listen(target, "before_cursor_execute", _start_query_timer)
+    event.listen(target, "after_cursor_execute", _stop_query_timer)
+
+time_queries(engine)
+
+@lru_cache
+def get_async_engine() -> AsyncEngine:
+    """Создаёт асинхронный движок при первом обращении.
+
+    Строка подключения — `ASYNC_DATABASE_URL` или производная от `DATABASE_URL`.
+    Движок не создаётся при импорте, поэтому синхронный режим работает и с СУБД,
+    для которой асинхронный драйвер не настроен.
+    """
+    url = settings.async_database_url or to_async_url(settings.database_url)
+    async_engine = create_async_engine(url, **engine_options(url, settings, is_async=True))
+    instrument_engine(async_engine.sync_engine)
+    time_queries(async_engine.sync_engine)
+    register_collector("db_async_pool", lambda: pool_metrics(async_engine.sync_engine.pool))
+    return async_engine
 
 class Base(DeclarativeBase):
     pass
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
 
+@lru_cache
+def _async_sessionmaker() -> async_sessionmaker[AsyncSession]:
+    return async_sessionmaker(bind=get_async_engine(), autoflush=False, expire_on_commit=False)
+
+def AsyncSessionLocal() -> AsyncSession:
+    """Открывает асинхронную сессию; асинхронный движок создаётся при первом вызове."""
+    return _async_sessionmaker()()
+
+_AFTER_COMMIT_KEY = "after_commit_callbacks"
+
+def after_commit(session: Session, callback: Callable[[], None]) -> None:
+    """Откладывает вызов `callback` до успешного коммита сессии.
+
+    Для `AsyncSession` передаётся её `sync_session`.
+    """
+    session.info.setdefault(_AFTER_COMMIT_KEY, []).append(callback)
+
+@event.listens_for(Session, "after_commit")
+def _run_after_commit(session: Session) -> None:
+    for callback in session.info.pop(_AFTER_COMMIT_KEY, []):
+        callback()
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_commit(session: Session) -> None:
+    session.info.pop(_AFTER_COMMIT_KEY, None)
+
 @contextmanager
 def session_scope() -> Iterator[Session]:
     """Предоставляет сессию БД с автоматическим коммитом или откатом."""
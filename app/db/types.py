@@ -0,0 +1,24 @@
+﻿"""Типы столбцов, общие для ORM-моделей."""
+from datetime import datetime, timezone
+from typing import Any
+from sqlalchemy import DateTime
+from sqlalchemy.engine import Dialect
+from sqlalchemy.types import TypeDecorator
+
+class UTCDateTime(TypeDecorator[datetime]):
+    """Момент времени с часовым поясом, всегда читаемый как UTC.
+
+    SQLite не хранит часовой пояс и возвращает наивное время; без
+    приведения синхронный и асинхронный режимы отдавали бы одни и те же
+    поля то с поясом, то без него.
+    """
+
+    impl = DateTime(timezone=True)
+    cache_ok = True
+
+    def process_result_value(self, value: Any, dialect: Dialect) -> datetime | None:
+        if value is None:
+            return None
+        if value.tzinfo is None:
+            return value.replace(tzinfo=timezone.utc)
+        return value.astimezone(timezone.utc)
@@ -1,12 +1,23 @@
 ﻿"""Зависимости FastAPI для работы с БД и проверки прав доступа."""
 from collections.abc import Callable, Generator
-from typing import Annotated
-from fastapi import Depends, HTTPException, status
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from functools import lru_cache, partial
+from ipaddress import IPv4Network, IPv6Network, ip_address, ip_network
+from typing import Any, Annotated
+from fastapi import Depends, HTTPException, Query, Request, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, contains_eager
 from . import models
-from .core.security import decode_token
+from .core.config import get_settings
+from .core.permissions import RequiredPermissions, decode_mask, permission_cache, permission_registry
+from .core.revocation import revocation_cache
+from .core.security import decode_token, token_key
 from .db.session import SessionLocal
+from .services import Principal, get_principal, load_revocations
+from .services.user import USER_LIST_FIELDS
+
+settings = get_settings()
 
 def get_db() -> Generator[Session, None, None]:
     """Открывает сессию SQLAlchemy и отдаёт её обработчику FastAPI."""
@@ -17,36 +28,83 @@ def get_db() -> Generator[Session, None, None]:
         db.close()
 
 
-def get_current_token(
+async def get_verified_token(
     credentials: Annotated[HTTPAuthorizationCredentials | None, Depends(HTTPBearer(auto_error=False))],
+) -> tuple[bytes, dict[str, Any]]:
+    """Проверяет подпись токена из заголовка Authorization и возвращает его ключ и claim'ы."""
+    return decode_credentials(credentials)
+
+
+def get_current_token(
+    verified: Annotated[tuple[bytes, dict[str, Any]], Depends(get_verified_token)],
     db: Annotated[Session, Depends(get_db)],
 ) -> models.AccessToken:
     """Проверяет токен из заголовка Authorization и возвращает активную запись."""
+    key, claims = verified
+
+    if settings.token_validation_mode == "local":
+        if revocation_cache.is_stale():
+            revocation_cache.refresh(partial(load_revocations, db))
+        return check_revocation(key, claims)
+
+    token = (
+        db.query(models.AccessToken)
+        .join(models.AccessToken.user)
+        .options(contains_eager(models.AccessToken.user))
+        .filter(models.AccessToken.digest == key, models.AccessToken.is_revoked.is_(False))
+        .one_or_none()
+    )
+    if token is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token revoked or unknown.")
+
+    if not token.user.is_active:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User inactive or not found.")
+
+    return token
+
+
+def decode_credentials(credentials: HTTPAuthorizationCredentials | None) -> tuple[bytes, dict[str, Any]]:
+    """Проверяет подпись и срок действия токена, возвращая его ключ и claim'ы."""
     if credentials is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated.")
 
     token_str = credentials.credentials
     try:
-        decode_token(token_str)
+        claims = decode_token(token_str)
     except Exception:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid or expired token.",
         ) from None
+    return token_key(token_str, claims), claims
 
-    token = (
-        db.query(models.AccessToken)
-        .filter(models.AccessToken.token == token_str, models.AccessToken.is_revoked.is_(False))
-        .one_or_none()
-    )
-    if token is None:
+
+def check_revocation(key: bytes, claims: dict[str, Any]) -> models.AccessToken:
+    """Проверяет отзыв по кэшу процесса и возвращает несохранённую запись токена."""
+    user_id = int(claims["sub"])
+    if revocation_cache.is_revoked(key, user_id, claims["iat"]):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token revoked or unknown.")
 
-    user = db.query(models.User).filter(models.User.id == token.user_id).one_or_none()
-    if user is None or not user.is_active:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User inactive or not found.")
+    return models.AccessToken(
+        digest=key,
+        user_id=user_id,
+        is_revoked=False,
+        expires_at=datetime.fromtimestamp(claims["exp"], timezone.utc),
+    )
 
-    return token
+
+def embedded_permission_mask(user_id: int, claims: dict[str, Any]) -> int | None:
+    """Возвращает маску прав, встроенную в токен, если версия авторизации в нём актуальна.
+
+    Кэш отзывов должен быть синхронизирован вызывающим кодом: он хранит
+    известные версии авторизации пользователей.
+    """
+    encoded = claims.get("perm")
+    if encoded is None or not settings.token_embed_permissions or not permission_registry.stable:
+        return None
+    if not revocation_cache.accepts_authz_version(user_id, claims.get("authz_ver", -1)):
+        return None
+    return decode_mask(encoded)
 
 
 def get_current_user(
@@ -60,6 +118,42 @@ def get_current_user(
     return user
 
 
+def get_current_principal(
+    token: Annotated[models.AccessToken, Depends(get_current_token)],
+    db: Annotated[Session, Depends(get_db)],
+) -> Principal:
+    """Возвращает принципала текущего пользователя без загрузки ORM-модели."""
+    principal = get_principal(db, token.user_id)
+    if principal is None or not principal.is_active:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User inactive or not found.")
+    return principal
+
+
+def get_current_permission_mask(
+    token: Annotated[models.AccessToken, Depends(get_current_token)],
+    verified: Annotated[tuple[bytes, dict[str, Any]], Depends(get_verified_token)],
+    db: Annotated[Session, Depends(get_db)],
+) -> int:
+    """Возвращает битовую маску прав текущего пользователя из токена или из кэша процесса."""
+    _, claims = verified
+    if settings.token_embed_permissions and "perm" in claims and revocation_cache.is_stale():
+        revocation_cache.refresh(partial(load_revocations, db))
+    mask = embedded_permission_mask(token.user_id, claims)
+    if mask is not None:
+        return mask
+
+    def load() -> frozenset[str] | None:
+        principal = get_principal(db, token.user_id)
+        if principal is None or not principal.is_active:
+            return None
+        return principal.permissions
+
+    mask = permission_cache.get_or_load(token.user_id, load)
+    if mask is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User inactive or not found.")
+    return mask
+
+
 def get_current_session(
     token: Annotated[models.AccessToken, Depends(get_current_token)],
     user: Annotated[models.User, Depends(get_current_user)],
@@ -68,14 +162,89 @@ def get_current_session(
     return user, token
 
 
-def require_permissions(*required_codes: str) -> Callable[[models.User], models.User]:
-    """Создаёт зависимость, проверяющую наличие у пользователя нужных прав."""
-    def dependency(user: Annotated[models.User, Depends(get_current_user)]) -> models.User:
-        user_permissions = {perm.code for role in user.roles for perm in role.permissions}
-        if not set(required_codes).issubset(user_permissions):
+def require_permissions(*required_codes: str) -> Callable[[int], int]:
+    """Создаёт зависимость, проверяющую наличие у пользователя нужных прав.
+
+    Неизвестный код права — ошибка при создании зависимости. Маска требуемых
+    прав пересчитывается, только когда меняются номера битов, например при
+    загрузке идентификаторов прав из БД на старте приложения.
+    """
+    required = RequiredPermissions(permission_registry, required_codes)
+
+    def dependency(mask: Annotated[int, Depends(get_current_permission_mask)]) -> int:
+        if not required.allows(mask):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Access forbidden: insufficient permissions.",
             )
-        return user
-    return dependency
\ No newline at end of file
+        return mask
+    return dependency
+
+@lru_cache
+def trusted_proxy_networks(trusted_proxies: str) -> tuple[IPv4Network | IPv6Network, ...]:
+    """Разбирает `TRUSTED_PROXIES`: адреса и подсети через запятую."""
+    return tuple(ip_network(entry.strip()) for entry in trusted_proxies.split(",") if entry.strip())
+
+
+def is_trusted_proxy(address: str) -> bool:
+    try:
+        parsed = ip_address(address)
+    except ValueError:
+        return False
+    return any(parsed in network for network in trusted_proxy_networks(settings.trusted_proxies))
+
+
+def get_client_ip(request: Request) -> str:
+    """Возвращает IP клиента для ограничения попыток входа.
+
+    За обратным прокси из `TRUSTED_PROXIES` клиентом считается крайний правый
+    адрес `X-Forwarded-For`, не принадлежащий доверенным прокси: адреса левее
+    клиент может подставить сам. От остальных адресов заголовок не учитывается.
+    """
+    client_ip = request.client.host if request.client else "unknown"
+    if not is_trusted_proxy(client_ip):
+        return client_ip
+    forwarded = ",".join(request.headers.getlist("x-forwarded-for")).split(",")
+    for address in reversed([address.strip() for address in forwarded if address.strip()]):
+        if not is_trusted_proxy(address):
+            return address
+    return client_ip
+
+
+@dataclass(frozen=True)
+class UserListParams:
+    """Параметры выборки страницы пользователей; имена совпадают с аргументами `list_users`."""
+    fields: tuple[str, ...]
+    limit: int
+    after_id: int | None
+    is_active: bool | None
+    role: str | None
+    email_prefix: str | None
+
+
+def get_user_list_params(
+    cursor: Annotated[int | None, Query(ge=0, description="`next_cursor` предыдущей страницы.")] = None,
+    limit: Annotated[int, Query(ge=1, le=settings.users_page_max_limit)] = settings.users_page_default_limit,
+    is_active: bool | None = None,
+    role: Annotated[str | None, Query(max_length=50)] = None,
+    email_prefix: Annotated[str | None, Query(min_length=1, max_length=255)] = None,
+    fields: Annotated[str | None, Query(description="Поля через запятую, например `id,email,roles`.")] = None,
+) -> UserListParams:
+    """Разбирает параметры пагинации, фильтрации и проекции списка пользователей."""
+    selected = USER_LIST_FIELDS
+    if fields is not None:
+        selected = tuple(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+        unknown = sorted(set(selected) - set(USER_LIST_FIELDS))
+        if unknown or not selected:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unknown fields: {', '.join(unknown)}" if unknown else "No fields selected.",
+            )
+    return UserListParams(
+        fields=selected,
+        limit=limit,
+        after_id=cursor,
+        is_active=is_active,
+        role=role,
+        email_prefix=email_prefix,
+    )
@@ -1,3 +1,3 @@
-﻿from . import admin
+﻿from . import admin, metrics
 
-__all__ = ["admin"]
+__all__ = ["admin", "metrics"]
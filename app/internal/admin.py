@@ -1,8 +1,14 @@
 ﻿"""Внутренние маршруты для управления ролями и разрешениями."""
-from fastapi import APIRouter, Depends, HTTPException, status
+from collections.abc import Sequence
+from typing import Any
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from pydantic import TypeAdapter
 from sqlalchemy.orm import Session
+from ..core.cache import CachedBody, cached_body, catalog_cache
+from ..core.metrics import collect
 from ..dependencies import get_db, require_permissions
 from ..models import Role
+from ..responses import conditional_response
 from ..schemas import PermissionResponse, RoleCreateRequest, RoleResponse, RoleUpdateRequest
 from ..services import (
     create_role,
@@ -14,28 +20,51 @@ from ..services import (
 )
 
 router = APIRouter(prefix="/admin", tags=["admin"])
+PERMISSION_LIST = TypeAdapter(list[PermissionResponse])
+ROLE_LIST = TypeAdapter(list[RoleResponse])
+
+def serialize_catalog(adapter: TypeAdapter, items: Sequence[Any]) -> CachedBody:
+    """Сериализует справочник ролей или прав для `catalog_cache`."""
+    return cached_body(adapter.dump_json(adapter.validate_python(items, from_attributes=True)))
+
 
 @router.get(
     "/permissions",
     response_model=list[PermissionResponse],
     dependencies=[Depends(require_permissions("manage_roles"))],
 )
-def list_permissions_view(db: Session = Depends(get_db)):
-    """Возвращает перечень разрешений для административного интерфейса."""
+def list_permissions_view(request: Request, db: Session = Depends(get_db)):
+    """Возвращает перечень разрешений для административного интерфейса.
 
-    permissions = list_permissions(db)
-    return [PermissionResponse.model_validate(permission) for permission in permissions]
+    Сериализованный ответ кэшируется до изменения ролей, но не дольше
+    `CATALOG_CACHE_TTL_SECONDS`, и подтверждается по `ETag` (If-None-Match → 304).
+    """
+
+    body = catalog_cache.get("permissions")
+    if body is None:
+        version = catalog_cache.version
+        body = serialize_catalog(PERMISSION_LIST, list_permissions(db))
+        catalog_cache.put("permissions", body, version)
+    return conditional_response(request, body)
 
 @router.get(
     "/roles",
     response_model=list[RoleResponse],
     dependencies=[Depends(require_permissions("manage_roles"))],
 )
-def list_roles_view(db: Session = Depends(get_db)):
-    """Возвращает роли вместе с привязанными правами."""
+def list_roles_view(request: Request, db: Session = Depends(get_db)):
+    """Возвращает роли вместе с привязанными правами.
+
+    Сериализованный ответ кэшируется до изменения ролей, но не дольше
+    `CATALOG_CACHE_TTL_SECONDS`, и подтверждается по `ETag` (If-None-Match → 304).
+    """
 
-    roles = list_roles(db)
-    return [RoleResponse.model_validate(role) for role in roles]
+    body = catalog_cache.get("roles")
+    if body is None:
+        version = catalog_cache.version
+        body = serialize_catalog(ROLE_LIST, list_roles(db))
+        catalog_cache.put("roles", body, version)
+    return conditional_response(request, body)
 
 @router.post(
     "/roles",
@@ -117,4 +146,11 @@ def delete_role_view(role_id: int, db: Session = Depends(get_db)):
 
     delete_role(db, role)
     db.commit()
-    return None
\ No newline at end of file
+    return None
+
+
+@router.get("/metrics", dependencies=[Depends(require_permissions("manage_roles"))])
+def metrics_view():
+    """Возвращает внутренние метрики кэшей, пулов и ограничителей процесса."""
+
+    return collect()
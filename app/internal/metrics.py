@@ -0,0 +1,14 @@
+﻿"""Публикация метрик процесса в текстовом формате Prometheus."""
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from ..core.metrics import render_prometheus
+
+PROMETHEUS_MEDIA_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+router = APIRouter(tags=["metrics"])
+
+@router.get("/metrics", include_in_schema=False)
+def prometheus_metrics_view():
+    """Отдаёт гистограммы запросов и операций и счётчики компонентов для Prometheus."""
+
+    return PlainTextResponse(render_prometheus(), media_type=PROMETHEUS_MEDIA_TYPE)
@@ -1,13 +1,83 @@
-﻿from fastapi import FastAPI
-from .internal import admin as internal_admin
-from .routers import auth, resources, users
+﻿import asyncio
+import logging
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager, suppress
+from fastapi import FastAPI, Request, status
+from fastapi.responses import JSONResponse
+from sqlalchemy.exc import SQLAlchemyError
+from .core.config import get_settings
+from .core.hashing import HashingOverloaded, hashing_pool
+from .core.keys import get_keyring
+from .core.security import dummy_password_hash
+from .db.janitor import run_janitor_forever
+from .db.session import get_async_engine, session_scope
+from .internal import metrics
+from .middleware import QueryCountMiddleware, RequestMetricsMiddleware
+from .routers import well_known
+from .services import load_permission_bits
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+def load_permission_registry() -> None:
+    """Загружает идентификаторы прав; без них права не встраиваются в токены."""
+    try:
+        with session_scope() as db:
+            load_permission_bits(db)
+    except SQLAlchemyError:
+        logger.warning("Permission ids not loaded, tokens will not embed permissions.", exc_info=True)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Загружает ключи подписи и права, прогревает пул хеширования, запускает очистку токенов и освобождает ресурсы."""
+    get_keyring()
+    await asyncio.to_thread(load_permission_registry)
+    await asyncio.to_thread(dummy_password_hash)
+    janitor = None
+    if settings.token_janitor_interval_seconds > 0:
+        janitor = asyncio.create_task(run_janitor_forever(settings.token_janitor_interval_seconds))
+    yield
+    if janitor is not None:
+        janitor.cancel()
+        with suppress(asyncio.CancelledError):
+            await janitor
+    hashing_pool.shutdown()
+
+async def hashing_overloaded_handler(request: Request, exc: HashingOverloaded) -> JSONResponse:
+    """Быстро отклоняет запрос, если очередь хеширования паролей заполнена."""
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Password hashing is overloaded, retry later."},
+        headers={"Retry-After": str(settings.password_hash_retry_after_seconds)},
+    )
 
 def create_app() -> FastAPI:
-    app = FastAPI(title="Custom Auth Service")
+    app = FastAPI(title="Custom Auth Service", lifespan=lifespan)
+    app.add_exception_handler(HashingOverloaded, hashing_overloaded_handler)
+    if settings.database_mode == "async":
+        # Ошибка настройки асинхронного подключения обнаруживается при создании приложения.
+        get_async_engine()
+        from .aio.internal import admin as internal_admin
+        from .aio.routers import auth, authz, resources, users
+    else:
+        from .internal import admin as internal_admin
+        from .routers import auth, authz, resources, users
+
     app.include_router(auth.router, prefix="/auth", tags=["auth"])
     app.include_router(users.router, prefix="/users", tags=["users"])
     app.include_router(resources.router, prefix="/resources", tags=["resources"])
+    app.include_router(authz.router, prefix="/authz", tags=["authz"])
     app.include_router(internal_admin.router)
+    app.include_router(well_known.router)
+    if settings.metrics_enabled:
+        app.include_router(metrics.router)
+        app.add_middleware(RequestMetricsMiddleware)
+    if settings.debug or settings.db_query_repeat_warning:
+        app.add_middleware(
+            QueryCountMiddleware,
+            expose_headers=settings.debug,
+            repeat_warning=settings.db_query_repeat_warning,
+        )
 
     return app
 
@@ -0,0 +1,91 @@
+﻿"""ASGI-промежуточные слои наблюдаемости."""
+import logging
+import time
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from .core.metrics import request_metrics
+from .db.profiling import track_queries
+
+logger = logging.getLogger(__name__)
+UNMATCHED_ROUTE = "<unmatched>"
+
+def route_template(scope: Scope) -> str:
+    """Возвращает шаблон сопоставленного маршрута из `scope["route"]`, заполняемого FastAPI."""
+    route = scope.get("route")
+    return route.path if route is not None else UNMATCHED_ROUTE
+
+
+class RequestMetricsMiddleware:
+    """Замеряет длительность HTTP-запросов по шаблону маршрута, методу и статусу.
+
+    Значения параметров пути в метки не попадают: используется шаблон маршрута.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_metrics.observe(
+                route_template(scope),
+                scope["method"],
+                status_code,
+                time.perf_counter() - started,
+            )
+
+
+class QueryCountMiddleware:
+    """Считает SQL-запросы и время в БД для каждого HTTP-запроса.
+
+    При `expose_headers` добавляет к ответу заголовки `X-DB-Query-Count` и
+    `X-DB-Time-Ms` (запросы, выполненные до отправки заголовков). Если одна и та же
+    форма запроса повторилась не меньше `repeat_warning` раз, пишет предупреждение:
+    это типичный признак N+1.
+    """
+
+    def __init__(self, app: ASGIApp, *, expose_headers: bool, repeat_warning: int) -> None:
+        self.app = app
+        self.expose_headers = expose_headers
+        self.repeat_warning = repeat_warning
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with track_queries() as stats:
+
+            async def send_wrapper(message: Message) -> None:
+                if self.expose_headers and message["type"] == "http.response.start":
+                    headers = MutableHeaders(scope=message)
+                    headers["X-DB-Query-Count"] = str(stats.count)
+                    headers["X-DB-Time-Ms"] = f"{stats.duration * 1000:.1f}"
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
+
+        if self.repeat_warning and stats.count >= self.repeat_warning:
+            for shape, count in stats.repeated(self.repeat_warning):
+                logger.warning(
+                    "%s %s repeated a query %d times (%d total): %s",
+                    scope["method"],
+                    route_template(scope),
+                    count,
+                    stats.count,
+                    shape,
+                )
@@ -1,7 +1,7 @@
 ﻿from .associations import RolePermission, UserRole
 from .permission import Permission
 from .role import Role
-from .token import AccessToken
+from .token import AccessToken, RefreshToken
 from .user import User
 
 __all__ = [
@@ -11,4 +11,5 @@ __all__ = [
     "UserRole",
     "RolePermission",
     "AccessToken",
+    "RefreshToken",
 ]
\ No newline at end of file
@@ -1,18 +1,18 @@
 ﻿"""Общие примеси для повторного использования в ORM-моделях."""
 from datetime import datetime, timezone
-from sqlalchemy import DateTime
 from sqlalchemy.orm import Mapped, mapped_column
+from ..db.types import UTCDateTime
 
 class TimestampMixin:
     """Добавляет к модели поля `created_at` и `updated_at` с автоматическим обновлением."""
     created_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True),
+        UTCDateTime,
         default=lambda: datetime.now(timezone.utc),
         nullable=False,
     )
 
     updated_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True),
+        UTCDateTime,
         default=lambda: datetime.now(timezone.utc),
         onupdate=lambda: datetime.now(timezone.utc),
         nullable=False,
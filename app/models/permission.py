@@ -16,5 +16,5 @@ class Permission(Base, TimestampMixin):
         "Role",
         secondary="role_permissions",
         back_populates="permissions",
-        lazy="selectin",
+        lazy="select",
     )
\ No newline at end of file
@@ -13,11 +13,11 @@ class Role(Base, TimestampMixin):
     description: Mapped[str | None] = mapped_column(Text, nullable=True)
     
     users: Mapped[list["User"]] = relationship(
-        "User", secondary="user_roles", back_populates="roles", lazy="joined"
+        "User", secondary="user_roles", back_populates="roles", lazy="select"
     )
     permissions: Mapped[list["Permission"]] = relationship(
         "Permission",
         secondary="role_permissions",
         back_populates="roles",
-        lazy="joined",
+        lazy="select",
     )
\ No newline at end of file
@@ -1,17 +1,36 @@
-﻿"""Модель сохранённого токена доступа."""
+﻿"""Модели сохранённых токенов доступа и refresh-токенов."""
 from datetime import datetime
-from sqlalchemy import Boolean, DateTime, ForeignKey, Integer, String
+from sqlalchemy import Boolean, ForeignKey, Integer, LargeBinary, String
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from ..db.session import Base
+from ..db.types import UTCDateTime
 from .mixins import TimestampMixin
 
 class AccessToken(Base, TimestampMixin):
-    """Хранит выданный JWT-токен и позволяет управлять его отзывом."""
+    """Хранит отпечаток выданного JWT-токена и позволяет управлять его отзывом."""
     __tablename__ = "access_tokens"
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
-    token: Mapped[str] = mapped_column(String(512), unique=True, index=True)
-    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"))
+    digest: Mapped[bytes] = mapped_column(LargeBinary(16), unique=True, index=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), index=True)
     is_revoked: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
-    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
-    user: Mapped["User"] = relationship("User", back_populates="tokens")
\ No newline at end of file
+    expires_at: Mapped[datetime] = mapped_column(UTCDateTime, nullable=False, index=True)
+    user: Mapped["User"] = relationship("User", back_populates="tokens")
+
+
+class RefreshToken(Base, TimestampMixin):
+    """Хранит отпечаток refresh-токена.
+
+    Токены, полученные друг из друга обменом, образуют семейство `family_id`
+    (одну сессию входа); обменянный токен помечается `used_at` и хранится
+    до истечения, чтобы распознать его повторное предъявление.
+    """
+    __tablename__ = "refresh_tokens"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    digest: Mapped[bytes] = mapped_column(LargeBinary(16), unique=True, index=True)
+    family_id: Mapped[str] = mapped_column(String(32), index=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), index=True)
+    used_at: Mapped[datetime | None] = mapped_column(UTCDateTime, nullable=True)
+    is_revoked: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
+    expires_at: Mapped[datetime] = mapped_column(UTCDateTime, nullable=False, index=True)
\ No newline at end of file
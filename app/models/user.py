@@ -16,12 +16,13 @@ class User(Base, TimestampMixin):
     email: Mapped[str] = mapped_column(String(255), unique=True, index=True)
     password_hash: Mapped[str] = mapped_column(Text, nullable=False)
     is_active: Mapped[bool] = mapped_column(Boolean, default=True, nullable=False)
+    authz_version: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
 
     roles: Mapped[list["Role"]] = relationship(
         "Role",
         secondary="user_roles",
         back_populates="users",
-        lazy="joined",
+        lazy="select",
     )
 
     tokens: Mapped[list["AccessToken"]] = relationship(
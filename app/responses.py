@@ -0,0 +1,21 @@
+﻿"""Условные ответы по `ETag` для кэшируемых представлений."""
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.status import HTTP_304_NOT_MODIFIED
+from .core.cache import CachedBody
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Проверяет, совпадает ли `etag` с одним из значений заголовка If-None-Match."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = {value.strip().removeprefix("W/") for value in header.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+def conditional_response(request: Request, body: CachedBody, *, cache_control: str = "private, no-cache") -> Response:
+    """Отдаёт 304 без тела, если у клиента актуальная версия, иначе JSON из кэша."""
+    headers = {"ETag": body.etag, "Cache-Control": cache_control}
+    if etag_matches(request, body.etag):
+        return Response(status_code=HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=body.content, media_type="application/json", headers=headers)
@@ -1,24 +1,82 @@
-﻿"""Маршруты аутентификации: регистрация, вход и выход пользователей."""
+﻿"""Маршруты аутентификации: регистрация, вход, обновление токенов и выход пользователей."""
 from datetime import datetime, timezone
+from typing import Any
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from ..core.security import create_access_token, verify_password
-from ..dependencies import get_current_session, get_db
+from starlette.concurrency import run_in_threadpool
+from ..core.ratelimit import login_throttle
+from ..core.security import (
+    create_access_token,
+    dummy_password_hash,
+    hash_password_async,
+    verify_and_update_password_async,
+    verify_password_async,
+)
+from ..dependencies import get_client_ip, get_current_session, get_db, get_verified_token, require_permissions
 from ..models import AccessToken, User
-from ..schemas import LoginRequest, TokenResponse, UserCreate, UserProfile
-from ..services import create_user, get_role_by_name, get_user_by_email, serialize_user
+from ..schemas import (
+    IntrospectRequest,
+    IntrospectResponse,
+    LoginRequest,
+    RefreshRequest,
+    TokenResponse,
+    UserCreate,
+    UserProfile,
+)
+from ..services import (
+    IntrospectionBatch,
+    create_user,
+    get_role_by_name,
+    get_user_by_email,
+    get_token_principals,
+    get_user_with_roles,
+    new_access_token_id,
+    new_refresh_token,
+    revoke_refresh_family,
+    revoke_token,
+    rotate_refresh_token,
+    serialize_user,
+    token_permission_claims,
+)
 
 router = APIRouter()
 
 
-@router.post("/register", response_model=UserProfile, status_code=status.HTTP_201_CREATED)
-def register_user(payload: UserCreate, db: Session = Depends(get_db)):
-    """Регистрирует нового пользователя и назначает ему базовую роль."""
+def issue_tokens(db: Session, user: User, family_id: str | None = None) -> TokenResponse:
+    """Выпускает access-токен и refresh-токен сессии `family_id` (новой, если она не задана).
 
-    existing = get_user_by_email(db, payload.email)
-    if existing:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered.")
+    Access-токен несёт идентификатор сессии в claim'е `sid`, чтобы выход
+    отзывал и её refresh-токены.
+    """
+    refresh_token, refresh_record = new_refresh_token(user.id, family_id)
+    jti, digest = new_access_token_id(db)
+    permission_claims = token_permission_claims(db, user)
+    token_str, expires_at = create_access_token(
+        subject=str(user.id),
+        jti=jti,
+        sid=refresh_record.family_id,
+        roles=[role.name for role in user.roles],
+        **permission_claims,
+    )
+    db.add_all([AccessToken(digest=digest, user_id=user.id, expires_at=expires_at), refresh_record])
+
+    expires_in = max(0, int((expires_at - datetime.now(timezone.utc)).total_seconds()))
+    return TokenResponse(access_token=token_str, expires_in=expires_in, refresh_token=refresh_token)
+
+
+def find_user(db: Session, email: str) -> User | None:
+    """Ищет пользователя и освобождает соединение на время работы пула хеширования.
+
+    Загруженные атрибуты остаются доступны; перед изменением объект снова
+    добавляется в сессию.
+    """
+    user = get_user_by_email(db, email)
+    db.close()
+    return user
 
+
+def save_new_user(db: Session, payload: UserCreate, password_hash: str) -> UserProfile:
+    """Создаёт пользователя с базовой ролью и уже вычисленным хешем пароля."""
     default_role = get_role_by_name(db, "basic_user")
     if default_role is None:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Default role missing.")
@@ -31,43 +89,126 @@ def register_user(payload: UserCreate, db: Session = Depends(get_db)):
         email=payload.email,
         password=payload.password,
         roles=[default_role],
+        password_hash=password_hash,
     )
     db.commit()
     db.refresh(user)
     return serialize_user(user)
 
 
+def complete_login(db: Session, user: User, new_hash: str | None) -> TokenResponse:
+    """Сохраняет пересчитанный хеш пароля и выдаёт пару токенов."""
+    db.add(user)
+    if new_hash is not None:
+        user.password_hash = new_hash
+    response = issue_tokens(db, user)
+    db.commit()
+    return response
+
+
+# Регистрация и вход — асинхронные маршруты: ожидание пула хеширования не
+# занимает поток из пула AnyIO, и хеширование не вытесняет остальные
+# синхронные маршруты. Обращения к БД выполняются в потоках, а соединение
+# на время хеширования возвращается в пул.
+@router.post("/register", response_model=UserProfile, status_code=status.HTTP_201_CREATED)
+async def register_user(payload: UserCreate, db: Session = Depends(get_db)):
+    """Регистрирует нового пользователя и назначает ему базовую роль."""
+
+    existing = await run_in_threadpool(find_user, db, payload.email)
+    if existing:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered.")
+
+    password_hash = await hash_password_async(payload.password)
+    return await run_in_threadpool(save_new_user, db, payload, password_hash)
+
+
 @router.post("/login", response_model=TokenResponse)
-def login(payload: LoginRequest, db: Session = Depends(get_db)):
-    """Проверяет учётные данные и выдаёт краткоживущий JWT-токен."""
+async def login(
+    payload: LoginRequest,
+    client_ip: str = Depends(get_client_ip),
+    db: Session = Depends(get_db),
+):
+    """Проверяет учётные данные, при необходимости перехеширует пароль и выдаёт пару токенов.
+
+    Попытки ограничиваются по адресу почты и IP клиента до обращения к БД и хешированию.
+    """
 
-    user = get_user_by_email(db, payload.email)
+    retry_after = login_throttle.check(payload.email, client_ip)
+    if retry_after:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many login attempts.",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+    user = await run_in_threadpool(find_user, db, payload.email)
     if user is None or not user.is_active:
+        await verify_password_async(payload.password, dummy_password_hash())
+        login_throttle.failure(payload.email, client_ip)
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials.")
 
-    if not verify_password(payload.password, user.password_hash):
+    verified, new_hash = await verify_and_update_password_async(payload.password, user.password_hash)
+    if not verified:
+        login_throttle.failure(payload.email, client_ip)
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials.")
+    login_throttle.success(payload.email, client_ip)
 
-    token_str, expires_at = create_access_token(subject=str(user.id), roles=[role.name for role in user.roles])
-    token = AccessToken(token=token_str, user_id=user.id, expires_at=expires_at)
-    db.add(token)
-    db.commit()
+    return await run_in_threadpool(complete_login, db, user, new_hash)
 
-    expires_in = max(0, int((expires_at - datetime.now(timezone.utc)).total_seconds()))
-    return TokenResponse(access_token=token_str, expires_in=expires_in)
+
+@router.post("/refresh", response_model=TokenResponse)
+def refresh(payload: RefreshRequest, db: Session = Depends(get_db)):
+    """Обменивает refresh-токен на новую пару токенов той же сессии.
+
+    Каждый refresh-токен действует один раз. Повторное предъявление уже
+    обменянного токена означает его утечку и отзывает все refresh-токены сессии.
+    """
+
+    rotated = rotate_refresh_token(db, payload.refresh_token)
+    if rotated is None:
+        db.commit()
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid refresh token.")
+
+    user_id, family_id = rotated
+    user = get_user_with_roles(db, user_id)
+    if user is None or not user.is_active:
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User inactive or not found.")
+
+    response = issue_tokens(db, user, family_id)
+    db.commit()
+    return response
 
 
 @router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
 def logout(
     session_data: tuple[User, AccessToken] = Depends(get_current_session),
+    verified: tuple[bytes, dict[str, Any]] = Depends(get_verified_token),
     db: Session = Depends(get_db),
 ):
-    """Отзывает текущий токен пользователя и завершает его сессию."""
+    """Отзывает текущий токен пользователя и refresh-токены его сессии."""
 
     _, token = session_data
-    token_db = db.get(AccessToken, token.id)
-    if token_db:
-        token_db.is_revoked = True
-        db.add(token_db)
+    revoke_token(db, token)
+    _, claims = verified
+    if claims.get("sid"):
+        revoke_refresh_family(db, claims["sid"])
     db.commit()
-    return None
\ No newline at end of file
+    return None
+
+
+@router.post(
+    "/introspect",
+    response_model=IntrospectResponse,
+    response_model_exclude_none=True,
+    dependencies=[Depends(require_permissions("introspect_tokens"))],
+)
+def introspect(payload: IntrospectRequest, db: Session = Depends(get_db)):
+    """Проверяет пакет токенов: подпись и срок, отзыв, активность владельца и его права.
+
+    Владельцы всех токенов пакета загружаются одним запросом, результаты
+    кэшируются на `INTROSPECTION_CACHE_TTL_SECONDS` секунд.
+    """
+
+    batch = IntrospectionBatch(payload.tokens)
+    return IntrospectResponse(results=batch.complete(get_token_principals(db, batch.keys)))
\ No newline at end of file
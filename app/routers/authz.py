@@ -0,0 +1,23 @@
+﻿"""Пакетная проверка прав пользователей для других сервисов."""
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+from ..dependencies import get_db, require_permissions
+from ..schemas import AuthzCheckRequest, AuthzCheckResponse
+from ..services import AuthorizationBatch, get_principals
+
+router = APIRouter()
+
+@router.post(
+    "/check",
+    response_model=AuthzCheckResponse,
+    dependencies=[Depends(require_permissions("check_authorization"))],
+)
+def check(payload: AuthzCheckRequest, db: Session = Depends(get_db)):
+    """Возвращает матрицу решений «пользователь — право» для пакета проверок.
+
+    Права всех пользователей пакета, которых нет в кэше процесса, загружаются
+    одним запросом.
+    """
+
+    batch = AuthorizationBatch(payload.checks)
+    return AuthzCheckResponse(results=batch.complete(get_principals(db, batch.subjects)))
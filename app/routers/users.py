@@ -1,33 +1,75 @@
 ﻿"""Маршруты для управления профилем и пользователями."""
-from fastapi import APIRouter, Depends, HTTPException, status
+from dataclasses import asdict
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from ..dependencies import get_current_session, get_db, require_permissions
+from ..core.cache import profile_cache
+from ..core.config import get_settings
+from ..dependencies import (
+    UserListParams,
+    get_current_session,
+    get_current_token,
+    get_db,
+    get_user_list_params,
+    require_permissions,
+)
 from ..models import AccessToken, User
-from ..schemas import UserAdminUpdate, UserProfile, UserSelfUpdate
+from ..responses import conditional_response
+from ..schemas import (
+    UserAdminUpdate,
+    UserBulkDeactivateResult,
+    UserBulkRequest,
+    UserBulkResult,
+    UserBulkRoleRequest,
+    UserImportReport,
+    UserPage,
+    UserProfile,
+    UserSelfUpdate,
+)
 from ..services import (
+    deactivate_users,
     get_roles_by_ids,
     get_user_with_roles,
+    grant_role_to_users,
     list_users,
+    profile_body,
+    revoke_role_from_users,
     serialize_user,
+    set_user_roles,
     soft_delete_user,
     update_user,
 )
+from ..services.export import EXPORT_MEDIA_TYPES, ExportFormat, stream_users
+from ..services.importer import ImportFormat, UserImport, aiter_lines, commit_user_batch, load_role_ids
 
+settings = get_settings()
 router = APIRouter()
 
 
 @router.get("/me", response_model=UserProfile)
 def get_profile(
-    session_data: tuple[User, AccessToken] = Depends(get_current_session),
+    request: Request,
+    token: AccessToken = Depends(get_current_token),
     db: Session = Depends(get_db),
 ):
-    """Возвращает профиль текущего пользователя вместе с ролями."""
+    """Возвращает профиль текущего пользователя вместе с ролями.
 
-    user, _ = session_data
-    db_user = get_user_with_roles(db, user.id)
-    if db_user is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found.")
-    return serialize_user(db_user)
+    Сериализованный профиль кэшируется до изменения пользователя, его ролей
+    или прав, но не дольше `PROFILE_CACHE_TTL_SECONDS`, и подтверждается по
+    `ETag` (If-None-Match → 304). При попадании в кэш обращение к БД нужно
+    только для проверки токена, а с `TOKEN_VALIDATION_MODE=local` — ни одного.
+    """
+
+    body = profile_cache.get(token.user_id)
+    if body is None:
+        version = profile_cache.version
+        db_user = get_user_with_roles(db, token.user_id)
+        if db_user is None or not db_user.is_active:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User inactive or not found.")
+        body = profile_body(db_user)
+        profile_cache.put(token.user_id, body, version)
+    return conditional_response(request, body)
 
 
 @router.patch("/me", response_model=UserProfile)
@@ -69,14 +111,115 @@ def delete_self(
 
 @router.get(
     "",
-    response_model=list[UserProfile],
+    response_model=UserPage,
+    response_model_exclude_unset=True,
+    dependencies=[Depends(require_permissions("view_users"))],
+)
+def list_all_users(
+    params: UserListParams = Depends(get_user_list_params),
+    db: Session = Depends(get_db),
+):
+    """Возвращает страницу пользователей по курсору (требует право `view_users`).
+
+    Для следующей страницы передайте полученный `next_cursor` в параметре `cursor`.
+    """
+
+    items, next_cursor = list_users(db, **asdict(params))
+    return UserPage(items=items, next_cursor=next_cursor)
+
+
+
+@router.get(
+    "/export",
+    response_class=StreamingResponse,
     dependencies=[Depends(require_permissions("view_users"))],
 )
-def list_all_users(db: Session = Depends(get_db)):
-    """Возвращает список всех пользователей (требует право `view_users`)."""
+def export_users(
+    export_format: ExportFormat = Query("ndjson", alias="format"),
+    is_active: bool | None = None,
+    role: str | None = Query(None, max_length=50),
+    email_prefix: str | None = Query(None, min_length=1, max_length=255),
+):
+    """Потоково выгружает всех пользователей с ролями в NDJSON или CSV (требует право `view_users`)."""
+
+    return StreamingResponse(
+        stream_users(export_format, is_active=is_active, role=role, email_prefix=email_prefix),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="users.{export_format}"'},
+    )
 
-    users = list_users(db)
-    return [serialize_user(user) for user in users]
+
+@router.post(
+    "/import",
+    response_model=UserImportReport,
+    dependencies=[Depends(require_permissions("manage_users"))],
+)
+async def import_users_view(
+    request: Request,
+    import_format: ImportFormat = Query("ndjson", alias="format"),
+    default_role: str = Query("basic_user", max_length=50),
+    db: Session = Depends(get_db),
+):
+    """Массово создаёт пользователей из NDJSON или CSV в теле запроса (требует право `manage_users`).
+
+    Тело читается потоково, строки записываются пакетами по `USERS_IMPORT_BATCH_SIZE`
+    с фиксацией после каждого пакета; ошибки возвращаются с номерами строк.
+    """
+
+    role_ids = await run_in_threadpool(load_role_ids, db)
+    if default_role not in role_ids:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unknown role: {default_role}")
+
+    job = UserImport(import_format, role_ids, default_role, settings.users_import_batch_size)
+    async for line_no, line in aiter_lines(request.stream()):
+        batch = job.add_line(line_no, line)
+        if batch:
+            await run_in_threadpool(commit_user_batch, db, job, batch)
+    await run_in_threadpool(commit_user_batch, db, job, job.finish())
+    return job.report()
+
+
+@router.post(
+    "/bulk/grant-role",
+    response_model=UserBulkResult,
+    dependencies=[Depends(require_permissions("manage_users"))],
+)
+def bulk_grant_role(payload: UserBulkRoleRequest, db: Session = Depends(get_db)):
+    """Назначает роль набору пользователей одним запросом (требует право `manage_users`)."""
+
+    if not get_roles_by_ids(db, [payload.role_id]):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Role not found.")
+    affected = grant_role_to_users(db, payload.role_id, sorted(set(payload.user_ids)))
+    db.commit()
+    return UserBulkResult(affected=affected)
+
+
+@router.post(
+    "/bulk/revoke-role",
+    response_model=UserBulkResult,
+    dependencies=[Depends(require_permissions("manage_users"))],
+)
+def bulk_revoke_role(payload: UserBulkRoleRequest, db: Session = Depends(get_db)):
+    """Снимает роль с набора пользователей одним запросом (требует право `manage_users`)."""
+
+    if not get_roles_by_ids(db, [payload.role_id]):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Role not found.")
+    affected = revoke_role_from_users(db, payload.role_id, sorted(set(payload.user_ids)))
+    db.commit()
+    return UserBulkResult(affected=affected)
+
+
+@router.post(
+    "/bulk/deactivate",
+    response_model=UserBulkDeactivateResult,
+    dependencies=[Depends(require_permissions("manage_users"))],
+)
+def bulk_deactivate(payload: UserBulkRequest, db: Session = Depends(get_db)):
+    """Деактивирует набор пользователей и отзывает их токены (требует право `manage_users`)."""
+
+    affected, revoked_tokens = deactivate_users(db, sorted(set(payload.user_ids)))
+    db.commit()
+    return UserBulkDeactivateResult(affected=affected, revoked_tokens=revoked_tokens)
 
 
 @router.patch(
@@ -105,7 +248,7 @@ def admin_update_user(user_id: int, payload: UserAdminUpdate, db: Session = Depe
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Unknown role ids: {', '.join(map(str, missing_ids))}",
             )
-        user.roles = roles
+        set_user_roles(db, user, roles)
 
     db.commit()
     db.refresh(user)
@@ -0,0 +1,24 @@
+﻿"""Открытые ключи подписи токенов для проверки в других сервисах."""
+from fastapi import APIRouter, Request, Response, status
+from ..core.config import get_settings
+from ..core.keys import get_keyring
+from ..responses import etag_matches
+
+router = APIRouter()
+settings = get_settings()
+
+@router.get("/.well-known/jwks.json", include_in_schema=False)
+def jwks_view(request: Request):
+    """Отдаёт JWKS с открытыми ключами всех действующих `kid`.
+
+    Ответ кэшируется клиентами на `JWKS_MAX_AGE_SECONDS` и подтверждается по `ETag`.
+    """
+
+    keyring = get_keyring()
+    headers = {
+        "Cache-Control": f"public, max-age={settings.jwks_max_age_seconds}",
+        "ETag": keyring.jwks_etag,
+    }
+    if etag_matches(request, keyring.jwks_etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=keyring.jwks_json, media_type="application/jwk-set+json", headers=headers)
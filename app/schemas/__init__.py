@@ -1,10 +1,27 @@
-from .auth import LoginRequest, TokenResponse
+﻿from .authz import AuthzCheck, AuthzCheckRequest, AuthzCheckResponse, AuthzDecision
+from .auth import (
+    IntrospectRequest,
+    IntrospectResponse,
+    LoginRequest,
+    RefreshRequest,
+    TokenIntrospection,
+    TokenResponse,
+)
 from .permission import PermissionResponse
 from .role import RoleCreateRequest, RoleResponse, RoleUpdateRequest
 from .user import (
     UserAdminUpdate,
     UserBase,
+    UserBulkDeactivateResult,
+    UserBulkRequest,
+    UserBulkResult,
+    UserBulkRoleRequest,
     UserCreate,
+    UserImportError,
+    UserImportReport,
+    UserImportRow,
+    UserListItem,
+    UserPage,
     UserProfile,
     UserSelfUpdate,
     UserUpdate,
@@ -12,6 +29,14 @@ from .user import (
 
 __all__ = [
     "LoginRequest",
+    "AuthzCheck",
+    "AuthzCheckRequest",
+    "AuthzCheckResponse",
+    "AuthzDecision",
+    "IntrospectRequest",
+    "IntrospectResponse",
+    "TokenIntrospection",
+    "RefreshRequest",
     "TokenResponse",
     "PermissionResponse",
     "RoleResponse",
@@ -23,4 +48,13 @@ __all__ = [
     "UserSelfUpdate",
     "UserAdminUpdate",
     "UserProfile",
+    "UserListItem",
+    "UserPage",
+    "UserImportRow",
+    "UserImportError",
+    "UserImportReport",
+    "UserBulkRequest",
+    "UserBulkRoleRequest",
+    "UserBulkResult",
+    "UserBulkDeactivateResult",
 ]
\ No newline at end of file
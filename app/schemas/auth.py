@@ -1,12 +1,32 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
 
 class LoginRequest(BaseModel):
     """Запрос на вход по адресу электронной почты и паролю."""
     email: EmailStr
     password: str
 
+class RefreshRequest(BaseModel):
+    """Запрос на обмен refresh-токена на новую пару токенов."""
+    refresh_token: str
+
 class TokenResponse(BaseModel):
-    """Ответ с access-токеном и временем его жизни."""
+    """Ответ с access-токеном, временем его жизни и refresh-токеном."""
     access_token: str
     token_type: str = "bearer"
-    expires_in: int
\ No newline at end of file
+    expires_in: int
+    refresh_token: str | None = None
+
+class IntrospectRequest(BaseModel):
+    """Пакет токенов для проверки шлюзом."""
+    tokens: list[str] = Field(..., min_length=1, max_length=100)
+
+class TokenIntrospection(BaseModel):
+    """Результат проверки токена; у недействительного заполнено только `active`."""
+    active: bool
+    sub: str | None = None
+    exp: int | None = None
+    permissions: list[str] | None = None
+
+class IntrospectResponse(BaseModel):
+    """Результаты проверки в порядке токенов запроса."""
+    results: list[TokenIntrospection]
\ No newline at end of file
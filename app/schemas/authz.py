@@ -0,0 +1,23 @@
+﻿from pydantic import BaseModel, Field
+
+class AuthzCheck(BaseModel):
+    """Вопрос «есть ли у пользователя `subject` эти права»."""
+    subject: int
+    permissions: list[str] = Field(..., min_length=1, max_length=100)
+
+class AuthzCheckRequest(BaseModel):
+    """Пакет проверок; один пользователь может встречаться в нескольких проверках."""
+    checks: list[AuthzCheck] = Field(..., min_length=1, max_length=500)
+
+class AuthzDecision(BaseModel):
+    """Решения по одной проверке: код права — разрешено ли оно.
+
+    Для неизвестного или неактивного пользователя `active` ложно и все права запрещены.
+    """
+    subject: int
+    active: bool
+    decisions: dict[str, bool]
+
+class AuthzCheckResponse(BaseModel):
+    """Решения в порядке проверок запроса."""
+    results: list[AuthzDecision]
@@ -51,4 +51,63 @@ class UserProfile(UserBase):
     updated_at: datetime
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class UserListItem(BaseModel):
+    """Элемент списка пользователей; содержит только запрошенные поля."""
+    id: Optional[int] = None
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
+    patronymic: Optional[str] = None
+    email: Optional[EmailStr] = None
+    is_active: Optional[bool] = None
+    roles: Optional[Sequence[str]] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+
+class UserPage(BaseModel):
+    """Страница списка пользователей и курсор следующей страницы."""
+    items: list[UserListItem]
+    next_cursor: Optional[int] = None
+
+
+class UserImportRow(UserBase):
+    """Строка массового импорта пользователей."""
+    email: EmailStr
+    password: str = Field(..., min_length=8, max_length=128)
+    roles: list[str] = Field(default_factory=list)
+
+
+class UserImportError(BaseModel):
+    """Ошибка импорта отдельной строки входного файла."""
+    line: int
+    email: Optional[str] = None
+    error: str
+
+
+class UserImportReport(BaseModel):
+    """Итог массового импорта: число созданных пользователей и ошибки по строкам."""
+    created: int
+    failed: int
+    errors: list[UserImportError]
+
+
+class UserBulkRequest(BaseModel):
+    """Набор пользователей для массовой операции."""
+    user_ids: list[int] = Field(..., min_length=1, max_length=10000)
+
+
+class UserBulkRoleRequest(UserBulkRequest):
+    """Массовое назначение или снятие одной роли."""
+    role_id: int
+
+
+class UserBulkResult(BaseModel):
+    """Число строк, изменённых массовой операцией."""
+    affected: int
+
+
+class UserBulkDeactivateResult(UserBulkResult):
+    """Итог массовой деактивации: пользователи и отозванные токены."""
+    revoked_tokens: int
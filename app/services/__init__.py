@@ -1,12 +1,34 @@
-﻿from .permission import get_permissions_by_codes, list_permissions
+﻿from .permission import get_permissions_by_codes, list_permissions, load_permission_bits
+from .authz import AuthorizationBatch
+from .introspection import IntrospectionBatch
+from .principal import (
+    Principal,
+    get_principal,
+    get_principals,
+    get_token_principals,
+    token_permission_claims,
+)
 from .role import create_role, delete_role, get_role_by_name, get_roles_by_ids, list_roles, update_role
+from .token import (
+    load_revocations,
+    new_access_token_id,
+    new_refresh_token,
+    revoke_refresh_family,
+    revoke_token,
+    rotate_refresh_token,
+)
 from .user import (
     create_user,
+    deactivate_users,
     get_user,
     get_user_by_email,
     get_user_with_roles,
+    grant_role_to_users,
     list_users,
+    profile_body,
+    revoke_role_from_users,
     serialize_user,
+    set_user_roles,
     soft_delete_user,
     update_user,
 )
@@ -19,7 +41,12 @@ __all__ = [
     "list_users",
     "update_user",
     "soft_delete_user",
+    "set_user_roles",
+    "grant_role_to_users",
+    "revoke_role_from_users",
+    "deactivate_users",
     "serialize_user",
+    "profile_body",
     "get_role_by_name",
     "get_roles_by_ids",
     "list_roles",
@@ -28,4 +55,18 @@ __all__ = [
     "delete_role",
     "get_permissions_by_codes",
     "list_permissions",
+    "load_permission_bits",
+    "Principal",
+    "get_principal",
+    "get_principals",
+    "get_token_principals",
+    "IntrospectionBatch",
+    "AuthorizationBatch",
+    "token_permission_claims",
+    "revoke_token",
+    "load_revocations",
+    "new_access_token_id",
+    "new_refresh_token",
+    "revoke_refresh_family",
+    "rotate_refresh_token",
 ]
@@ -0,0 +1,41 @@
+﻿"""Пакетная проверка прав пользователей для других сервисов."""
+from collections.abc import Mapping, Sequence
+from ..core.permissions import permission_cache, permission_registry
+from ..schemas import AuthzCheck, AuthzDecision
+from .principal import Principal
+
+class AuthorizationBatch:
+    """Принимает решения по пакету проверок в два шага.
+
+    Конструктор берёт маски прав из кэша процесса; пользователи, которых там
+    нет (`subjects`), загружаются одним запросом и передаются в `complete`.
+    """
+
+    def __init__(self, checks: Sequence[AuthzCheck]) -> None:
+        self.checks = checks
+        self.masks: dict[int, int | None] = {}
+        self.version = permission_cache.version
+        for check in checks:
+            if check.subject not in self.masks:
+                self.masks[check.subject] = permission_cache.get(check.subject)
+
+    @property
+    def subjects(self) -> list[int]:
+        return [subject for subject, mask in self.masks.items() if mask is None]
+
+    def complete(self, principals: Mapping[int, Principal]) -> list[AuthzDecision]:
+        """Дополняет маски загруженными принципалами и строит решения."""
+        for subject in self.subjects:
+            principal = principals.get(subject)
+            if principal is not None and principal.is_active:
+                self.masks[subject] = permission_cache.put(subject, principal.permissions, self.version)
+
+        results = []
+        for check in self.checks:
+            mask = self.masks[check.subject]
+            decisions = {}
+            for code in check.permissions:
+                bit = permission_registry.find(code) if mask is not None else None
+                decisions[code] = bit is not None and bool(mask >> bit & 1)
+            results.append(AuthzDecision(subject=check.subject, active=mask is not None, decisions=decisions))
+        return results
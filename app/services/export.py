@@ -0,0 +1,123 @@
+﻿"""Потоковая выгрузка каталога пользователей в NDJSON и CSV."""
+import csv
+import io
+import json
+from collections.abc import Iterator, Sequence
+from datetime import datetime
+from typing import Any, Literal
+from sqlalchemy import Row, Select, select
+from sqlalchemy.orm import Session
+from ..core.config import get_settings
+from ..db.session import SessionLocal
+from ..models import Role, User, UserRole
+from .user import USER_LIST_COLUMNS, USER_LIST_FIELDS, filter_users
+
+settings = get_settings()
+ExportFormat = Literal["ndjson", "csv"]
+EXPORT_MEDIA_TYPES: dict[str, str] = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+def user_export_query(
+    *,
+    is_active: bool | None = None,
+    role: str | None = None,
+    email_prefix: str | None = None,
+) -> Select:
+    """Строит запрос пользователей с названиями ролей, упорядоченный по `id`.
+
+    Пользователь с несколькими ролями занимает несколько соседних строк,
+    поэтому выгрузка читается одним проходом курсора без дополнительных запросов.
+    """
+    query = (
+        select(*USER_LIST_COLUMNS.values(), Role.name.label("role_name"))
+        .outerjoin(UserRole, UserRole.user_id == User.id)
+        .outerjoin(Role, Role.id == UserRole.role_id)
+        .order_by(User.id, Role.name)
+    )
+    query = filter_users(query, is_active=is_active, role=role, email_prefix=email_prefix)
+    return query.execution_options(yield_per=settings.users_export_batch_size)
+
+
+class UserRowGrouper:
+    """Склеивает соседние строки `user_export_query` в записи с полным списком ролей."""
+
+    def __init__(self) -> None:
+        self._current: dict[str, Any] | None = None
+
+    def feed(self, rows: Sequence[Row]) -> list[dict[str, Any]]:
+        """Возвращает записи, завершённые этой порцией строк."""
+        records = []
+        for row in rows:
+            current = self._current
+            if current is None or current["id"] != row.id:
+                if current is not None:
+                    records.append(current)
+                current = {name: getattr(row, name) for name in USER_LIST_COLUMNS}
+                current["roles"] = []
+                self._current = current
+            if row.role_name is not None:
+                current["roles"].append(row.role_name)
+        return records
+
+    def finish(self) -> list[dict[str, Any]]:
+        """Возвращает последнюю незавершённую запись."""
+        current, self._current = self._current, None
+        return [current] if current is not None else []
+
+
+def _plain(value: Any) -> Any:
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def encode_header(export_format: ExportFormat) -> str:
+    """Возвращает заголовок выгрузки (строку с именами столбцов для CSV)."""
+    if export_format == "csv":
+        buffer = io.StringIO()
+        csv.writer(buffer).writerow(USER_LIST_FIELDS)
+        return buffer.getvalue()
+    return ""
+
+
+def encode_records(records: Sequence[dict[str, Any]], export_format: ExportFormat) -> str:
+    """Кодирует записи одним фрагментом: по строке на пользователя."""
+    if export_format == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for record in records:
+            writer.writerow(
+                ";".join(record["roles"]) if name == "roles" else _plain(record[name])
+                for name in USER_LIST_FIELDS
+            )
+        return buffer.getvalue()
+    return "".join(
+        json.dumps({name: _plain(record[name]) for name in USER_LIST_FIELDS}, ensure_ascii=False) + "\n"
+        for record in records
+    )
+
+
+def stream_users(
+    export_format: ExportFormat,
+    *,
+    is_active: bool | None = None,
+    role: str | None = None,
+    email_prefix: str | None = None,
+) -> Iterator[str]:
+    """Отдаёт выгрузку фрагментами по мере чтения серверного курсора.
+
+    Генератор открывает собственную сессию: сессия зависимости закрывается
+    до начала передачи тела ответа.
+    """
+    yield encode_header(export_format)
+    grouper = UserRowGrouper()
+    db: Session = SessionLocal()
+    try:
+        result = db.execute(user_export_query(is_active=is_active, role=role, email_prefix=email_prefix))
+        for rows in result.partitions():
+            records = grouper.feed(rows)
+            if records:
+                yield encode_records(records, export_format)
+        yield encode_records(grouper.finish(), export_format)
+    finally:
+        db.close()
@@ -0,0 +1,307 @@
+﻿"""Массовый импорт пользователей из NDJSON и CSV."""
+import codecs
+import csv
+import json
+from collections import deque
+from collections.abc import AsyncIterable, AsyncIterator, Iterable, Sequence
+from dataclasses import dataclass
+from typing import Any, Literal
+from pydantic import ValidationError
+from sqlalchemy import Select, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from ..core.security import hash_passwords
+from ..models import Role, User, UserRole
+from ..schemas import UserImportError, UserImportReport, UserImportRow
+
+ImportFormat = Literal["ndjson", "csv"]
+CONFLICT_ERROR = "Conflicting concurrent write; row was not imported."
+
+@dataclass(slots=True)
+class PendingUser:
+    """Проверенная строка импорта, ожидающая вставки.
+
+    Хеш пароля сохраняется в строке, чтобы повтор вставки после конфликта не
+    хешировал пароль заново.
+    """
+    line: int
+    row: UserImportRow
+    role_ids: list[int]
+    password_hash: str | None = None
+
+
+class _LineFeed:
+    """Строки тела для единственного `csv.reader` импорта; пополняется по мере чтения потока."""
+
+    def __init__(self) -> None:
+        self.lines: deque[str] = deque()
+
+    def __iter__(self) -> "_LineFeed":
+        return self
+
+    def __next__(self) -> str:
+        if not self.lines:
+            raise StopIteration
+        return self.lines.popleft()
+
+
+class UserImport:
+    """Состояние импорта: разбор строк, проверки и накопление пакетов для вставки.
+
+    Не обращается к БД; проверку существующих адресов и вставку выполняет
+    `import_user_batch`, а фиксацию транзакции — вызывающий код.
+    """
+
+    def __init__(
+        self,
+        import_format: ImportFormat,
+        role_ids: dict[str, int],
+        default_role: str,
+        batch_size: int,
+    ) -> None:
+        self.import_format = import_format
+        self.role_ids = role_ids
+        self.default_role = default_role
+        self.batch_size = batch_size
+        self.created = 0
+        self.errors: list[UserImportError] = []
+        self._header: list[str] | None = None
+        self._feed = _LineFeed()
+        self._csv = csv.reader(self._feed)
+        self._quotes = 0
+        self._record_line = 0
+        self._pending: list[PendingUser] = []
+        self._seen: set[str] = set()
+
+    def add_line(self, line_no: int, line: str) -> list[PendingUser] | None:
+        """Разбирает строку файла; возвращает пакет, когда накоплено `batch_size` строк.
+
+        Запись CSV, в поле которой в кавычках есть перевод строки, занимает
+        несколько строк файла: она разбирается, когда число кавычек становится
+        чётным, а ошибки относятся к её первой строке.
+        """
+        if self.import_format == "csv":
+            if not self._feed.lines:
+                if not line.strip():
+                    return None
+                self._record_line = line_no
+            self._feed.lines.append(line + "\n")
+            self._quotes += line.count('"')
+            if self._quotes % 2:
+                return None
+            self._quotes = 0
+            line_no = self._record_line
+        elif not line.strip():
+            return None
+        try:
+            record = self._parse(line)
+        except (ValueError, csv.Error) as exc:
+            self.fail(line_no, None, str(exc))
+            return None
+        if record is None:
+            return None
+
+        email = record.get("email")
+        try:
+            row = UserImportRow.model_validate(record)
+        except ValidationError as exc:
+            self.fail(line_no, email if isinstance(email, str) else None, _describe(exc))
+            return None
+        if row.email in self._seen:
+            self.fail(line_no, row.email, "Duplicate email in import.")
+            return None
+        role_names = row.roles or [self.default_role]
+        unknown = sorted(set(role_names) - self.role_ids.keys())
+        if unknown:
+            self.fail(line_no, row.email, f"Unknown roles: {', '.join(unknown)}")
+            return None
+
+        self._seen.add(row.email)
+        self._pending.append(PendingUser(line_no, row, [self.role_ids[name] for name in role_names]))
+        if len(self._pending) >= self.batch_size:
+            return self.take_batch()
+        return None
+
+    def take_batch(self) -> list[PendingUser]:
+        """Забирает накопленные строки."""
+        batch, self._pending = self._pending, []
+        return batch
+
+    def finish(self) -> list[PendingUser]:
+        """Завершает разбор потока и забирает оставшиеся строки.
+
+        Запись CSV с незакрытой кавычкой в конце файла отмечается ошибкой.
+        """
+        if self._feed.lines:
+            self._feed.lines.clear()
+            self._quotes = 0
+            self.fail(self._record_line, None, "Unterminated quoted field.")
+        return self.take_batch()
+
+    def reject_existing(self, batch: Sequence[PendingUser], existing: set[str]) -> list[PendingUser]:
+        """Отмечает строки с уже зарегистрированными адресами и возвращает остальные."""
+        remaining = []
+        for pending in batch:
+            if pending.row.email in existing:
+                self.fail(pending.line, pending.row.email, "Email already registered.")
+            else:
+                remaining.append(pending)
+        return remaining
+
+    def reject(self, batch: Sequence[PendingUser], error: str) -> None:
+        """Отмечает все строки пакета как неимпортированные."""
+        for pending in batch:
+            self.fail(pending.line, pending.row.email, error)
+
+    def fail(self, line_no: int, email: str | None, error: str) -> None:
+        self.errors.append(UserImportError(line=line_no, email=email, error=error))
+
+    def checkpoint(self) -> int:
+        """Запоминает число ошибок перед вставкой пакета."""
+        return len(self.errors)
+
+    def restore(self, checkpoint: int) -> None:
+        """Отбрасывает ошибки, отмеченные после `checkpoint`, вместе с откатом пакета."""
+        del self.errors[checkpoint:]
+
+    def report(self) -> UserImportReport:
+        """Возвращает итог импорта с ошибками в порядке строк файла."""
+        errors = sorted(self.errors, key=lambda error: error.line)
+        return UserImportReport(created=self.created, failed=len(errors), errors=errors)
+
+    def _parse(self, line: str) -> dict[str, Any] | None:
+        if self.import_format == "ndjson":
+            record = json.loads(line)
+            if not isinstance(record, dict):
+                raise ValueError("Expected a JSON object.")
+            return record
+
+        values = next(self._csv)
+        if self._header is None:
+            self._header = [value.strip() for value in values]
+            return None
+        if len(values) != len(self._header):
+            raise ValueError(f"Expected {len(self._header)} columns, got {len(values)}.")
+        record: dict[str, Any] = dict(zip(self._header, values))
+        if "roles" in record:
+            record["roles"] = [name.strip() for name in record["roles"].split(";") if name.strip()]
+        if not record.get("patronymic"):
+            record["patronymic"] = None
+        return record
+
+
+def _describe(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(map(str, error['loc']))}: {error['msg']}" if error["loc"] else error["msg"]
+        for error in exc.errors()
+    )
+
+
+async def aiter_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[tuple[int, str]]:
+    """Разбивает поток байтов UTF-8 на пронумерованные строки, не буферизуя всё тело."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    buffer = ""
+    line_no = 0
+    async for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            line_no += 1
+            yield line_no, line.rstrip("\r")
+    buffer += decoder.decode(b"", final=True)
+    if buffer:
+        yield line_no + 1, buffer.rstrip("\r")
+
+
+def load_role_ids(db: Session) -> dict[str, int]:
+    """Возвращает идентификаторы ролей по названиям."""
+    return {name: role_id for role_id, name in db.execute(select(Role.id, Role.name))}
+
+
+def existing_emails_query(batch: Sequence[PendingUser]) -> Select:
+    """Строит запрос уже зарегистрированных адресов из пакета."""
+    return select(User.email).where(User.email.in_([pending.row.email for pending in batch]))
+
+
+def unhashed(batch: Sequence[PendingUser]) -> list[PendingUser]:
+    """Возвращает строки пакета, пароли которых ещё не хешированы."""
+    return [pending for pending in batch if pending.password_hash is None]
+
+
+def assign_hashes(batch: Sequence[PendingUser], hashes: Sequence[str]) -> None:
+    """Сохраняет вычисленные хеши паролей в строках пакета."""
+    for pending, password_hash in zip(batch, hashes):
+        pending.password_hash = password_hash
+
+
+def user_rows(batch: Sequence[PendingUser]) -> list[dict[str, Any]]:
+    """Готовит параметры многострочного `INSERT` в `users`; пароли строк уже хешированы."""
+    return [
+        {
+            "first_name": pending.row.first_name,
+            "last_name": pending.row.last_name,
+            "patronymic": pending.row.patronymic,
+            "email": pending.row.email,
+            "password_hash": pending.password_hash,
+            "is_active": True,
+        }
+        for pending in batch
+    ]
+
+
+def user_role_rows(batch: Sequence[PendingUser], user_ids: Iterable[int]) -> list[dict[str, int]]:
+    """Готовит параметры многострочного `INSERT` в `user_roles`."""
+    return [
+        {"user_id": user_id, "role_id": role_id}
+        for pending, user_id in zip(batch, user_ids)
+        for role_id in pending.role_ids
+    ]
+
+
+INSERT_USERS = insert(User).returning(User.id, sort_by_parameter_order=True)
+
+
+def import_user_batch(db: Session, job: UserImport, batch: Sequence[PendingUser]) -> list[PendingUser]:
+    """Проверяет адреса пакета одним запросом, хеширует пароли в пуле и вставляет строки.
+
+    Пароли, хешированные при прошлой попытке, не хешируются повторно.
+    Возвращает вставленные строки; фиксация транзакции остаётся за вызывающим кодом.
+    """
+    if not batch:
+        return []
+    batch = job.reject_existing(batch, set(db.scalars(existing_emails_query(batch))))
+    if not batch:
+        return []
+    pending_hashes = unhashed(batch)
+    if pending_hashes:
+        assign_hashes(pending_hashes, hash_passwords([pending.row.password for pending in pending_hashes]))
+    user_ids = db.scalars(INSERT_USERS, user_rows(batch)).all()
+    links = user_role_rows(batch, user_ids)
+    if links:
+        db.execute(insert(UserRole), links)
+    return batch
+
+
+def commit_user_batch(db: Session, job: UserImport, batch: Sequence[PendingUser]) -> None:
+    """Вставляет и фиксирует пакет; при конфликте откатывает его и повторяет построчно.
+
+    Импорт фиксируется по пакетам, чтобы не держать одну транзакцию на весь файл.
+    Ошибки, отмеченные в откатившемся пакете, отбрасываются: при построчном
+    повторе каждая строка получает ровно один итог, а `CONFLICT_ERROR` —
+    только строки, чья вставка действительно нарушила ограничение. Хеши
+    паролей, вычисленные для пакета, повтор использует повторно.
+    """
+    checkpoint = job.checkpoint()
+    try:
+        inserted = import_user_batch(db, job, batch)
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        job.restore(checkpoint)
+        if len(batch) == 1:
+            job.reject(batch, CONFLICT_ERROR)
+        else:
+            for pending in batch:
+                commit_user_batch(db, job, [pending])
+        return
+    job.created += len(inserted)
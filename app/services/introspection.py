@@ -0,0 +1,59 @@
+﻿"""Пакетная интроспекция токенов для API-шлюзов."""
+import time
+from collections.abc import Mapping, Sequence
+from ..core.cache import introspection_cache
+from ..core.security import decode_token, token_key
+from ..schemas import TokenIntrospection
+from .principal import Principal
+
+INACTIVE = TokenIntrospection(active=False)
+
+class IntrospectionBatch:
+    """Проверяет пакет токенов в два шага.
+
+    Конструктор проверяет подпись и срок каждого токена и берёт готовые
+    результаты из кэша; владельцы оставшихся ключей (`keys`) загружаются
+    одним запросом и передаются в `complete`. Результаты сохраняются в кэш
+    с версией, взятой до загрузки: отзыв, зафиксированный между шагами, не
+    перезаписывается устаревшим `active=True`.
+    """
+
+    def __init__(self, tokens: Sequence[str]) -> None:
+        self.results: list[TokenIntrospection] = []
+        self.pending: dict[bytes, list[tuple[int, dict]]] = {}
+        self.version = introspection_cache.version
+        now = time.time()
+        for index, token in enumerate(tokens):
+            try:
+                claims = decode_token(token)
+            except Exception:
+                self.results.append(INACTIVE)
+                continue
+            key = token_key(token, claims)
+            cached = introspection_cache.get(key)
+            if cached is not None:
+                self.results.append(cached if not cached.active or cached.exp > now else INACTIVE)
+                continue
+            self.results.append(INACTIVE)
+            self.pending.setdefault(key, []).append((index, claims))
+
+    @property
+    def keys(self) -> list[bytes]:
+        return list(self.pending)
+
+    def complete(self, principals: Mapping[bytes, Principal]) -> list[TokenIntrospection]:
+        """Заполняет результаты загруженными принципалами и кэширует их."""
+        for key, entries in self.pending.items():
+            principal = principals.get(key)
+            for index, claims in entries:
+                result = INACTIVE
+                if principal is not None and principal.is_active:
+                    result = TokenIntrospection(
+                        active=True,
+                        sub=claims["sub"],
+                        exp=claims["exp"],
+                        permissions=sorted(principal.permissions),
+                    )
+                self.results[index] = result
+            introspection_cache.put(key, result, self.version)
+        return self.results
@@ -0,0 +1,78 @@
+﻿"""Единая точка сброса кэшей авторизации после изменения прав и учётных записей."""
+import time
+from collections.abc import Iterable
+from sqlalchemy import Update, event, select, update
+from sqlalchemy.orm import Session
+from ..core.cache import catalog_cache, introspection_cache, profile_cache
+from ..core.permissions import permission_cache
+from ..core.revocation import revocation_cache
+from ..db.session import after_commit
+from ..models import User, UserRole
+
+_PENDING_KEY = "auth_invalidation"
+
+def invalidate_auth(db: Session, *, deactivated_user_ids: Iterable[int] = ()) -> None:
+    """Сбрасывает кэши авторизации после коммита текущей транзакции.
+
+    Сколько бы изменений ни было сделано в транзакции, кэш прав сбрасывается
+    один раз, а токены всех деактивированных пользователей отзываются в кэше
+    отзывов одним вызовом. Права, встроенные в токены, не принимаются до
+    следующей синхронизации кэша отзывов, которая узнаёт новые версии
+    авторизации (их увеличивает `bump_authz_version_statement`). Для
+    `AsyncSession` передаётся её `sync_session`.
+    """
+    pending = db.info.get(_PENDING_KEY)
+    if pending is None:
+        pending = db.info[_PENDING_KEY] = set()
+        after_commit(db, lambda: _apply(db.info.pop(_PENDING_KEY, set())))
+    pending.update(deactivated_user_ids)
+
+
+def invalidate_catalog(db: Session) -> None:
+    """Сбрасывает кэш справочника ролей и прав после коммита текущей транзакции.
+
+    Для `AsyncSession` передаётся её `sync_session`.
+    """
+    after_commit(db, catalog_cache.bump_version)
+
+
+def invalidate_profile(db: Session, user_id: int) -> None:
+    """Удаляет профиль пользователя из кэша после коммита текущей транзакции.
+
+    Профиль, прочитанный параллельным запросом до коммита, в кэш уже не попадёт.
+    Изменения ролей и прав сбрасывают все профили через `invalidate_auth`.
+    Для `AsyncSession` передаётся её `sync_session`.
+    """
+    after_commit(db, lambda: profile_cache.pop(user_id))
+
+
+def bump_authz_version_statement(*, user_ids: Iterable[int] = (), role_id: int | None = None) -> Update:
+    """Строит увеличение версии авторизации пользователей по идентификаторам или по роли.
+
+    Для роли запрос выполняется до удаления её связей с пользователями.
+    """
+    if role_id is not None:
+        condition = User.id.in_(select(UserRole.user_id).where(UserRole.role_id == role_id))
+    else:
+        condition = User.id.in_(list(user_ids))
+    return (
+        update(User)
+        .where(condition)
+        .values(authz_version=User.authz_version + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _apply(deactivated_user_ids: set[int]) -> None:
+    revoked_at = time.time()
+    for user_id in deactivated_user_ids:
+        revocation_cache.revoke_user(user_id, revoked_at)
+    permission_cache.bump_version()
+    introspection_cache.bump_version()
+    profile_cache.bump_version()
+    revocation_cache.expire_authz_versions()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
@@ -2,6 +2,7 @@
 from typing import Sequence
 from sqlalchemy import select
 from sqlalchemy.orm import Session
+from ..core.permissions import permission_cache, permission_registry
 from ..models import Permission
 
 def get_permissions_by_codes(db: Session, codes: Sequence[str]) -> list[Permission]:
@@ -12,3 +13,9 @@ def get_permissions_by_codes(db: Session, codes: Sequence[str]) -> list[Permissi
 def list_permissions(db: Session) -> list[Permission]:
     """Возвращает список всех разрешений системы."""
     return list(db.scalars(select(Permission)).all())
+
+
+def load_permission_bits(db: Session) -> None:
+    """Назначает битам масок идентификаторы прав из БД, одинаковые во всех процессах."""
+    permission_registry.load(db.execute(select(Permission.code, Permission.id)).all())
+    permission_cache.bump_version()
@@ -0,0 +1,139 @@
+﻿"""Облегчённая загрузка сведений о пользователе для проверки доступа."""
+from dataclasses import dataclass
+from typing import Any, Sequence
+from sqlalchemy import Row, Select, select
+from sqlalchemy.orm import Session
+from ..core.config import get_settings
+from ..core.permissions import encode_mask, permission_registry
+from ..models import AccessToken, Permission, RolePermission, User, UserRole
+
+settings = get_settings()
+
+@dataclass(frozen=True, slots=True)
+class Principal:
+    """Идентификатор, признак активности и коды прав пользователя."""
+    user_id: int
+    is_active: bool
+    permissions: frozenset[str]
+
+
+def principal_query(user_id: int) -> Select:
+    """Строит запрос признака активности и кодов прав пользователя."""
+    return (
+        select(User.is_active, Permission.code)
+        .distinct()
+        .select_from(User)
+        .outerjoin(UserRole, UserRole.user_id == User.id)
+        .outerjoin(RolePermission, RolePermission.role_id == UserRole.role_id)
+        .outerjoin(Permission, Permission.id == RolePermission.permission_id)
+        .where(User.id == user_id)
+    )
+
+
+def principal_from_rows(user_id: int, rows: Sequence[Row]) -> Principal | None:
+    """Собирает принципала из строк `principal_query`."""
+    if not rows:
+        return None
+    return Principal(
+        user_id=user_id,
+        is_active=rows[0].is_active,
+        permissions=frozenset(code for _, code in rows if code is not None),
+    )
+
+
+def get_principal(db: Session, user_id: int) -> Principal | None:
+    """Загружает принципала одним запросом без построения ORM-графа ролей."""
+    return principal_from_rows(user_id, db.execute(principal_query(user_id)).all())
+
+
+def principals_query(user_ids: Sequence[int]) -> Select:
+    """Строит запрос признака активности и кодов прав сразу для нескольких пользователей."""
+    return (
+        select(User.id, User.is_active, Permission.code)
+        .distinct()
+        .select_from(User)
+        .outerjoin(UserRole, UserRole.user_id == User.id)
+        .outerjoin(RolePermission, RolePermission.role_id == UserRole.role_id)
+        .outerjoin(Permission, Permission.id == RolePermission.permission_id)
+        .where(User.id.in_(user_ids))
+    )
+
+
+def principals_from_batch_rows(rows: Sequence[Row]) -> dict[int, Principal]:
+    """Группирует строки `principals_query` в принципалов по идентификатору пользователя."""
+    active: dict[int, bool] = {}
+    codes: dict[int, set[str]] = {}
+    for user_id, is_active, code in rows:
+        active[user_id] = is_active
+        bucket = codes.setdefault(user_id, set())
+        if code is not None:
+            bucket.add(code)
+    return {
+        user_id: Principal(user_id=user_id, is_active=is_active, permissions=frozenset(codes[user_id]))
+        for user_id, is_active in active.items()
+    }
+
+
+def get_principals(db: Session, user_ids: Sequence[int]) -> dict[int, Principal]:
+    """Загружает принципалов нескольких пользователей одним запросом."""
+    if not user_ids:
+        return {}
+    return principals_from_batch_rows(db.execute(principals_query(user_ids)).all())
+
+
+def token_principals_query(keys: Sequence[bytes]) -> Select:
+    """Строит запрос владельцев неотозванных токенов по их ключам вместе с кодами прав."""
+    return (
+        select(AccessToken.digest, AccessToken.user_id, User.is_active, Permission.code)
+        .distinct()
+        .select_from(AccessToken)
+        .join(User, User.id == AccessToken.user_id)
+        .outerjoin(UserRole, UserRole.user_id == User.id)
+        .outerjoin(RolePermission, RolePermission.role_id == UserRole.role_id)
+        .outerjoin(Permission, Permission.id == RolePermission.permission_id)
+        .where(AccessToken.digest.in_(keys), AccessToken.is_revoked.is_(False))
+    )
+
+
+def token_principals_from_rows(rows: Sequence[Row]) -> dict[bytes, Principal]:
+    """Группирует строки `token_principals_query` в принципалов по ключу токена."""
+    owners: dict[bytes, tuple[int, bool]] = {}
+    codes: dict[bytes, set[str]] = {}
+    for digest, user_id, is_active, code in rows:
+        owners[digest] = (user_id, is_active)
+        bucket = codes.setdefault(digest, set())
+        if code is not None:
+            bucket.add(code)
+    return {
+        digest: Principal(user_id=user_id, is_active=is_active, permissions=frozenset(codes[digest]))
+        for digest, (user_id, is_active) in owners.items()
+    }
+
+
+def get_token_principals(db: Session, keys: Sequence[bytes]) -> dict[bytes, Principal]:
+    """Загружает принципалов владельцев токенов одним запросом на весь пакет."""
+    if not keys:
+        return {}
+    return token_principals_from_rows(db.execute(token_principals_query(keys)).all())
+
+
+def permission_claims(principal: Principal | None, authz_version: int) -> dict[str, Any]:
+    """Строит claim'ы `perm` (маска прав) и `authz_ver` для токена.
+
+    Возвращает пустой словарь, если номера битов процесса не совпадают с
+    другими процессами: права не загружены из БД или среди них есть коды,
+    появившиеся после загрузки.
+    """
+    if principal is None or not permission_registry.stable:
+        return {}
+    mask = permission_registry.mask(principal.permissions)
+    if not permission_registry.stable:
+        return {}
+    return {"perm": encode_mask(mask), "authz_ver": authz_version}
+
+
+def token_permission_claims(db: Session, user: User) -> dict[str, Any]:
+    """Возвращает claim'ы прав для токена пользователя, если их встраивание включено."""
+    if not settings.token_embed_permissions:
+        return {}
+    return permission_claims(get_principal(db, user.id), user.authz_version)
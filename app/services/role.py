@@ -3,6 +3,7 @@ from typing import Sequence
 from sqlalchemy import select
 from sqlalchemy.orm import Session, selectinload
 from ..models import Permission, Role
+from .invalidation import bump_authz_version_statement, invalidate_auth, invalidate_catalog
 
 
 def get_role_by_name(db: Session, role_name: str) -> Role | None:
@@ -36,6 +37,7 @@ def create_role(
     role.permissions = list(permissions)
     db.add(role)
     db.flush()
+    invalidate_catalog(db)
     return role
 
 
@@ -53,11 +55,17 @@ def update_role(
         role.description = description
     if permissions is not None:
         role.permissions = list(permissions)
+        db.execute(bump_authz_version_statement(role_id=role.id))
     db.flush()
+    invalidate_auth(db)
+    invalidate_catalog(db)
     return role
 
 
 def delete_role(db: Session, role: Role) -> None:
     """Удаляет роль из базы данных."""
+    db.execute(bump_authz_version_statement(role_id=role.id))
     db.delete(role)
-    db.flush()
\ No newline at end of file
+    db.flush()
+    invalidate_auth(db)
+    invalidate_catalog(db)
\ No newline at end of file
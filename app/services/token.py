@@ -0,0 +1,181 @@
+﻿"""Сервисные функции для работы с токенами доступа и refresh-токенами."""
+import secrets
+from collections.abc import Sequence
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import Select, Update, delete, exists, select, update
+from sqlalchemy.orm import Session
+from ..core.cache import introspection_cache
+from ..core.config import get_settings
+from ..core.revocation import revocation_cache
+from ..core.security import new_jti, token_digest
+from ..db.session import after_commit
+from ..models import AccessToken, RefreshToken, User
+
+settings = get_settings()
+
+def as_utc(value: datetime) -> datetime:
+    """Дополняет наивное время из SQLite часовым поясом UTC."""
+    return value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)
+
+
+def revoke_token(db: Session, token: AccessToken) -> None:
+    """Помечает токен отозванным и после коммита сообщает об этом кэшу отзывов."""
+    db.execute(
+        update(AccessToken).where(AccessToken.digest == token.digest).values(is_revoked=True)
+    )
+    key = token.digest
+    expires_at = as_utc(token.expires_at).timestamp()
+    after_commit(db, lambda: forget_token(key, expires_at))
+
+
+def forget_token(key: bytes, expires_at: float) -> None:
+    """Сообщает кэшам процесса об отзыве токена."""
+    revocation_cache.revoke_token(key, expires_at)
+    introspection_cache.pop(key)
+
+
+def access_token_digest_taken_query(digest: bytes) -> Select:
+    """Строит проверку, занят ли отпечаток access-токена."""
+    return select(exists().where(AccessToken.digest == digest))
+
+
+def new_access_token_id(db: Session) -> tuple[str, bytes]:
+    """Возвращает `jti` нового access-токена и его отпечаток, ещё не занятый в БД.
+
+    На секционированной `access_tokens` (`app.db.janitor`) индекс уникален только
+    в паре `(digest, expires_at)`, поэтому уникальность отпечатка проверяется здесь.
+    """
+    while True:
+        jti = new_jti()
+        digest = token_digest(jti)
+        if not db.scalar(access_token_digest_taken_query(digest)):
+            return jti, digest
+
+
+def new_refresh_token(user_id: int, family_id: str | None = None) -> tuple[str, RefreshToken]:
+    """Создаёт refresh-токен и его запись; без `family_id` начинается новое семейство."""
+    value = secrets.token_urlsafe(32)
+    record = RefreshToken(
+        digest=token_digest(value),
+        family_id=family_id or new_jti(),
+        user_id=user_id,
+        expires_at=datetime.now(timezone.utc) + timedelta(days=settings.refresh_token_expire_days),
+    )
+    return value, record
+
+
+def use_refresh_token_statement(value: str, now: datetime) -> Update:
+    """Строит однократное погашение действующего refresh-токена, возвращающее пользователя и семейство.
+
+    Условие на `used_at` делает обмен атомарным: из одновременных запросов
+    с одним токеном строку получит только один.
+    """
+    return (
+        update(RefreshToken)
+        .where(
+            RefreshToken.digest == token_digest(value),
+            RefreshToken.used_at.is_(None),
+            RefreshToken.is_revoked.is_(False),
+            RefreshToken.expires_at > now,
+        )
+        .values(used_at=now)
+        .returning(RefreshToken.user_id, RefreshToken.family_id)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def reused_refresh_family_statement(value: str) -> Select:
+    """Строит поиск семейства уже погашенного refresh-токена."""
+    return select(RefreshToken.family_id).where(
+        RefreshToken.digest == token_digest(value), RefreshToken.used_at.is_not(None)
+    )
+
+
+def revoke_refresh_tokens_statement(*, family_id: str | None = None, user_ids: Sequence[int] = ()) -> Update:
+    """Строит отзыв refresh-токенов семейства или всех токенов пользователей."""
+    condition = (
+        RefreshToken.family_id == family_id if family_id is not None else RefreshToken.user_id.in_(user_ids)
+    )
+    return (
+        update(RefreshToken)
+        .where(condition, RefreshToken.is_revoked.is_(False))
+        .values(is_revoked=True)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def rotate_refresh_token(db: Session, value: str) -> tuple[int, str] | None:
+    """Гасит refresh-токен и возвращает идентификатор пользователя и семейство.
+
+    Возвращает `None`, если токен неизвестен, истёк или отозван. Повторное
+    предъявление уже погашенного токена означает, что он утёк: всё семейство
+    отзывается, и вызывающий код должен зафиксировать транзакцию.
+    """
+    row = db.execute(use_refresh_token_statement(value, datetime.now(timezone.utc))).first()
+    if row is not None:
+        return row.user_id, row.family_id
+    family_id = db.scalar(reused_refresh_family_statement(value))
+    if family_id is not None:
+        db.execute(revoke_refresh_tokens_statement(family_id=family_id))
+    return None
+
+
+def revoke_refresh_family(db: Session, family_id: str) -> None:
+    """Отзывает refresh-токены сессии, например при выходе."""
+    db.execute(revoke_refresh_tokens_statement(family_id=family_id))
+
+
+def load_revocations(
+    db: Session, since: datetime | None
+) -> tuple[list[tuple[bytes, float]], list[tuple[int, float]], list[tuple[int, int, float]]]:
+    """Читает отозванные токены, деактивированных пользователей и версии авторизации, изменённые после `since`."""
+    now = datetime.now(timezone.utc)
+    if since is None:
+        since = now - timedelta(seconds=revocation_cache.ttl_seconds)
+
+    token_rows = db.execute(
+        select(AccessToken.digest, AccessToken.expires_at).where(
+            AccessToken.is_revoked.is_(True),
+            AccessToken.expires_at > now,
+            AccessToken.updated_at >= since,
+        )
+    ).all()
+    user_rows = db.execute(
+        select(User.id, User.updated_at).where(User.is_active.is_(False), User.updated_at >= since)
+    ).all()
+    version_rows = db.execute(
+        select(User.id, User.authz_version, User.updated_at).where(
+            User.authz_version > 0, User.updated_at >= since
+        )
+    ).all()
+
+    tokens = [(digest, as_utc(expires_at).timestamp()) for digest, expires_at in token_rows]
+    users = [(user_id, as_utc(updated_at).timestamp()) for user_id, updated_at in user_rows]
+    versions = [
+        (user_id, version, as_utc(updated_at).timestamp()) for user_id, version, updated_at in version_rows
+    ]
+    return tokens, users, versions
+
+
+def purge_expired_tokens(
+    db: Session,
+    before: datetime,
+    batch_size: int,
+    model: type[AccessToken] | type[RefreshToken] = AccessToken,
+) -> int:
+    """Удаляет не более `batch_size` записей `model`, истёкших до `before`, и возвращает их число.
+
+    Маленькие пакеты держат блокировки недолго; вызывающий код фиксирует
+    транзакцию после каждого пакета.
+    """
+    batch = (
+        select(model.id)
+        .where(model.expires_at < before)
+        .order_by(model.expires_at)
+        .limit(batch_size)
+    )
+    result = db.execute(
+        delete(model).where(model.id.in_(batch.scalar_subquery())),
+        execution_options={"synchronize_session": False},
+    )
+    return result.rowcount
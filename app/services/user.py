@@ -1,11 +1,13 @@
 ﻿"""Сервисные операции для работы с пользователями."""
-from collections.abc import Iterable
-from typing import Sequence
-from sqlalchemy import select
-from sqlalchemy.orm import Session, selectinload
+from typing import Any, Sequence
+from sqlalchemy import Delete, Insert, Row, Select, Update, delete, exists, insert, literal, select, update
+from sqlalchemy.orm import Session, aliased, selectinload
+from ..core.cache import CachedBody, cached_body
 from ..core.security import hash_password
-from ..models import AccessToken, Role, User
+from ..models import AccessToken, Role, User, UserRole
 from ..schemas import UserProfile
+from .invalidation import bump_authz_version_statement, invalidate_auth, invalidate_profile
+from .token import revoke_refresh_tokens_statement
 
 def get_user_by_email(db: Session, email: str) -> User | None:
     """Возвращает пользователя по адресу электронной почты или `None`."""
@@ -18,12 +20,8 @@ def get_user(db: Session, user_id: int) -> User | None:
 
 
 def get_user_with_roles(db: Session, user_id: int) -> User | None:
-    """Загружает пользователя вместе с ролями и их разрешениями."""
-    return db.scalar(
-        select(User)
-        .options(selectinload(User.roles).selectinload(Role.permissions))
-        .where(User.id == user_id)
-    )
+    """Загружает пользователя вместе с ролями (без их разрешений)."""
+    return db.scalar(select(User).options(selectinload(User.roles)).where(User.id == user_id))
 
 
 def create_user(
@@ -35,14 +33,19 @@ def create_user(
     email: str,
     password: str,
     roles: Sequence[Role] | None = None,
+    password_hash: str | None = None,
 ) -> User:
-    """Создаёт нового пользователя, хеширует пароль и назначает роли."""
+    """Создаёт нового пользователя, хеширует пароль и назначает роли.
+
+    `password_hash` передаётся, если хеш пароля уже вычислен, например
+    асинхронно в маршруте, чтобы не занимать поток ожиданием пула хеширования.
+    """
     user = User(
         first_name=first_name,
         last_name=last_name,
         patronymic=patronymic,
         email=email,
-        password_hash=hash_password(password),
+        password_hash=password_hash or hash_password(password),
         is_active=True,
     )
     if roles:
@@ -52,8 +55,124 @@ def create_user(
     return user
 
 
-def list_users(db: Session) -> Iterable[User]:
-    return db.scalars(select(User).options(selectinload(User.roles))).all()
+USER_LIST_COLUMNS = {
+    "id": User.id,
+    "first_name": User.first_name,
+    "last_name": User.last_name,
+    "patronymic": User.patronymic,
+    "email": User.email,
+    "is_active": User.is_active,
+    "created_at": User.created_at,
+    "updated_at": User.updated_at,
+}
+USER_LIST_FIELDS = (*USER_LIST_COLUMNS, "roles")
+
+
+def users_page_query(
+    *,
+    fields: Sequence[str],
+    limit: int,
+    after_id: int | None = None,
+    is_active: bool | None = None,
+    role: str | None = None,
+    email_prefix: str | None = None,
+) -> Select:
+    """Строит запрос страницы пользователей с `id > after_id`.
+
+    Выбираются только нужные столбцы и на одну строку больше `limit`,
+    чтобы определить наличие следующей страницы.
+    """
+    columns = [USER_LIST_COLUMNS[name] for name in fields if name in USER_LIST_COLUMNS]
+    if User.id not in columns:
+        columns.insert(0, User.id)
+    query = select(*columns).order_by(User.id).limit(limit + 1)
+    if after_id is not None:
+        query = query.where(User.id > after_id)
+    return filter_users(query, is_active=is_active, role=role, email_prefix=email_prefix)
+
+
+def filter_users(
+    query: Select,
+    *,
+    is_active: bool | None = None,
+    role: str | None = None,
+    email_prefix: str | None = None,
+) -> Select:
+    """Добавляет к запросу по `User` фильтры по активности, роли и префиксу почты."""
+    if is_active is not None:
+        query = query.where(User.is_active.is_(is_active))
+    if email_prefix:
+        query = query.where(User.email.startswith(email_prefix, autoescape=True))
+    if role is not None:
+        role_link, role_row = aliased(UserRole), aliased(Role)
+        query = query.where(
+            exists()
+            .where(role_link.user_id == User.id, role_link.role_id == role_row.id, role_row.name == role)
+            .correlate(User)
+        )
+    return query
+
+
+def user_role_names_query(user_ids: Sequence[int]) -> Select:
+    """Строит запрос названий ролей для набора пользователей."""
+    return (
+        select(UserRole.user_id, Role.name)
+        .join(Role, Role.id == UserRole.role_id)
+        .where(UserRole.user_id.in_(user_ids))
+        .order_by(UserRole.user_id, Role.name)
+    )
+
+
+def user_page_from_rows(
+    rows: Sequence[Row],
+    fields: Sequence[str],
+    limit: int,
+) -> tuple[list[dict[str, Any]], int | None]:
+    """Преобразует строки `users_page_query` в элементы страницы и курсор следующей."""
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = rows[-1].id
+    columns = [name for name in fields if name in USER_LIST_COLUMNS]
+    items = [{name: getattr(row, name) for name in columns} for row in rows]
+    return items, next_cursor
+
+
+def attach_role_names(items: list[dict[str, Any]], user_ids: Sequence[int], rows: Sequence[Row]) -> None:
+    """Добавляет к элементам страницы списки названий ролей."""
+    names: dict[int, list[str]] = {user_id: [] for user_id in user_ids}
+    for user_id, name in rows:
+        names[user_id].append(name)
+    for item, user_id in zip(items, user_ids):
+        item["roles"] = names[user_id]
+
+
+def list_users(
+    db: Session,
+    *,
+    fields: Sequence[str] = USER_LIST_FIELDS,
+    limit: int,
+    after_id: int | None = None,
+    is_active: bool | None = None,
+    role: str | None = None,
+    email_prefix: str | None = None,
+) -> tuple[list[dict[str, Any]], int | None]:
+    """Возвращает страницу пользователей с выбранными полями и курсор следующей страницы."""
+    rows = db.execute(
+        users_page_query(
+            fields=fields,
+            limit=limit,
+            after_id=after_id,
+            is_active=is_active,
+            role=role,
+            email_prefix=email_prefix,
+        )
+    ).all()
+    items, next_cursor = user_page_from_rows(rows, fields, limit)
+    if "roles" in fields and items:
+        user_ids = [row.id for row in rows[:limit]]
+        attach_role_names(items, user_ids, db.execute(user_role_names_query(user_ids)).all())
+    return items, next_cursor
 
 
 def update_user(db: Session, user: User, data: dict[str, object]) -> User:
@@ -68,14 +187,95 @@ def update_user(db: Session, user: User, data: dict[str, object]) -> User:
         user.email = data["email"]
     if "is_active" in data:
         user.is_active = bool(data["is_active"])
+        db.execute(bump_authz_version_statement(user_ids=(user.id,)))
+        if not user.is_active:
+            db.execute(revoke_refresh_tokens_statement(user_ids=(user.id,)))
+        invalidate_auth(db, deactivated_user_ids=() if user.is_active else (user.id,))
     db.flush()
+    invalidate_profile(db, user.id)
     return user
 
+
+def set_user_roles(db: Session, user: User, roles: Sequence[Role]) -> User:
+    """Заменяет набор ролей пользователя."""
+    user.roles = list(roles)
+    db.flush()
+    db.execute(bump_authz_version_statement(user_ids=(user.id,)))
+    invalidate_auth(db)
+    return user
+
+def grant_role_statement(role_id: int, user_ids: Sequence[int]) -> Insert:
+    """Строит `INSERT ... SELECT` связей с ролью для пользователей, у которых её ещё нет."""
+    link = aliased(UserRole)
+    return insert(UserRole).from_select(
+        ["user_id", "role_id"],
+        select(User.id, literal(role_id)).where(
+            User.id.in_(user_ids),
+            ~exists().where(link.user_id == User.id, link.role_id == role_id),
+        ),
+    )
+
+
+def revoke_role_statement(role_id: int, user_ids: Sequence[int]) -> Delete:
+    """Строит удаление связей пользователей с ролью."""
+    return delete(UserRole).where(UserRole.role_id == role_id, UserRole.user_id.in_(user_ids))
+
+
+def deactivate_users_statements(user_ids: Sequence[int]) -> tuple[Update, Update, Update]:
+    """Строит деактивацию активных пользователей и отзыв их токенов доступа и refresh-токенов."""
+    return (
+        update(User).where(User.id.in_(user_ids), User.is_active.is_(True)).values(is_active=False),
+        update(AccessToken)
+        .where(AccessToken.user_id.in_(user_ids), AccessToken.is_revoked.is_(False))
+        .values(is_revoked=True),
+        revoke_refresh_tokens_statement(user_ids=user_ids),
+    )
+
+
+def grant_role_to_users(db: Session, role_id: int, user_ids: Sequence[int]) -> int:
+    """Назначает роль пользователям одним запросом и возвращает число новых назначений."""
+    result = db.execute(grant_role_statement(role_id, user_ids))
+    db.execute(bump_authz_version_statement(user_ids=user_ids))
+    invalidate_auth(db)
+    return result.rowcount
+
+
+def revoke_role_from_users(db: Session, role_id: int, user_ids: Sequence[int]) -> int:
+    """Снимает роль с пользователей одним запросом и возвращает число снятых назначений."""
+    result = db.execute(revoke_role_statement(role_id, user_ids))
+    db.execute(bump_authz_version_statement(user_ids=user_ids))
+    invalidate_auth(db)
+    return result.rowcount
+
+
+def deactivate_users(db: Session, user_ids: Sequence[int]) -> tuple[int, int]:
+    """Деактивирует пользователей и отзывает их access- и refresh-токены.
+
+    Выполняет четыре запроса независимо от числа пользователей: деактивацию,
+    два отзыва токенов и увеличение версии авторизации. Возвращает число деактивированных пользователей и отозванных токенов.
+    """
+    deactivate, revoke, revoke_refresh = deactivate_users_statements(user_ids)
+    users = db.execute(deactivate).rowcount
+    tokens = db.execute(revoke).rowcount
+    db.execute(revoke_refresh)
+    db.execute(bump_authz_version_statement(user_ids=user_ids))
+    invalidate_auth(db, deactivated_user_ids=user_ids)
+    return users, tokens
+
+
 def soft_delete_user(db: Session, user: User) -> None:
     """Деактивирует пользователя и отзывает все его токены."""
     user.is_active = False
     db.query(AccessToken).filter(AccessToken.user_id == user.id).update({"is_revoked": True})
+    db.execute(revoke_refresh_tokens_statement(user_ids=(user.id,)))
+    db.execute(bump_authz_version_statement(user_ids=(user.id,)))
     db.flush()
+    invalidate_auth(db, deactivated_user_ids=(user.id,))
+
+
+def profile_body(user: User) -> CachedBody:
+    """Сериализует профиль пользователя для `profile_cache`."""
+    return cached_body(serialize_user(user).model_dump_json().encode())
 
 
 def serialize_user(user: User) -> UserProfile:
@@ -0,0 +1,31 @@
+﻿"""Фикстуры pytest для проверки бюджета SQL-запросов по маршрутам.
+
+Подключаются в `conftest.py` строкой `pytest_plugins = ["app.testing"]`, как
+в `tests/conftest.py`, где заданы и фикстуры `client` и `admin_headers`::
+
+    def test_me(client, admin_headers, query_budget):
+        with query_budget(3):
+            client.get("/users/me", headers=admin_headers)
+"""
+from collections.abc import Callable, Iterator
+from contextlib import AbstractContextManager, contextmanager
+import pytest
+from .db.profiling import QueryStats, capture_queries
+
+@contextmanager
+def assert_max_queries(limit: int) -> Iterator[QueryStats]:
+    """Проваливает тест, если в блоке выполнено больше `limit` SQL-запросов.
+
+    Учитываются все запросы процесса, поэтому фоновые задачи приложения
+    на время проверки лучше отключить (`TOKEN_JANITOR_INTERVAL_SECONDS=0`).
+    """
+    with capture_queries() as stats:
+        yield stats
+    if stats.count > limit:
+        pytest.fail(f"Query budget exceeded: {stats.count} > {limit}\n{stats.report()}", pytrace=False)
+
+
+@pytest.fixture
+def query_budget() -> Callable[[int], AbstractContextManager[QueryStats]]:
+    """Возвращает `assert_max_queries` для проверки бюджета запросов в тесте."""
+    return assert_max_queries
@@ -0,0 +1 @@
+﻿"""Нагрузочные бенчмарки и микробенчмарки сервиса."""
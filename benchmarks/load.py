@@ -0,0 +1,249 @@
+﻿"""Нагрузочный бенчмарк горячих маршрутов сервиса.
+
+База данных и режимы приложения задаются, как обычно, переменными окружения
+(`DATABASE_URL`, `DATABASE_MODE`, `TOKEN_VALIDATION_MODE`, `BCRYPT_ROUNDS`, ...)::
+
+    DATABASE_URL=sqlite:///./bench.db python -m benchmarks.load --output bench.json
+    python -m benchmarks.load --mode uvicorn --workers 4 --concurrency 64 \
+        --baseline baseline.json --threshold 0.1
+
+Схема БД пересоздаётся: не запускайте бенчмарк на рабочей базе.
+"""
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import time
+from collections.abc import Awaitable, Callable
+from pathlib import Path
+
+# Все запросы идут с одного адреса: без этого ограничитель входа отклонял бы сценарий `login`.
+os.environ.setdefault("LOGIN_MAX_ATTEMPTS_PER_IP", str(10**9))
+os.environ.setdefault("LOGIN_MAX_ATTEMPTS_PER_EMAIL", str(10**9))
+os.environ.setdefault("TOKEN_JANITOR_INTERVAL_SECONDS", "0")
+os.environ.setdefault("DEBUG", "false")
+
+import httpx
+from sqlalchemy.engine import make_url
+from app.core.config import get_settings
+from .report import load_report, print_comparison, summarize_latencies, write_report
+from .seed import Population, PopulationSpec, seed_population
+
+# Сценарий получает номер воркера, чтобы правки не конфликтовали между одновременными запросами.
+Scenario = Callable[[httpx.AsyncClient, Population, random.Random, int], Awaitable[httpx.Response]]
+
+def _bearer(token: str) -> dict[str, str]:
+    return {"Authorization": f"Bearer {token}"}
+
+
+async def login(
+    client: httpx.AsyncClient, population: Population, rng: random.Random, worker: int
+) -> httpx.Response:
+    payload = {"email": rng.choice(population.emails), "password": population.password}
+    return await client.post("/auth/login", json=payload)
+
+
+async def users_me(
+    client: httpx.AsyncClient, population: Population, rng: random.Random, worker: int
+) -> httpx.Response:
+    return await client.get("/users/me", headers=_bearer(rng.choice(population.user_tokens)))
+
+
+async def projects(
+    client: httpx.AsyncClient, population: Population, rng: random.Random, worker: int
+) -> httpx.Response:
+    return await client.get("/resources/projects", headers=_bearer(rng.choice(population.user_tokens)))
+
+
+async def users_list(
+    client: httpx.AsyncClient, population: Population, rng: random.Random, worker: int
+) -> httpx.Response:
+    return await client.get("/users", params={"limit": 50}, headers=_bearer(population.admin_token))
+
+
+async def admin_roles(
+    client: httpx.AsyncClient, population: Population, rng: random.Random, worker: int
+) -> httpx.Response:
+    return await client.get("/admin/roles", headers=_bearer(population.admin_token))
+
+
+async def admin_role_update(
+    client: httpx.AsyncClient, population: Population, rng: random.Random, worker: int
+) -> httpx.Response:
+    role_id = population.bench_role_ids[worker % len(population.bench_role_ids)]
+    codes = rng.sample(population.permission_codes, rng.randint(1, len(population.permission_codes)))
+    return await client.patch(
+        f"/admin/roles/{role_id}", json={"permission_codes": codes}, headers=_bearer(population.admin_token)
+    )
+
+
+SCENARIOS: dict[str, Scenario] = {
+    "login": login,
+    "users_me": users_me,
+    "projects": projects,
+    "users_list": users_list,
+    "admin_roles": admin_roles,
+    "admin_role_update": admin_role_update,
+}
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    scenario: Scenario,
+    population: Population,
+    *,
+    concurrency: int,
+    duration: float,
+    warmup: float,
+    seed: int,
+) -> dict[str, float]:
+    """Держит `concurrency` одновременных запросов `duration` секунд после прогрева."""
+    latencies: list[float] = []
+    errors = 0
+    record = False
+
+    async def worker(index: int, deadline: float) -> None:
+        nonlocal errors
+        rng = random.Random(seed * 1000 + index)
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                response = await scenario(client, population, rng, index)
+                succeeded = response.is_success
+            except httpx.TransportError:
+                succeeded = False
+            elapsed = time.perf_counter() - started
+            if not record:
+                continue
+            if succeeded:
+                latencies.append(elapsed)
+            else:
+                errors += 1
+
+    if warmup > 0:
+        deadline = time.perf_counter() + warmup
+        await asyncio.gather(*(worker(index, deadline) for index in range(concurrency)))
+    record = True
+    started = time.perf_counter()
+    deadline = started + duration
+    await asyncio.gather(*(worker(index, deadline) for index in range(concurrency)))
+    return summarize_latencies(latencies, errors, time.perf_counter() - started)
+
+
+async def run_all(client: httpx.AsyncClient, population: Population, args: argparse.Namespace) -> dict:
+    results = {}
+    for name in args.scenarios:
+        results[name] = await run_scenario(
+            client,
+            SCENARIOS[name],
+            population,
+            concurrency=args.concurrency,
+            duration=args.duration,
+            warmup=args.warmup,
+            seed=args.seed,
+        )
+        print(f"{name}: {results[name]}", file=sys.stderr)
+    return results
+
+
+async def run_in_process(population: Population, args: argparse.Namespace) -> dict:
+    """Запускает приложение в том же процессе через ASGI-транспорт, без сети."""
+    from app.main import app
+
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", limits=limits) as client:
+            return await run_all(client, population, args)
+
+
+async def wait_until_ready(client: httpx.AsyncClient, server: subprocess.Popen, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise SystemExit("uvicorn exited before becoming ready.")
+        try:
+            await client.get("/openapi.json")
+            return
+        except httpx.TransportError:
+            await asyncio.sleep(0.2)
+    raise SystemExit("uvicorn did not become ready in time.")
+
+
+async def run_under_uvicorn(population: Population, args: argparse.Namespace) -> dict:
+    """Запускает `uvicorn` с `--workers` процессами и нагружает его по HTTP."""
+    server = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "app.main:app",
+            "--host", "127.0.0.1", "--port", str(args.port),
+            "--workers", str(args.workers), "--log-level", "warning", "--no-access-log",
+        ],
+        env=os.environ.copy(),
+    )
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", limits=limits) as client:
+            await wait_until_ready(client, server, timeout=30)
+            return await run_all(client, population, args)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load-test the auth hot paths.")
+    parser.add_argument("--mode", choices=["inprocess", "uvicorn"], default="inprocess")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0, help="Measured seconds per scenario.")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Unmeasured seconds per scenario.")
+    parser.add_argument("--users", type=int, default=PopulationSpec.users)
+    parser.add_argument("--roles", type=int, default=PopulationSpec.roles, help="Keep >= --concurrency.")
+    parser.add_argument("--roles-per-user", type=int, default=PopulationSpec.roles_per_user)
+    parser.add_argument("--tokens", type=int, default=PopulationSpec.tokens)
+    parser.add_argument("--seed", type=int, default=PopulationSpec.seed)
+    parser.add_argument("--output", type=Path, help="Report path; printed to stdout if omitted.")
+    parser.add_argument("--baseline", type=Path, help="Report to compare against.")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Allowed relative regression.")
+    args = parser.parse_args()
+
+    settings = get_settings()
+    spec = PopulationSpec(
+        users=max(args.users, 1),
+        roles=max(args.roles, 1),
+        roles_per_user=args.roles_per_user,
+        tokens=max(args.tokens, 1),
+        seed=args.seed,
+    )
+    started = time.perf_counter()
+    population = seed_population(spec)
+    print(f"seeded {spec.as_dict()} in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+    runner = run_in_process if args.mode == "inprocess" else run_under_uvicorn
+    results = asyncio.run(runner(population, args))
+
+    report = write_report(
+        args.output,
+        {
+            "mode": args.mode,
+            "workers": args.workers if args.mode == "uvicorn" else 1,
+            "database": make_url(settings.database_url).get_backend_name(),
+            "database_mode": settings.database_mode,
+            "token_validation_mode": settings.token_validation_mode,
+            "password_hash_scheme": settings.password_hash_scheme,
+            "bcrypt_rounds": settings.bcrypt_rounds,
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "population": spec.as_dict(),
+        },
+        results,
+    )
+    if args.baseline and not print_comparison(report, load_report(args.baseline), args.threshold):
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
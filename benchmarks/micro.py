@@ -0,0 +1,242 @@
+﻿"""Микробенчмарки постоянных затрат запроса без обращения к БД.
+
+Запуск: `python -m benchmarks.micro --output micro.json [--baseline micro-baseline.json]`.
+Для каждой операции отчёт содержит число операций в секунду, время одной
+операции, пиковый объём памяти, выделяемой за вызов, и память, остающуюся
+после вызова (по `tracemalloc`).
+"""
+import argparse
+import gc
+import itertools
+import sys
+import time
+import tracemalloc
+from collections import namedtuple
+from collections.abc import Callable
+from datetime import datetime, timezone
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any
+from app.core.permissions import permission_cache
+from app.core.security import create_access_token, decode_token, make_crypt_context, new_jti
+from app.dependencies import get_current_permission_mask, require_permissions
+from app.models import Permission, Role, User
+from app.schemas import RoleResponse
+from app.services import serialize_user
+from .report import load_report, print_comparison, write_report
+
+Benchmark = Callable[[], Any]
+PrincipalRow = namedtuple("PrincipalRow", ["is_active", "code"])
+
+def measure(fn: Benchmark, *, min_time: float, repeat: int = 3, samples: int = 200) -> dict[str, float]:
+    """Замеряет скорость и выделение памяти одной операции.
+
+    Число вызовов в серии подбирается так, чтобы серия шла не меньше `min_time`
+    секунд; скорость берётся по лучшей из `repeat` серий. Память замеряется
+    отдельно под `tracemalloc`, так как он сам замедляет вызовы.
+    """
+    fn()
+    number = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time:
+            break
+        number = max(number * 2, int(number * min_time / max(elapsed, 1e-9) * 1.1))
+
+    best = elapsed
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat - 1):
+            started = time.perf_counter()
+            for _ in range(number):
+                fn()
+            best = min(best, time.perf_counter() - started)
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+    calls = max(1, min(samples, number))
+    tracemalloc.start()
+    try:
+        baseline, _ = tracemalloc.get_traced_memory()
+        peak_total = 0
+        for _ in range(calls):
+            before, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            fn()
+            _, peak = tracemalloc.get_traced_memory()
+            peak_total += peak - before
+        retained, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "calls": number,
+        "ops_per_sec": round(number / best, 1),
+        "us_per_op": round(best / number * 1e6, 3),
+        "peak_bytes_per_call": round(peak_total / calls),
+        "retained_bytes_per_call": round((retained - baseline) / calls),
+    }
+
+
+def make_role(index: int, permissions: list[Permission]) -> Role:
+    now = datetime.now(timezone.utc)
+    return Role(
+        id=index,
+        name=f"role_{index}",
+        description="Benchmark role.",
+        permissions=permissions,
+        created_at=now,
+        updated_at=now,
+    )
+
+
+def token_benchmarks() -> dict[str, Benchmark]:
+    token, _ = create_access_token(subject="42", jti=new_jti(), roles=["basic_user", "analyst"])
+    return {
+        "create_access_token": lambda: create_access_token(subject="42", jti=new_jti(), roles=["basic_user"]),
+        "decode_token": lambda: decode_token(token),
+    }
+
+
+def hashing_benchmarks(
+    bcrypt_rounds: list[int],
+    argon2_time_costs: list[int],
+    argon2_memory_cost: int,
+) -> dict[str, Benchmark]:
+    """Хеширование и проверка пароля в текущем процессе, без пула, при разных стоимостях."""
+    contexts = {
+        f"bcrypt_rounds_{rounds}": make_crypt_context(
+            "bcrypt",
+            bcrypt_rounds=rounds,
+            argon2_time_cost=1,
+            argon2_memory_cost=argon2_memory_cost,
+            argon2_parallelism=1,
+        )
+        for rounds in bcrypt_rounds
+    }
+    contexts.update(
+        (
+            f"argon2_time_cost_{time_cost}",
+            make_crypt_context(
+                "argon2",
+                bcrypt_rounds=4,
+                argon2_time_cost=time_cost,
+                argon2_memory_cost=argon2_memory_cost,
+                argon2_parallelism=1,
+            ),
+        )
+        for time_cost in argon2_time_costs
+    )
+
+    benchmarks: dict[str, Benchmark] = {}
+    for label, context in contexts.items():
+        password_hash = context.hash("bench-password")
+        benchmarks[f"hash_password[{label}]"] = lambda context=context: context.hash("bench-password")
+        benchmarks[f"verify_password[{label}]"] = (
+            lambda context=context, password_hash=password_hash: context.verify("bench-password", password_hash)
+        )
+    return benchmarks
+
+
+def permission_benchmarks(permissions: int) -> dict[str, Benchmark]:
+    """Проверка прав пользователя, роли которого дают `permissions` различных прав.
+
+    `warm` — маска берётся из кэша процесса; `cold` — каждый вызов для нового
+    пользователя: построение запроса, сборка принципала из строк, маска и запись в кэш.
+    """
+    codes = [f"bench_permission_{index}" for index in range(permissions)]
+    # Запрос принципала с DISTINCT возвращает по строке на код права, сколько бы ролей его ни давали.
+    rows = [PrincipalRow(True, code) for code in codes]
+    result = SimpleNamespace(all=lambda: rows)
+    db = SimpleNamespace(execute=lambda statement: result)
+    check = require_permissions(*codes[: max(1, permissions // 2)])
+    permission_cache.ttl_seconds = 3600
+
+    warm_token = SimpleNamespace(user_id=0)
+    verified = (b"", {})
+    get_current_permission_mask(warm_token, verified, db)
+    user_ids = itertools.count(1)
+
+    def cold() -> int:
+        return check(get_current_permission_mask(SimpleNamespace(user_id=next(user_ids)), verified, db))
+
+    return {
+        f"require_permissions[warm,{permissions} permissions]": lambda: check(
+            get_current_permission_mask(warm_token, verified, db)
+        ),
+        f"require_permissions[cold,{permissions} permissions]": cold,
+    }
+
+
+def schema_benchmarks(roles: int, permissions: int) -> dict[str, Benchmark]:
+    now = datetime.now(timezone.utc)
+    permission_objects = [
+        Permission(id=index, code=f"bench_permission_{index}", description="Benchmark permission.")
+        for index in range(permissions)
+    ]
+    role = make_role(0, permission_objects)
+    user = User(
+        id=1,
+        first_name="Bench",
+        last_name="User",
+        patronymic=None,
+        email="bench@example.com",
+        password_hash="x",
+        is_active=True,
+        roles=[make_role(index, []) for index in range(roles)],
+        created_at=now,
+        updated_at=now,
+    )
+    return {
+        f"serialize_user[{roles} roles]": lambda: serialize_user(user),
+        f"RoleResponse.model_validate[{permissions} permissions]": lambda: RoleResponse.model_validate(role),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Microbenchmark per-request constant costs.")
+    parser.add_argument("--only", nargs="+", default=[], help="Run benchmarks whose names contain any of these.")
+    parser.add_argument("--min-time", type=float, default=0.5, help="Minimum seconds per timing series.")
+    parser.add_argument("--roles", type=int, default=50, help="Roles held by the benchmark user.")
+    parser.add_argument("--permissions", type=int, default=100, help="Distinct permissions granted by them.")
+    parser.add_argument("--bcrypt-rounds", type=int, nargs="*", default=[4, 8, 10, 12])
+    parser.add_argument("--argon2-time-cost", type=int, nargs="*", default=[1, 3])
+    parser.add_argument("--argon2-memory-cost", type=int, default=65536)
+    parser.add_argument("--output", type=Path, help="Report path; printed to stdout if omitted.")
+    parser.add_argument("--baseline", type=Path, help="Report to compare against.")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Allowed relative regression.")
+    args = parser.parse_args()
+
+    benchmarks = {
+        **token_benchmarks(),
+        **hashing_benchmarks(args.bcrypt_rounds, args.argon2_time_cost, args.argon2_memory_cost),
+        **permission_benchmarks(args.permissions),
+        **schema_benchmarks(args.roles, args.permissions),
+    }
+    results = {}
+    for name, fn in benchmarks.items():
+        if args.only and not any(part in name for part in args.only):
+            continue
+        results[name] = measure(fn, min_time=args.min_time)
+        print(f"{name}: {results[name]}", file=sys.stderr)
+
+    report = write_report(
+        args.output,
+        {
+            "min_time": args.min_time,
+            "roles": args.roles,
+            "permissions": args.permissions,
+            "argon2_memory_cost": args.argon2_memory_cost,
+        },
+        results,
+    )
+    if args.baseline and not print_comparison(report, load_report(args.baseline), args.threshold):
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
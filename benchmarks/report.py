@@ -0,0 +1,138 @@
+﻿"""Отчёты бенчмарков: перцентили, запись в JSON и сравнение с эталоном.
+
+Сравнение: `python -m benchmarks.report current.json baseline.json --threshold 0.1`.
+"""
+import argparse
+import json
+import math
+import platform
+import subprocess
+import sys
+from collections.abc import Mapping, Sequence
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+# Сравниваемые показатели: 1 — чем больше, тем лучше; -1 — чем меньше, тем лучше.
+COMPARED_METRICS = {
+    "throughput_rps": 1,
+    "p95_ms": -1,
+    "p99_ms": -1,
+    "ops_per_sec": 1,
+    "peak_bytes_per_call": -1,
+}
+
+def percentile(sorted_values: Sequence[float], fraction: float) -> float:
+    """Возвращает перцентиль отсортированной выборки методом ближайшего ранга."""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(fraction * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+def summarize_latencies(latencies: Sequence[float], errors: int, elapsed: float) -> dict[str, float]:
+    """Сводит задержки (в секундах) в пропускную способность и перцентили в миллисекундах."""
+    values = sorted(latencies)
+    total = len(values)
+    return {
+        "requests": total,
+        "errors": errors,
+        "throughput_rps": round(total / elapsed, 1) if elapsed else 0.0,
+        "mean_ms": round(sum(values) / total * 1000, 3) if total else 0.0,
+        "p50_ms": round(percentile(values, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(values, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(values, 0.99) * 1000, 3),
+        "max_ms": round(values[-1] * 1000, 3) if values else 0.0,
+    }
+
+
+def environment() -> dict[str, Any]:
+    """Сведения об окружении запуска, чтобы сравнивать только сопоставимые отчёты."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+    }
+
+
+def write_report(path: Path | None, meta: Mapping[str, Any], results: Mapping[str, Mapping[str, float]]) -> dict:
+    """Записывает отчёт в файл (или в stdout, если путь не задан) и возвращает его."""
+    report = {"meta": {**environment(), **meta}, "results": results}
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if path is None:
+        print(text)
+    else:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text + "\n", encoding="utf-8")
+    return report
+
+
+def compare(current: Mapping[str, Any], baseline: Mapping[str, Any], threshold: float) -> list[str]:
+    """Сравнивает отчёт с эталоном и возвращает описания регрессий сверх `threshold`.
+
+    Учитываются только сценарии и показатели, присутствующие в обоих отчётах.
+    """
+    regressions = []
+    for name, result in current["results"].items():
+        reference = baseline["results"].get(name)
+        if reference is None:
+            continue
+        if result.get("errors", 0) > reference.get("errors", 0):
+            regressions.append(f"{name}.errors: {reference.get('errors', 0)} -> {result['errors']}")
+        for metric, direction in COMPARED_METRICS.items():
+            if metric not in result or not reference.get(metric):
+                continue
+            change = (result[metric] - reference[metric]) / reference[metric]
+            if change * direction < -threshold:
+                regressions.append(
+                    f"{name}.{metric}: {reference[metric]} -> {result[metric]} ({change:+.1%})"
+                )
+    return regressions
+
+
+def print_comparison(current: Mapping[str, Any], baseline: Mapping[str, Any], threshold: float) -> bool:
+    """Печатает изменения относительно эталона и возвращает `True`, если регрессий нет."""
+    for key in ("database", "database_mode", "concurrency", "population", "mode", "workers"):
+        if current["meta"].get(key) != baseline["meta"].get(key):
+            print(
+                f"note: {key} differs from baseline "
+                f"({baseline['meta'].get(key)!r} -> {current['meta'].get(key)!r})",
+                file=sys.stderr,
+            )
+    for name, result in current["results"].items():
+        reference = baseline["results"].get(name, {})
+        changes = [
+            f"{metric}={result[metric]} ({(result[metric] - reference[metric]) / reference[metric]:+.1%})"
+            for metric in COMPARED_METRICS
+            if metric in result and reference.get(metric)
+        ]
+        print(f"{name}: {', '.join(changes) or 'no baseline'}", file=sys.stderr)
+
+    regressions = compare(current, baseline, threshold)
+    for regression in regressions:
+        print(f"REGRESSION {regression}", file=sys.stderr)
+    return not regressions
+
+
+def load_report(path: Path) -> dict[str, Any]:
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare a benchmark report against a baseline.")
+    parser.add_argument("current", type=Path)
+    parser.add_argument("baseline", type=Path)
+    parser.add_argument("--threshold", type=float, default=0.1, help="Allowed relative regression.")
+    args = parser.parse_args()
+    if not print_comparison(load_report(args.current), load_report(args.baseline), args.threshold):
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
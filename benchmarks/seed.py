@@ -0,0 +1,129 @@
+﻿"""Заполнение БД популяцией для нагрузочного бенчмарка: роли, пользователи и токены."""
+import random
+from dataclasses import dataclass, field
+from sqlalchemy import insert, select
+from app.core.config import get_settings
+from app.core.security import create_access_token, hash_password, new_jti, token_digest
+from app.db.seed import run_seed
+from app.db.session import Base, engine, session_scope
+from app.models import AccessToken, Permission, Role, RolePermission, User, UserRole
+from app.services.importer import INSERT_USERS
+
+BENCH_PASSWORD = "bench-password"
+BENCH_ROLE_PREFIX = "bench_role_"
+
+@dataclass(frozen=True)
+class PopulationSpec:
+    """Размер популяции; одинаковый `seed` даёт одинаковые данные."""
+    users: int = 1000
+    roles: int = 20
+    roles_per_user: int = 3
+    tokens: int = 2000
+    seed: int = 1
+
+    def as_dict(self) -> dict[str, int]:
+        return {
+            "users": self.users,
+            "roles": self.roles,
+            "roles_per_user": self.roles_per_user,
+            "tokens": self.tokens,
+            "seed": self.seed,
+        }
+
+
+@dataclass
+class Population:
+    """Данные, на которые опираются сценарии нагрузки."""
+    emails: list[str] = field(default_factory=list)
+    user_tokens: list[str] = field(default_factory=list)
+    admin_token: str = ""
+    bench_role_ids: list[int] = field(default_factory=list)
+    permission_codes: list[str] = field(default_factory=list)
+    password: str = BENCH_PASSWORD
+
+
+def issue_tokens(user_ids: list[int], count: int, rng: random.Random) -> tuple[list[str], list[dict]]:
+    """Выпускает `count` токенов для случайных пользователей и готовит строки `access_tokens`."""
+    tokens, rows = [], []
+    for _ in range(count):
+        user_id = rng.choice(user_ids)
+        jti = new_jti()
+        token, expires_at = create_access_token(subject=str(user_id), jti=jti)
+        tokens.append(token)
+        rows.append({"digest": token_digest(jti), "user_id": user_id, "expires_at": expires_at})
+    return tokens, rows
+
+
+def seed_population(spec: PopulationSpec, *, reset: bool = True, batch_size: int = 1000) -> Population:
+    """Пересоздаёт схему (при `reset`) и заполняет её популяцией `spec`.
+
+    Все пользователи получают один и тот же хеш пароля, вычисленный один раз,
+    поэтому заполнение не упирается в хеширование, а вход стоит столько же,
+    сколько при настоящем хеше с текущими настройками.
+    """
+    rng = random.Random(spec.seed)
+    if reset:
+        Base.metadata.drop_all(bind=engine)
+    run_seed()
+    population = Population()
+    password_hash = hash_password(BENCH_PASSWORD)
+
+    with session_scope() as db:
+        permissions = db.execute(select(Permission.id, Permission.code)).all()
+        population.permission_codes = [code for _, code in permissions]
+        basic_role_id = db.scalar(select(Role.id).where(Role.name == "basic_user"))
+
+        role_rows = [
+            {"name": f"{BENCH_ROLE_PREFIX}{index}", "description": "Benchmark role."}
+            for index in range(spec.roles)
+        ]
+        if role_rows:
+            population.bench_role_ids = list(
+                db.scalars(insert(Role).returning(Role.id, sort_by_parameter_order=True), role_rows)
+            )
+            db.execute(
+                insert(RolePermission),
+                [
+                    {"role_id": role_id, "permission_id": permission_id}
+                    for role_id in population.bench_role_ids
+                    for permission_id, _ in rng.sample(permissions, rng.randint(1, len(permissions)))
+                ],
+            )
+
+        user_ids: list[int] = []
+        for start in range(0, spec.users, batch_size):
+            rows = [
+                {
+                    "first_name": "Bench",
+                    "last_name": f"User{index}",
+                    "patronymic": None,
+                    "email": f"bench{index:07d}@example.com",
+                    "password_hash": password_hash,
+                    "is_active": True,
+                }
+                for index in range(start, min(start + batch_size, spec.users))
+            ]
+            ids = list(db.scalars(INSERT_USERS, rows))
+            links = [
+                {"user_id": user_id, "role_id": role_id}
+                for user_id in ids
+                for role_id in {
+                    basic_role_id,
+                    *rng.sample(population.bench_role_ids, min(spec.roles_per_user, len(population.bench_role_ids))),
+                }
+            ]
+            db.execute(insert(UserRole), links)
+            user_ids.extend(ids)
+            population.emails.extend(row["email"] for row in rows)
+
+        if user_ids:
+            for start in range(0, spec.tokens, batch_size):
+                tokens, rows = issue_tokens(user_ids, min(batch_size, spec.tokens - start), rng)
+                db.execute(insert(AccessToken), rows)
+                population.user_tokens.extend(tokens)
+
+        admin_id = db.scalar(select(User.id).where(User.email == get_settings().seed_admin_email))
+        [population.admin_token], rows = issue_tokens([admin_id], 1, rng)
+        db.execute(insert(AccessToken), rows)
+
+    return population
@@ -0,0 +1,110 @@
+﻿"""Общие фикстуры тестов: временная SQLite-база, клиент приложения и токены.
+
+Переменные окружения задаются до импорта приложения: настройки и движок БД
+создаются при импорте модулей `app`.
+"""
+import os
+import tempfile
+from pathlib import Path
+
+_DB_DIR = Path(tempfile.mkdtemp(prefix="auth-api-tests-"))
+os.environ.update(
+    DATABASE_URL=f"sqlite:///{_DB_DIR / 'test.db'}",
+    DATABASE_MODE="sync",
+    TOKEN_VALIDATION_MODE="database",
+    BCRYPT_ROUNDS="4",
+    PASSWORD_HASH_WORKERS="0",
+    TOKEN_JANITOR_INTERVAL_SECONDS="0",
+    DB_QUERY_REPEAT_WARNING="0",
+)
+
+from collections.abc import Callable, Iterator
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.core.cache import catalog_cache, introspection_cache, profile_cache
+from app.core.config import get_settings
+from app.core.permissions import permission_cache
+from app.core.ratelimit import InMemoryRateLimitBackend, login_throttle
+from app.core.revocation import revocation_cache
+from app.db.seed import run_seed
+from app.db.session import Base, engine
+from app.main import app, create_app
+
+pytest_plugins = ["app.testing"]
+
+settings = get_settings()
+PASSWORD = "Passw0rd!x"
+
+def reset_process_state() -> None:
+    """Сбрасывает кэши и счётчики процесса, переживающие пересоздание базы."""
+    permission_cache.bump_version()
+    introspection_cache.bump_version()
+    catalog_cache.bump_version()
+    profile_cache.bump_version()
+    revocation_cache.__init__(revocation_cache.ttl_seconds, revocation_cache.refresh_seconds)
+    login_throttle.backend = InMemoryRateLimitBackend(max_keys=settings.login_throttle_max_keys)
+
+
+@pytest.fixture(autouse=True)
+def database() -> Iterator[None]:
+    """Пересоздаёт схему и демонстрационные данные перед каждым тестом."""
+    Base.metadata.drop_all(bind=engine)
+    run_seed()
+    reset_process_state()
+    yield
+    engine.dispose()
+
+
+def make_client(application: FastAPI) -> Iterator[TestClient]:
+    with TestClient(application) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def client() -> Iterator[TestClient]:
+    """Клиент приложения в режиме `DATABASE_MODE=sync`."""
+    yield from make_client(app)
+
+
+@pytest.fixture
+def async_client(monkeypatch: pytest.MonkeyPatch) -> Iterator[TestClient]:
+    """Клиент приложения, собранного в режиме `DATABASE_MODE=async`."""
+    monkeypatch.setattr(settings, "database_mode", "async")
+    yield from make_client(create_app())
+
+
+def login(client: TestClient, email: str, password: str = PASSWORD) -> dict:
+    response = client.post("/auth/login", json={"email": email, "password": password})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def bearer(token: str) -> dict[str, str]:
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def admin_headers(client: TestClient) -> dict[str, str]:
+    """Заголовок авторизации администратора из демонстрационных данных."""
+    return bearer(login(client, settings.seed_admin_email, settings.seed_admin_password)["access_token"])
+
+
+@pytest.fixture
+def register(client: TestClient) -> Callable[..., dict]:
+    """Регистрирует пользователя с паролем `PASSWORD` и возвращает его профиль."""
+
+    def register_user(email: str, **fields: str) -> dict:
+        payload = {
+            "first_name": "Test",
+            "last_name": "User",
+            "email": email,
+            "password": PASSWORD,
+            "password_confirm": PASSWORD,
+            **fields,
+        }
+        response = client.post("/auth/register", json=payload)
+        assert response.status_code == 201, response.text
+        return response.json()
+
+    return register_user
@@ -0,0 +1,83 @@
+﻿"""Массовые операции над пользователями: роли, деактивация и ответы на ошибки."""
+import pytest
+from conftest import PASSWORD, bearer, login
+
+UNKNOWN_ID = 10_000
+
+
+@pytest.fixture(params=["client", "async_client"])
+def stack(request):
+    return request.getfixturevalue(request.param)
+
+
+@pytest.fixture
+def users(register) -> list[dict]:
+    return [register(f"bulk{index}@example.com") for index in range(2)]
+
+
+@pytest.fixture
+def analyst_role_id(client, admin_headers) -> int:
+    roles = client.get("/admin/roles", headers=admin_headers).json()
+    return next(role["id"] for role in roles if role["name"] == "analyst")
+
+
+def roles_of(client, email: str) -> list[str]:
+    token = login(client, email)["access_token"]
+    return sorted(client.get("/users/me", headers=bearer(token)).json()["roles"])
+
+
+def test_grant_and_revoke_role_count_only_changed_assignments(stack, admin_headers, users, analyst_role_id):
+    user_ids = [user["id"] for user in users]
+    payload = {"user_ids": user_ids + user_ids, "role_id": analyst_role_id}
+
+    assert stack.post("/users/bulk/grant-role", json=payload, headers=admin_headers).json() == {"affected": 2}
+    assert stack.post("/users/bulk/grant-role", json=payload, headers=admin_headers).json() == {"affected": 0}
+    assert roles_of(stack, users[0]["email"]) == ["analyst", "basic_user"]
+
+    assert stack.post("/users/bulk/revoke-role", json=payload, headers=admin_headers).json() == {"affected": 2}
+    assert stack.post("/users/bulk/revoke-role", json=payload, headers=admin_headers).json() == {"affected": 0}
+    assert roles_of(stack, users[1]["email"]) == ["basic_user"]
+
+
+@pytest.mark.parametrize("action", ["grant-role", "revoke-role"])
+def test_unknown_role_is_not_found(stack, admin_headers, users, action):
+    payload = {"user_ids": [users[0]["id"]], "role_id": UNKNOWN_ID}
+
+    response = stack.post(f"/users/bulk/{action}", json=payload, headers=admin_headers)
+
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Role not found."
+
+
+def test_deactivate_revokes_sessions_of_listed_users(stack, admin_headers, users):
+    token = login(stack, users[0]["email"])["access_token"]
+    bystander = login(stack, users[1]["email"])["access_token"]
+
+    response = stack.post(
+        "/users/bulk/deactivate",
+        json={"user_ids": [users[0]["id"], users[0]["id"], UNKNOWN_ID]},
+        headers=admin_headers,
+    )
+
+    assert response.json() == {"affected": 1, "revoked_tokens": 1}
+    assert stack.get("/users/me", headers=bearer(token)).status_code == 401
+    assert stack.post("/auth/login", json={"email": users[0]["email"], "password": PASSWORD}).status_code == 401
+    assert stack.get("/users/me", headers=bearer(bystander)).status_code == 200
+
+
+@pytest.mark.parametrize(
+    ("action", "payload"),
+    [
+        ("grant-role", {"user_ids": [1], "role_id": 1}),
+        ("revoke-role", {"user_ids": [1], "role_id": 1}),
+        ("deactivate", {"user_ids": [1]}),
+    ],
+)
+def test_bulk_operations_require_manage_users(stack, users, action, payload):
+    token = login(stack, users[0]["email"])["access_token"]
+
+    assert stack.post(f"/users/bulk/{action}", json=payload, headers=bearer(token)).status_code == 403
+
+
+def test_bulk_requests_need_user_ids(stack, admin_headers):
+    assert stack.post("/users/bulk/deactivate", json={"user_ids": []}, headers=admin_headers).status_code == 422
@@ -0,0 +1,38 @@
+﻿"""Кэш ответов: сброс отдельных ключей отклоняет запоздавшие записи."""
+from app.core.cache import TTLCache
+
+
+def test_pop_rejects_value_read_before_it():
+    cache: TTLCache[int, str] = TTLCache(maxsize=8, ttl_seconds=60)
+    version = cache.version
+    cache.pop(1)
+    cache.put(1, "stale", version)
+    assert cache.get(1) is None
+
+    cache.put(1, "fresh", cache.version)
+    assert cache.get(1) == "fresh"
+
+
+def test_pop_keeps_other_keys_cacheable():
+    cache: TTLCache[int, str] = TTLCache(maxsize=8, ttl_seconds=60)
+    version = cache.version
+    cache.pop(1)
+    cache.put(2, "other", version)
+    assert cache.get(2) == "other"
+
+
+def test_forgotten_pops_still_reject_older_values():
+    cache: TTLCache[int, str] = TTLCache(maxsize=2, ttl_seconds=60)
+    version = cache.version
+    for key in range(1, 5):
+        cache.pop(key)
+    cache.put(1, "stale", version)
+    assert cache.get(1) is None
+
+
+def test_bump_version_rejects_every_older_value():
+    cache: TTLCache[int, str] = TTLCache(maxsize=8, ttl_seconds=60)
+    version = cache.version
+    cache.bump_version()
+    cache.put(1, "stale", version)
+    assert cache.get(1) is None
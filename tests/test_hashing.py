@@ -0,0 +1,71 @@
+﻿"""Ограничение очереди пула хеширования паролей."""
+import pytest
+from app.core import security
+from app.core.hashing import HashingOverloaded, HashingPool
+from app.db.session import engine, get_async_engine
+from conftest import PASSWORD, settings
+
+@pytest.fixture
+def full_pool() -> HashingPool:
+    """Пул из одного процесса без очереди, единственный слот которого уже занят."""
+    pool = HashingPool(workers=1, queue_size=0)
+    pool._slots.acquire()
+    return pool
+
+
+def test_pool_rejects_tasks_beyond_workers_and_queue(full_pool):
+    with pytest.raises(HashingOverloaded):
+        full_pool.submit(pow, 2, 2)
+    assert full_pool.stats()["rejected"] == 1
+
+
+@pytest.mark.parametrize("stack", ["client", "async_client"])
+def test_login_and_register_fail_fast_when_hashing_is_overloaded(request, register, monkeypatch, full_pool, stack):
+    register("busy@example.com")
+    client = request.getfixturevalue(stack)
+    monkeypatch.setattr(security, "hashing_pool", full_pool)
+
+    responses = [
+        client.post("/auth/login", json={"email": "busy@example.com", "password": PASSWORD}),
+        client.post(
+            "/auth/register",
+            json={
+                "first_name": "Test",
+                "last_name": "User",
+                "email": "new@example.com",
+                "password": PASSWORD,
+                "password_confirm": PASSWORD,
+            },
+        ),
+    ]
+    for response in responses:
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == str(settings.password_hash_retry_after_seconds)
+
+
+@pytest.mark.parametrize("stack", ["client", "async_client"])
+def test_login_and_register_release_connections_while_hashing(request, register, monkeypatch, stack):
+    register("idle@example.com")
+    client = request.getfixturevalue(stack)
+    pool = security.hashing_pool
+    run_async = pool.run_async
+    checked_out = []
+
+    async def observed_run_async(fn, *args):
+        checked_out.append(engine.pool.checkedout() + get_async_engine().sync_engine.pool.checkedout())
+        return await run_async(fn, *args)
+
+    monkeypatch.setattr(pool, "run_async", observed_run_async)
+    assert client.post("/auth/login", json={"email": "idle@example.com", "password": PASSWORD}).status_code == 200
+    response = client.post(
+        "/auth/register",
+        json={
+            "first_name": "Test",
+            "last_name": "User",
+            "email": "idle-new@example.com",
+            "password": PASSWORD,
+            "password_confirm": PASSWORD,
+        },
+    )
+    assert response.status_code == 201
+    assert checked_out == [0, 0]
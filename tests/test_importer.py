@@ -0,0 +1,93 @@
+﻿"""Массовый импорт: каждая строка файла получает ровно один итог."""
+import json
+import pytest
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+from app.aio.services import importer as aio_importer
+from app.db.session import SessionLocal
+from app.models import User
+from app.services import importer
+
+RACED_EMAIL = "raced@example.com"
+
+
+def insert_concurrently(email: str) -> None:
+    with SessionLocal() as db:
+        db.add(User(first_name="Raced", last_name="User", email=email, password_hash="x", is_active=True))
+        db.commit()
+
+
+@pytest.fixture
+def concurrent_write(monkeypatch: pytest.MonkeyPatch) -> list[int]:
+    """Перед первым хешированием пакета другой запрос регистрирует `RACED_EMAIL`.
+
+    Возвращает размеры пакетов паролей, отправленных на хеширование.
+    """
+    calls = []
+    hash_passwords, hash_passwords_async = importer.hash_passwords, aio_importer.hash_passwords_async
+
+    def race(passwords) -> None:
+        if not calls:
+            insert_concurrently(RACED_EMAIL)
+        calls.append(len(passwords))
+
+    def racing_hash_passwords(passwords):
+        race(passwords)
+        return hash_passwords(passwords)
+
+    async def racing_hash_passwords_async(passwords):
+        race(passwords)
+        return await hash_passwords_async(passwords)
+
+    monkeypatch.setattr(importer, "hash_passwords", racing_hash_passwords)
+    monkeypatch.setattr(aio_importer, "hash_passwords_async", racing_hash_passwords_async)
+    return calls
+
+
+@pytest.mark.parametrize("stack", ["client", "async_client"])
+def test_conflicting_batch_reports_every_row_once(request, stack, admin_headers, register, concurrent_write):
+    register("existing@example.com")
+    emails = ["new1@example.com", "existing@example.com", RACED_EMAIL, "new2@example.com"]
+    body = "\n".join(
+        json.dumps({"first_name": "Imported", "last_name": "User", "email": email, "password": "Passw0rd!x"})
+        for email in emails
+    )
+
+    response = request.getfixturevalue(stack).post("/users/import", content=body, headers=admin_headers)
+
+    assert response.status_code == 200
+    report = response.json()
+    assert report["created"] + report["failed"] == len(emails)
+    assert report["created"] == 2
+    assert [(error["line"], error["error"]) for error in report["errors"]] == [
+        (2, "Email already registered."),
+        (3, "Email already registered."),
+    ]
+    assert concurrent_write == [3]
+
+
+@pytest.mark.parametrize("stack", ["client", "async_client"])
+def test_csv_quoted_fields_may_span_lines(request, stack, admin_headers):
+    body = (
+        "first_name,last_name,email,password,roles\r\n"
+        '"Anna","Smith, ""Jr.""",anna@example.com,Passw0rd!x,"analyst;\r\nmanager"\r\n'
+        '"Multi\nline",User,multi@example.com,Passw0rd!x,basic_user\r\n'
+        "Bob,Stone,bob@example.com,Passw0rd!x,unknown\r\n"
+        'Eve,"Open,eve@example.com,Passw0rd!x,basic_user\r\n'
+    )
+
+    response = request.getfixturevalue(stack).post(
+        "/users/import", params={"format": "csv"}, content=body, headers=admin_headers
+    )
+
+    report = response.json()
+    assert report["created"] == 2
+    assert [(error["line"], error["email"]) for error in report["errors"]] == [
+        (6, "bob@example.com"),
+        (7, None),
+    ]
+    with SessionLocal() as db:
+        users = {user.email: user for user in db.scalars(select(User).options(selectinload(User.roles)))}
+    assert users["anna@example.com"].last_name == 'Smith, "Jr."'
+    assert sorted(role.name for role in users["anna@example.com"].roles) == ["analyst", "manager"]
+    assert users["multi@example.com"].first_name == "Multi\nline"
@@ -0,0 +1,38 @@
+﻿"""Пакетная интроспекция: отзыв между шагами не перезаписывается кэшем."""
+import pytest
+from app.core.cache import introspection_cache
+from app.core.security import decode_token, token_key
+from app.services import IntrospectionBatch
+from app.services.principal import Principal
+from conftest import login
+
+
+@pytest.fixture
+def token(client, register) -> str:
+    register("introspect@example.com")
+    return login(client, "introspect@example.com")["access_token"]
+
+
+@pytest.mark.parametrize(
+    "invalidate",
+    [lambda key: introspection_cache.pop(key), lambda key: introspection_cache.bump_version()],
+    ids=["token", "all"],
+)
+def test_invalidation_during_batch_is_not_overwritten(token, invalidate):
+    key = token_key(token, decode_token(token))
+    batch = IntrospectionBatch([token])
+    principal = Principal(user_id=1, is_active=True, permissions=frozenset({"view_projects"}))
+
+    invalidate(key)
+    [result] = batch.complete({key: principal})
+
+    assert result.active
+    assert introspection_cache.get(key) is None
+
+
+def test_batch_results_are_cached_without_invalidation(token):
+    key = token_key(token, decode_token(token))
+    batch = IntrospectionBatch([token])
+    batch.complete({key: Principal(user_id=1, is_active=True, permissions=frozenset())})
+
+    assert introspection_cache.get(key) is not None
@@ -0,0 +1,33 @@
+﻿"""Набор ключей подписи: выбор активного ключа при ротации."""
+import pytest
+from app.core.keys import KeyRing, generate_key, load_key
+
+
+def keys(tmp_path, count: int) -> list:
+    kids = [generate_key("EdDSA", tmp_path) for _ in range(count)]
+    return [load_key(tmp_path / f"{kid}.pem", "EdDSA") for kid in kids]
+
+
+def test_single_key_is_active_by_default(tmp_path):
+    [key] = keys(tmp_path, 1)
+
+    assert KeyRing("EdDSA", [key], None, "secret").active_kid == key.kid
+
+
+def test_several_keys_require_explicit_active_kid(tmp_path):
+    with pytest.raises(RuntimeError, match="JWT_ACTIVE_KID"):
+        KeyRing("EdDSA", keys(tmp_path, 2), None, "secret")
+
+
+def test_new_key_is_published_before_it_signs(tmp_path):
+    old, new = keys(tmp_path, 2)
+
+    keyring = KeyRing("EdDSA", [old, new], old.kid, "secret")
+
+    assert keyring.signing_key()[1] == {"kid": old.kid}
+    assert new.kid.encode() in keyring.jwks_json
+
+
+def test_unknown_active_kid_is_rejected(tmp_path):
+    with pytest.raises(RuntimeError, match="missing"):
+        KeyRing("EdDSA", keys(tmp_path, 1), "missing", "secret")
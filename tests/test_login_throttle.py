@@ -0,0 +1,145 @@
+﻿"""Ограничение попыток входа: лимит окна, прогрессивная задержка и их сброс."""
+import pytest
+from starlette.requests import Request
+from app.core import ratelimit
+from app.core.ratelimit import login_throttle
+from app.dependencies import get_client_ip
+from conftest import PASSWORD, settings
+
+STACKS = ["client", "async_client"]
+WRONG_PASSWORD = "wrong-password"
+
+
+class Clock:
+    """Подменяет `time.time` ограничителя, чтобы окна истекали без ожидания."""
+
+    def __init__(self, now: float) -> None:
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> Clock:
+    clock = Clock(ratelimit.time.time())
+    monkeypatch.setattr(ratelimit, "time", clock)
+    return clock
+
+
+@pytest.fixture(params=STACKS)
+def stack(request):
+    return request.getfixturevalue(request.param)
+
+
+def attempt(client, email: str, password: str = PASSWORD):
+    return client.post("/auth/login", json={"email": email, "password": password})
+
+
+@pytest.fixture
+def no_backoff(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Отключает прогрессивную задержку, чтобы неудачи упирались в лимит окна."""
+    monkeypatch.setattr(login_throttle, "free_failures_per_email", 1_000)
+    monkeypatch.setattr(login_throttle, "free_failures_per_ip", 1_000)
+
+
+def fail_up_to_limit(client, email: str) -> None:
+    for _ in range(login_throttle.max_attempts_per_email):
+        assert attempt(client, email, WRONG_PASSWORD).status_code == 401
+
+
+def test_email_limit_rejects_first_attempt_over_the_window(stack, register, clock, no_backoff):
+    email = register("limit@example.com")["email"]
+
+    fail_up_to_limit(stack, email)
+    response = attempt(stack, email)
+
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == str(login_throttle.window_seconds)
+    assert attempt(stack, register("other@example.com")["email"]).status_code == 200
+
+
+def test_successful_logins_do_not_use_up_the_email_limit(stack, register, clock):
+    email = register("owner@example.com")["email"]
+
+    for _ in range(login_throttle.max_attempts_per_email + 5):
+        assert attempt(stack, email).status_code == 200
+
+
+def test_success_resets_the_email_window(stack, register, clock, no_backoff):
+    email = register("reset@example.com")["email"]
+    for _ in range(login_throttle.max_attempts_per_email - 1):
+        attempt(stack, email, WRONG_PASSWORD)
+
+    assert attempt(stack, email).status_code == 200
+    fail_up_to_limit(stack, email)
+    assert attempt(stack, email).status_code == 429
+
+
+def test_email_window_reopens_after_it_passes(stack, register, clock, no_backoff):
+    email = register("window@example.com")["email"]
+    fail_up_to_limit(stack, email)
+    assert attempt(stack, email).status_code == 429
+
+    clock.advance(login_throttle.window_seconds / 2)
+    assert attempt(stack, email).status_code == 429
+
+    clock.advance(login_throttle.window_seconds)
+    assert attempt(stack, email).status_code == 200
+
+
+def test_failures_beyond_free_ones_back_off_until_success(stack, register, clock):
+    email = register("backoff@example.com")["email"]
+    for _ in range(login_throttle.free_failures_per_email + 1):
+        assert attempt(stack, email, WRONG_PASSWORD).status_code == 401
+
+    response = attempt(stack, email)
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == str(int(login_throttle.backoff_base_seconds))
+
+    clock.advance(login_throttle.backoff_base_seconds)
+    assert attempt(stack, email).status_code == 200
+    assert attempt(stack, email, WRONG_PASSWORD).status_code == 401
+    assert attempt(stack, email).status_code == 200
+
+
+def client_request(host: str, forwarded: str | None = None) -> Request:
+    headers = [(b"x-forwarded-for", forwarded.encode())] if forwarded is not None else []
+    return Request({"type": "http", "client": (host, 50000), "headers": headers})
+
+
+@pytest.mark.parametrize(
+    ("host", "forwarded", "expected"),
+    [
+        ("203.0.113.7", None, "203.0.113.7"),
+        ("203.0.113.7", "198.51.100.1", "203.0.113.7"),
+        ("10.0.0.2", None, "10.0.0.2"),
+        ("10.0.0.2", "198.51.100.1", "198.51.100.1"),
+        ("10.0.0.2", "1.2.3.4, 198.51.100.1, 10.0.0.9", "198.51.100.1"),
+        ("10.0.0.2", "10.0.0.5", "10.0.0.2"),
+    ],
+)
+def test_client_ip_honors_forwarded_for_only_from_trusted_proxies(monkeypatch, host, forwarded, expected):
+    monkeypatch.setattr(settings, "trusted_proxies", "10.0.0.0/8, 192.0.2.1")
+
+    assert get_client_ip(client_request(host, forwarded)) == expected
+
+
+def test_forwarded_for_from_untrusted_peer_shares_its_bucket(client, register, clock, monkeypatch):
+    monkeypatch.setattr(login_throttle, "max_attempts_per_ip", 2)
+    email = register("proxy@example.com")["email"]
+    for index in range(2):
+        response = client.post(
+            "/auth/login",
+            json={"email": email, "password": PASSWORD},
+            headers={"X-Forwarded-For": f"198.51.100.{index}"},
+        )
+        assert response.status_code == 200
+
+    response = client.post(
+        "/auth/login", json={"email": email, "password": PASSWORD}, headers={"X-Forwarded-For": "198.51.100.9"}
+    )
+    assert response.status_code == 429
@@ -0,0 +1,104 @@
+﻿"""Секционирование `access_tokens` и уникальность отпечатков токенов.
+
+Тесты с маркером `postgres` выполняют DDL на сервере из `TEST_POSTGRES_URL`
+в отдельной схеме и пропускаются, если переменная не задана.
+"""
+import os
+import secrets
+from collections.abc import Iterator
+from datetime import datetime, timedelta, timezone
+import pytest
+from sqlalchemy import create_engine, insert, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+from app.db import janitor
+from app.db.session import Base, SessionLocal
+from app.models import AccessToken, User
+from app.services import token as token_service
+from app.services.token import new_access_token_id
+
+POSTGRES_URL = os.environ.get("TEST_POSTGRES_URL")
+
+
+def test_new_access_token_id_skips_taken_digests(monkeypatch, register):
+    user_id = register("digest@example.com")["id"]
+    taken, fresh = "taken-jti", "fresh-jti"
+    with SessionLocal() as db:
+        db.add(
+            AccessToken(
+                digest=token_service.token_digest(taken),
+                user_id=user_id,
+                expires_at=datetime.now(timezone.utc) + timedelta(minutes=5),
+            )
+        )
+        db.commit()
+        candidates = iter([taken, fresh])
+        monkeypatch.setattr(token_service, "new_jti", lambda: next(candidates))
+
+        assert new_access_token_id(db) == (fresh, token_service.token_digest(fresh))
+
+
+@pytest.fixture
+def pg_engine() -> Iterator[Engine]:
+    """Движок PostgreSQL с пустой схемой приложения в отдельной схеме БД."""
+    if not POSTGRES_URL:
+        pytest.skip("TEST_POSTGRES_URL is not set.")
+    schema = f"partitioning_{secrets.token_hex(4)}"
+    admin = create_engine(POSTGRES_URL)
+    with admin.begin() as conn:
+        conn.execute(text(f'CREATE SCHEMA "{schema}"'))
+    engine = create_engine(POSTGRES_URL, connect_args={"options": f"-csearch_path={schema}"})
+    try:
+        Base.metadata.create_all(engine)
+        yield engine
+    finally:
+        engine.dispose()
+        with admin.begin() as conn:
+            conn.execute(text(f'DROP SCHEMA "{schema}" CASCADE'))
+        admin.dispose()
+
+
+def add_token(conn, user_id: int, expires_at: datetime, digest: bytes | None = None) -> None:
+    conn.execute(
+        insert(AccessToken).values(
+            digest=digest or secrets.token_bytes(16), user_id=user_id, expires_at=expires_at
+        )
+    )
+
+
+@pytest.mark.postgres
+def test_partitioning_moves_live_tokens_and_drops_expired_days(pg_engine):
+    now = datetime.now(timezone.utc)
+    today = now.date()
+    with pg_engine.begin() as conn:
+        user_id = conn.execute(
+            insert(User)
+            .values(first_name="Pg", last_name="User", email="pg@example.com", password_hash="x")
+            .returning(User.id)
+        ).scalar_one()
+        add_token(conn, user_id, now - timedelta(days=1))
+        add_token(conn, user_id, now + timedelta(minutes=15))
+        add_token(conn, user_id, now + timedelta(days=1))
+
+    with pg_engine.begin() as conn:
+        assert janitor.partition_access_tokens(conn, today, 2) == 2
+        assert janitor.is_partitioned(conn)
+        assert janitor.partition_access_tokens(conn, today, 2) == 0
+
+    with pg_engine.begin() as conn:
+        add_token(conn, user_id, now + timedelta(hours=1))
+        assert len(conn.execute(select(AccessToken.id)).all()) == 3
+
+    digest = secrets.token_bytes(16)
+    expires_at = now + timedelta(hours=2)
+    with pg_engine.begin() as conn:
+        add_token(conn, user_id, expires_at, digest)
+        # Отпечаток уникален только в паре со сроком; остальное обеспечивает new_access_token_id.
+        add_token(conn, user_id, expires_at + timedelta(seconds=1), digest)
+    with pytest.raises(IntegrityError), pg_engine.begin() as conn:
+        add_token(conn, user_id, expires_at, digest)
+
+    with pg_engine.begin() as conn:
+        before = datetime.combine(today + timedelta(days=3), datetime.min.time(), timezone.utc)
+        assert janitor.drop_expired_partitions(conn, before) == 5
+        assert conn.execute(select(AccessToken.id)).scalars().all() == []
@@ -0,0 +1,50 @@
+﻿"""Проверка прав маршрутов: коды, маска требуемых прав и ответы 403."""
+import pytest
+from app.aio.dependencies import require_permissions as require_permissions_async
+from app.core.permissions import PermissionRegistry, RequiredPermissions
+from app.dependencies import require_permissions
+from conftest import bearer, login
+
+
+@pytest.mark.parametrize("factory", [require_permissions, require_permissions_async])
+def test_unknown_permission_code_is_rejected_at_creation(factory):
+    with pytest.raises(ValueError, match="view_everything"):
+        factory("view_users", "view_everything")
+
+
+def test_required_mask_is_computed_once_per_registry_generation(monkeypatch):
+    registry = PermissionRegistry()
+    registry.load([("view_users", 1), ("view_reports", 4)])
+    calls = []
+    find_mask = registry.find_mask
+    monkeypatch.setattr(registry, "find_mask", lambda codes: calls.append(codes) or find_mask(codes))
+    required = RequiredPermissions(registry, ["view_users", "view_reports"])
+
+    assert required.allows(0b10010)
+    assert not required.allows(0b00010)
+    assert len(calls) == 1
+
+    registry.load([("view_users", 2), ("view_reports", 3)])
+    assert required.allows(0b01100)
+    assert len(calls) == 2
+
+
+def test_required_codes_missing_from_registry_deny_without_registering():
+    registry = PermissionRegistry()
+    registry.load([("view_users", 1)])
+    required = RequiredPermissions(registry, ["view_reports"])
+
+    assert not required.allows(-1)
+    assert registry.find("view_reports") is None
+    assert registry.stable
+
+
+@pytest.mark.parametrize("stack", ["client", "async_client"])
+def test_missing_permission_is_forbidden(request, stack, register, admin_headers):
+    client = request.getfixturevalue(stack)
+    register("basic@example.com")
+    token = login(client, "basic@example.com")["access_token"]
+
+    assert client.get("/resources/projects", headers=bearer(token)).status_code == 200
+    assert client.get("/resources/reports", headers=bearer(token)).status_code == 403
+    assert client.get("/resources/reports", headers=admin_headers).status_code == 200
@@ -0,0 +1,20 @@
+﻿"""Бюджеты SQL-запросов горячих маршрутов при `TOKEN_VALIDATION_MODE=database`."""
+import pytest
+from conftest import bearer, login
+
+@pytest.mark.parametrize(
+    ("path", "cold_budget"),
+    [
+        ("/users/me", 3),
+        ("/resources/projects", 2),
+        ("/admin/roles", 4),
+    ],
+)
+def test_hot_path_query_budget(client, query_budget, path, cold_budget):
+    headers = bearer(login(client, "admin@example.com", "Admin123!")["access_token"])
+
+    with query_budget(cold_budget):
+        assert client.get(path, headers=headers).status_code == 200
+    # Повторный запрос берёт права, профиль и справочник из кэшей; остаётся проверка токена.
+    with query_budget(1):
+        assert client.get(path, headers=headers).status_code == 200
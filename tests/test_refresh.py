@@ -0,0 +1,74 @@
+﻿"""Refresh-токены: однократный обмен, отзыв сессии при повторе и сроки действия."""
+from datetime import datetime, timedelta, timezone
+import jwt
+import pytest
+from sqlalchemy import update
+from app.db.session import session_scope
+from app.models import RefreshToken
+from conftest import bearer, login, settings
+
+STACKS = ["client", "async_client"]
+
+
+@pytest.fixture(params=STACKS)
+def stack(request):
+    return request.getfixturevalue(request.param)
+
+
+@pytest.fixture
+def user(register) -> str:
+    return register("refresh@example.com")["email"]
+
+
+def refresh(client, refresh_token: str):
+    return client.post("/auth/refresh", json={"refresh_token": refresh_token})
+
+
+def test_refresh_rotates_tokens(stack, user):
+    tokens = login(stack, user)
+
+    response = refresh(stack, tokens["refresh_token"])
+
+    assert response.status_code == 200
+    rotated = response.json()
+    assert rotated["refresh_token"] != tokens["refresh_token"]
+    assert rotated["access_token"] != tokens["access_token"]
+    assert stack.get("/users/me", headers=bearer(rotated["access_token"])).status_code == 200
+
+
+def test_reused_refresh_token_revokes_its_session(stack, user):
+    tokens = login(stack, user)
+    other_session = login(stack, user)
+    rotated = refresh(stack, tokens["refresh_token"]).json()
+
+    assert refresh(stack, tokens["refresh_token"]).status_code == 401
+    assert refresh(stack, rotated["refresh_token"]).status_code == 401
+    assert refresh(stack, other_session["refresh_token"]).status_code == 200
+
+
+def test_expired_refresh_token_is_rejected(stack, user):
+    tokens = login(stack, user)
+    with session_scope() as db:
+        db.execute(update(RefreshToken).values(expires_at=datetime.now(timezone.utc) - timedelta(seconds=1)))
+
+    assert refresh(stack, tokens["refresh_token"]).status_code == 401
+
+
+def test_access_tokens_use_the_short_lifetime(stack, user):
+    lifetime = settings.access_token_expire_minutes * 60
+    tokens = login(stack, user)
+    rotated = refresh(stack, tokens["refresh_token"]).json()
+
+    for issued in (tokens, rotated):
+        claims = jwt.decode(issued["access_token"], options={"verify_signature": False})
+        assert claims["exp"] - claims["iat"] == pytest.approx(lifetime, abs=1)
+        assert lifetime - 5 <= issued["expires_in"] <= lifetime
+
+
+def test_expired_access_token_is_rejected_but_refresh_still_works(stack, user, monkeypatch):
+    monkeypatch.setattr(settings, "access_token_expire_minutes", -1)
+    tokens = login(stack, user)
+
+    assert tokens["expires_in"] == 0
+    assert stack.get("/users/me", headers=bearer(tokens["access_token"])).status_code == 401
+    assert refresh(stack, tokens["refresh_token"]).status_code == 200
@@ -0,0 +1,25 @@
+﻿"""Локальная проверка токенов по кэшу отзывов."""
+import pytest
+from conftest import bearer, login, settings
+
+@pytest.fixture(autouse=True)
+def local_validation(monkeypatch):
+    monkeypatch.setattr(settings, "token_validation_mode", "local")
+
+
+def test_token_issued_before_deactivation_is_revoked(client, admin_headers, register):
+    user = register("old@example.com")
+    token = login(client, "old@example.com")["access_token"]
+
+    response = client.patch(f"/users/{user['id']}", json={"is_active": False}, headers=admin_headers)
+    assert response.status_code == 200
+    assert client.get("/users/me", headers=bearer(token)).status_code == 401
+
+
+def test_token_issued_right_after_reactivation_is_accepted(client, admin_headers, register):
+    user = register("back@example.com")
+    client.patch(f"/users/{user['id']}", json={"is_active": False}, headers=admin_headers)
+    client.patch(f"/users/{user['id']}", json={"is_active": True}, headers=admin_headers)
+
+    token = login(client, "back@example.com")["access_token"]
+    assert client.get("/users/me", headers=bearer(token)).status_code == 200
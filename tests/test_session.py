@@ -0,0 +1,36 @@
+﻿"""Подключение к БД: асинхронный движок создаётся только для асинхронного режима."""
+import os
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+import pytest
+from app.db.session import to_async_url
+
+ROOT = Path(__file__).resolve().parents[1]
+
+SYNC_ONLY_APP = textwrap.dedent(
+    """
+    from app.db import session
+    session.ASYNC_DRIVERS.clear()
+    from fastapi.testclient import TestClient
+    from app.main import create_app
+    with TestClient(create_app()) as client:
+        assert client.get("/.well-known/jwks.json").status_code == 200
+    assert session.get_async_engine.cache_info().currsize == 0
+    """
+)
+
+
+def test_unsupported_dialect_has_no_async_url():
+    with pytest.raises(ValueError, match="mysql"):
+        to_async_url("mysql+pymysql://user@localhost/auth")
+
+
+def test_sync_mode_does_not_need_an_async_driver(tmp_path):
+    env = {**os.environ, "DATABASE_MODE": "sync", "DATABASE_URL": f"sqlite:///{tmp_path / 'sync.db'}"}
+    env.pop("ASYNC_DATABASE_URL", None)
+
+    result = subprocess.run([sys.executable, "-c", SYNC_ONLY_APP], cwd=ROOT, env=env, capture_output=True, text=True)
+
+    assert result.returncode == 0, result.stderr
@@ -0,0 +1,28 @@
+﻿"""Профиль пользователя: сериализация в обоих режимах БД и кэш `/users/me`."""
+from datetime import datetime
+from conftest import PASSWORD, bearer, login
+
+def registration(email: str) -> dict:
+    return {
+        "first_name": "Test",
+        "last_name": "User",
+        "email": email,
+        "password": PASSWORD,
+        "password_confirm": PASSWORD,
+    }
+
+
+def test_sync_and_async_stacks_serialize_timestamps_alike(client, async_client):
+    profiles = [
+        client.post("/auth/register", json=registration("sync@example.com")).json(),
+        async_client.post("/auth/register", json=registration("async@example.com")).json(),
+    ]
+    token = login(client, "sync@example.com")["access_token"]
+    profiles.append(client.get("/users/me", headers=bearer(token)).json())
+    token = login(async_client, "async@example.com")["access_token"]
+    profiles.append(async_client.get("/users/me", headers=bearer(token)).json())
+
+    for profile in profiles:
+        for field in ("created_at", "updated_at"):
+            assert profile[field].endswith("Z")
+            assert datetime.fromisoformat(profile[field]).utcoffset().total_seconds() == 0